@@ -0,0 +1,137 @@
+"""
+Admission Control
+Caps how much expensive work (PDF rendering) runs at once, so a burst of
+quotes can't starve every other request on the box.
+
+A gate lets `limit` callers in at a time and parks up to `max_waiting`
+more for at most `wait_timeout` seconds. Anyone beyond that is turned
+away straight away with Overloaded, which the API answers with a 429 and
+a Retry-After.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# =============================================
+# ERRORS
+# =============================================
+
+class Overloaded(Exception):
+    """Raised instead of queueing more work; retry_after is in seconds"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+# =============================================
+# GATE
+# =============================================
+
+class AdmissionGate:
+    """
+    Concurrency limit with a bounded wait queue.
+
+    Args:
+        name (str): Shown in error messages and snapshot()
+        limit (int): Callers allowed in at the same time
+        max_waiting (int): Callers allowed to wait for a slot (0 = none)
+        wait_timeout (float): Seconds a waiting caller waits before giving up
+    """
+
+    def __init__(self, name, limit, max_waiting, wait_timeout):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._reset()
+
+    def _reset(self):
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.avg_seconds = None    # moving average of time spent inside
+
+    def configure(self, limit=None, max_waiting=None, wait_timeout=None):
+        """Changes the limits; callers already inside are not affected"""
+        with self._cond:
+            if limit is not None:
+                self.limit = limit
+            if max_waiting is not None:
+                self.max_waiting = max_waiting
+            if wait_timeout is not None:
+                self.wait_timeout = wait_timeout
+            self._cond.notify_all()
+
+    def reset_after_fork(self):
+        """A forked child starts with its own empty gate"""
+        self._reset()
+
+    def retry_after(self):
+        """Rough seconds until a slot frees up for a new caller (at least 1)"""
+        average = self.avg_seconds or 1.0
+        return max(1, math.ceil(average * (self.waiting + self.active) / max(self.limit, 1)))
+
+    def acquire(self):
+        """Takes a slot, waiting for one if allowed; raises Overloaded otherwise"""
+        with self._cond:
+            if self.active < self.limit and self.waiting == 0:
+                self.active += 1
+                self.admitted += 1
+                return
+
+            if self.waiting >= self.max_waiting:
+                self.rejected_full += 1
+                raise Overloaded(f"{self.name} is busy ({self.active} running, "
+                                 f"{self.waiting} waiting)", self.retry_after())
+
+            self.waiting += 1
+            deadline = time.monotonic() + self.wait_timeout
+            try:
+                while self.active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected_timeout += 1
+                        raise Overloaded(f"{self.name} is busy (waited {self.wait_timeout:g}s)",
+                                         self.retry_after())
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+
+            self.active += 1
+            self.admitted += 1
+
+    def release(self, seconds=None):
+        with self._cond:
+            self.active -= 1
+            if seconds is not None:
+                self.avg_seconds = seconds if self.avg_seconds is None else \
+                    0.8 * self.avg_seconds + 0.2 * seconds
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """with gate.slot(): ... (timed, for the Retry-After estimate)"""
+        self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def snapshot(self):
+        return {
+            'limit': self.limit,
+            'max_waiting': self.max_waiting,
+            'wait_timeout': self.wait_timeout,
+            'active': self.active,
+            'waiting': self.waiting,
+            'admitted': self.admitted,
+            'rejected_full': self.rejected_full,
+            'rejected_timeout': self.rejected_timeout,
+            'avg_ms': round(self.avg_seconds * 1000, 1) if self.avg_seconds is not None else None
+        }
@@ -0,0 +1,373 @@
+"""
+Shared API Logic
+Request handling used by both the Flask app (fastsewa_api.py)
+and the ASGI app (fastsewa_asgi.py)
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+import event_log
+import metrics
+import pdf_generator
+import pdf_queue
+import smart_chat
+from admission import Overloaded
+from pdf_memory import pdf_memory
+from idempotency import IdempotentTurns, clean_key
+
+SERVICE_ICONS = {
+    "FS_BUILD": "🏗️",
+    "FS_SECURE": "🛡️", 
+    "FS_LEGAL": "⚖️",
+    "FS_MEDICAL": "🏥",
+    "FS_LAND": "📋",
+    "FS_REPAIR": "🔧"
+}
+
+# =============================================
+# CHAT
+# =============================================
+
+def run_chat_turn(user_message, user_id):
+    """Runs one chat turn and builds the JSON fields sent to the frontend"""
+    
+    # Get response from your smart_chat module
+    response = smart_chat.get_response(user_message, user_id)
+    
+    # Check conversation state
+    current_context, current_service = smart_chat.get_session_state(user_id)
+    
+    # Check if PDF was generated
+    pdf_generated = 'PDF Created Successfully' in response
+    pdf_file = None
+    
+    if pdf_generated:
+        # Extract filename from response
+        lines = response.split('\n')
+        for line in lines:
+            if 'FastSewa_Quote_' in line and '.pdf' in line:
+                pdf_file = line.split(': ')[1]
+                break
+    
+    # Check if a PDF job was queued instead
+    pdf_job_id = None
+    if 'PDF Job Queued' in response:
+        for line in response.split('\n'):
+            if 'PDF Job Queued: ' in line:
+                pdf_job_id = line.split(': ')[1].strip()
+                break
+    
+    return {
+        'success': True,
+        'response': response,
+        'context': current_context,
+        'service': current_service,
+        'needs_input': current_context is not None,
+        'pdf_generated': pdf_generated,
+        'pdf_file': pdf_file,
+        'pdf_job_id': pdf_job_id,
+        'pdf_status': pdf_queue.QUEUED if pdf_job_id else None,
+        'user_id': user_id
+    }
+
+# Results of recent turns by (user_id, idempotency key), so a repeated
+# message is answered once (see idempotency.py). Per process, plus the
+# session database when the sessions are shared ('sqlite' backend); with
+# 'memory' sessions a retry must reach the same worker anyway.
+chat_turns = IdempotentTurns()
+
+if hasattr(os, 'register_at_fork'):  # not on Windows
+    os.register_at_fork(after_in_child=chat_turns.reset_after_fork)
+
+def run_chat_turn_once(user_message, user_id, idempotency_key=None):
+    """
+    run_chat_turn, but a message repeated with the same idempotency key
+    (double tap, client retry) runs only once and shares that result.
+    
+    Returns:
+        (result, replayed): replayed is True for a duplicate
+    """
+    key = clean_key(idempotency_key)
+    if key is None:
+        return run_chat_turn(user_message, user_id), False
+    
+    # Workers share sessions through SQLite: share the results there too,
+    # so a retry handled by another worker doesn't run the turn again
+    smart_chat.init()
+    if smart_chat.SESSION_BACKEND == 'sqlite':
+        chat_turns.share_through(smart_chat.SESSION_DB_PATH)
+    return chat_turns.run(user_id, key, user_message, lambda: run_chat_turn(user_message, user_id))
+
+# =============================================
+# BATCH
+# =============================================
+
+BATCH_MAX_ITEMS = 500
+
+def group_batch(data):
+    """
+    Splits a /api/chat/batch body into per-user message lists.
+    
+    Returns:
+        (results, per_user): results has an entry for each invalid item
+        (None elsewhere); per_user maps user_id -> [(index, message, user_id)]
+    
+    Raises:
+        ValueError: No messages, or too many (answered with 400)
+    """
+    items = data.get('messages') if isinstance(data, dict) else data
+    
+    if not isinstance(items, list) or not items:
+        raise ValueError('messages must be a non-empty list')
+    if len(items) > BATCH_MAX_ITEMS:
+        raise ValueError(f'Too many messages (max {BATCH_MAX_ITEMS})')
+    
+    results = [None] * len(items)
+    per_user = {}
+    
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('message'), str):
+            results[index] = {'success': False, 'status': 'invalid', 'error': 'Each item needs a message'}
+            continue
+        user_id = item.get('user_id', 'default')
+        if not isinstance(user_id, str):
+            results[index] = {'success': False, 'status': 'invalid', 'error': 'user_id must be a string'}
+            continue
+        per_user.setdefault(user_id, []).append((index, item['message'], user_id))
+    
+    return results, per_user
+
+def run_user_messages(items):
+    """Processes one user's messages in order; returns [(index, result)]"""
+    results = []
+    for index, user_message, user_id in items:
+        try:
+            result = run_chat_turn(user_message, user_id)
+            result['status'] = 'ok'
+        except Overloaded as e:
+            result = overloaded_payload(e, user_id)
+        except Exception as e:
+            result = {
+                'success': False,
+                'status': 'error',
+                'response': f"System error: {str(e)}",
+                'context': None,
+                'service': None,
+                'needs_input': False,
+                'user_id': user_id
+            }
+        results.append((index, result))
+    return results
+
+def batch_payload(results):
+    """Payload for /api/chat/batch once every message has a result"""
+    return {
+        'success': True,
+        'total': len(results),
+        'failed': sum(1 for r in results if r['status'] != 'ok'),
+        'results': results
+    }
+
+# =============================================
+# STREAMING (SSE)
+# =============================================
+
+# How long to follow a PDF job before telling the client to fall back to
+# polling /api/pdf-status
+STREAM_PDF_TIMEOUT = 120
+STREAM_POLL_INTERVAL = 0.25
+STREAM_KEEPALIVE = 10       # seconds between keep-alive comments
+
+def sse_event(event, payload):
+    """Formats one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def pdf_job_update(job_id):
+    """
+    Next SSE event for a queued PDF.
+    
+    Returns:
+        (event, payload): 'done' or 'error' end the stream; 'progress'
+        is only worth sending when it differs from the last one
+    """
+    job = pdf_queue.get_job(job_id)
+    if job is None:
+        return 'error', {'job_id': job_id, 'error': 'Job not found'}
+    
+    if job['status'] == pdf_queue.DONE:
+        return 'done', {
+            'job_id': job_id,
+            'status': job['status'],
+            'pdf_file': job['pdf_file'],
+            'download_url': f"/api/download-pdf/{job['pdf_file']}"
+        }
+    
+    if job['status'] == pdf_queue.FAILED:
+        return 'error', {'job_id': job_id, 'status': job['status'], 'error': job['error']}
+    
+    position = pdf_queue.queue_position(job_id) if job['status'] == pdf_queue.QUEUED else None
+    return 'progress', {'job_id': job_id, 'status': job['status'], 'queue_position': position}
+
+def stream_timeout_event(job_id):
+    return sse_event('timeout', {
+        'job_id': job_id,
+        'status_url': f"/api/pdf-status/{job_id}"
+    })
+
+def overloaded_payload(error, user_id):
+    """
+    Body for a chat turn refused by admission control (sent with 429).
+    The session is left at the same step, so resending the message works.
+    """
+    return {
+        'success': False,
+        'status': 'overloaded',
+        'response': "⏳ We're preparing a lot of quotes right now. "
+                    f"Please send your last answer again in {error.retry_after} seconds.",
+        'error': str(error),
+        'retry_after': error.retry_after,
+        'context': None,
+        'service': None,
+        'needs_input': True,
+        'user_id': user_id
+    }
+
+# =============================================
+# DIRECT PDF
+# =============================================
+
+def render_quote_pdf(data):
+    """
+    Renders a quote for /api/quote-pdf straight to bytes.
+    
+    Args:
+        data (dict): {"customer": {full_name, phone, address},
+                      "enquiry": {service_type, form_data, id},
+                      "persist": bool (optional, default PDF_PERSIST)}
+    
+    Returns:
+        tuple: (filename, pdf_bytes)
+    
+    Raises:
+        ValueError: The body isn't a quote request (answered with 400)
+        Overloaded: Too many quotes rendering already (answered with 429)
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('enquiry'), dict):
+        raise ValueError("Expected JSON with an 'enquiry' object")
+    customer = data.get('customer') or {}
+    persist = data.get('persist')
+    if not isinstance(customer, dict) or not isinstance(persist, (bool, type(None))):
+        raise ValueError("'customer' must be an object and 'persist' true or false")
+    
+    try:
+        with pdf_generator.pdf_gate.slot():
+            return pdf_generator.create_invoice_bytes(customer, data['enquiry'], persist=persist)
+    except Overloaded:
+        metrics.PDFS.inc('rejected')
+        raise
+
+# A PDF rendered in memory by another worker reaches generated_pdfs/ a
+# moment later (pdf_memory's background writer); downloads wait this long
+# for it before answering 404
+PERSIST_WAIT_SECONDS = 3.0
+PERSIST_POLL_INTERVAL = 0.1
+
+def wait_for_pdf_file(filename):
+    """
+    Path of a generated PDF, waiting up to PERSIST_WAIT_SECONDS for one
+    that is still being saved. None if it doesn't turn up.
+    """
+    if os.path.basename(filename) != filename or filename in ('', '.', '..'):
+        return None
+    filepath = os.path.join(pdf_generator.OUTPUT_DIR, filename)
+    if os.path.exists(filepath):
+        return filepath
+    
+    # Only our own quote names can still be on their way to disk
+    if not (pdf_generator.PDF_PERSIST and filename.startswith('FastSewa_Quote_')
+            and filename.endswith('.pdf')):
+        return None
+    deadline = time.monotonic() + PERSIST_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(PERSIST_POLL_INTERVAL)
+        if os.path.exists(filepath):
+            return filepath
+    return None
+
+def pdf_response_headers(filename, pdf_bytes):
+    """Headers for a PDF sent as a download"""
+    return {
+        'Content-Type': 'application/pdf',
+        'Content-Length': str(len(pdf_bytes)),
+        'Content-Disposition': f'attachment; filename="{filename}"'
+    }
+
+# =============================================
+# OTHER ENDPOINTS
+# =============================================
+
+def list_services():
+    """Payload for /api/services"""
+    services = []
+    for code, name in smart_chat.SERVICES.items():
+        services.append({
+            'id': code,
+            'name': name,
+            'icon': SERVICE_ICONS.get(code, '📌')
+        })
+    
+    return {
+        'success': True,
+        'services': services,
+        'total': len(services)
+    }
+
+def pdf_job_status(job_id):
+    """Payload for /api/pdf-status/<job_id>, or None if the job is unknown"""
+    job = pdf_queue.get_job(job_id)
+    if job is None:
+        return None
+    
+    return {
+        'success': True,
+        'job_id': job_id,
+        'status': job['status'],
+        'pdf_file': job['pdf_file'],
+        'download_url': f"/api/download-pdf/{job['pdf_file']}" if job['pdf_file'] else None,
+        'error': job['error']
+    }
+
+def pdf_admission_status():
+    """PDF limits, current load and rejections ('queue' in queue mode)"""
+    status = {
+        'pdf_mode': smart_chat.PDF_MODE,
+        'render': pdf_generator.get_pdf_admission_stats(),
+        'rejected': int(metrics.PDFS.value('rejected'))
+    }
+    if smart_chat.PDF_MODE == 'queue':
+        status['queue'] = {
+            'limit': pdf_queue.MAX_QUEUED_JOBS,
+            'depth': pdf_queue.queue_depth(),
+            'retry_after': pdf_queue.QUEUE_RETRY_AFTER
+        }
+    return status
+
+def health_status():
+    """Payload for /api/health"""
+    smart_chat.init()
+    return {
+        'success': True,
+        'status': 'online',
+        'services': len(smart_chat.SERVICES),
+        'sessions': smart_chat.sessions.snapshot(),
+        'intents': smart_chat.intent_reloader.snapshot(),
+        'pdf_cache': pdf_generator.get_pdf_cache_stats(),
+        'pdf_admission': pdf_admission_status(),
+        'pdf_memory': pdf_memory.snapshot(),
+        'event_log': event_log.get_event_log_stats(),
+        'idempotency': chat_turns.snapshot(),
+        'timestamp': datetime.now().isoformat()
+    }
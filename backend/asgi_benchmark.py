@@ -0,0 +1,126 @@
+"""
+Concurrent Connection Benchmark
+Flask dev server (fastsewa_api.py) vs ASGI app (fastsewa_asgi.py on uvicorn)
+
+Opens N connections that sit idle (like chat clients waiting between
+messages), then completes a request on each and counts how many are
+answered. Server threads and RSS are sampled while the connections are open.
+Linux only (reads /proc).
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+FLASK_PORT = 5101
+ASGI_PORT = 5102
+HOLD_SECONDS = 3
+REQUEST_TIMEOUT = 15
+
+SERVERS = {
+    'Flask (threaded)': (
+        FLASK_PORT,
+        f"import fastsewa_api; fastsewa_api.app.run(port={FLASK_PORT}, threaded=True)"
+    ),
+    'ASGI (uvicorn)': (
+        ASGI_PORT,
+        f"import uvicorn, fastsewa_asgi; "
+        f"uvicorn.run(fastsewa_asgi.app, port={ASGI_PORT}, log_level='warning', backlog=4096)"
+    ),
+}
+
+# =============================================
+# HELPERS
+# =============================================
+
+def proc_stats(pid):
+    """(threads, RSS in MB) of a process"""
+    threads, rss = 0, 0
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith('Threads:'):
+                threads = int(line.split()[1])
+            elif line.startswith('VmRSS:'):
+                rss = int(line.split()[1]) / 1024
+    return threads, rss
+
+async def wait_for_port(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return True
+        except OSError:
+            await asyncio.sleep(0.2)
+    return False
+
+async def idle_client(port, hold):
+    """Connects, sends half a request, idles, then finishes it"""
+    started = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), REQUEST_TIMEOUT)
+        writer.write(b"GET /api/health HTTP/1.1\r\nHost: localhost\r\n")
+        await writer.drain()
+        await asyncio.sleep(hold)
+
+        writer.write(b"Connection: close\r\n\r\n")
+        await writer.drain()
+        status = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+        writer.close()
+        return b" 200 " in status, time.perf_counter() - started - hold
+    except (OSError, asyncio.TimeoutError):
+        return False, None
+
+async def run_level(port, pid, connections):
+    tasks = [asyncio.create_task(idle_client(port, HOLD_SECONDS)) for _ in range(connections)]
+
+    await asyncio.sleep(HOLD_SECONDS * 0.8)
+    threads, rss = proc_stats(pid)
+
+    results = await asyncio.gather(*tasks)
+    latencies = sorted(lat for ok, lat in results if ok)
+    ok = len(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else float('nan')
+    return ok, threads, rss, p95
+
+# =============================================
+# RUN BENCHMARK
+# =============================================
+
+async def run_all(levels):
+    print("\n" + "="*72)
+    print(f"⏱️  CONCURRENT IDLE CONNECTIONS (held {HOLD_SECONDS}s, then one request each)")
+    print("="*72 + "\n")
+
+    for label, (port, code) in SERVERS.items():
+        server = subprocess.Popen([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not await wait_for_port(port):
+                print(f"{label}: ❌ server did not start")
+                continue
+
+            for connections in levels:
+                ok, threads, rss, p95 = await run_level(port, server.pid, connections)
+                print(f"{label:<18} {connections:>5} conns | answered {ok:>5} | "
+                      f"server threads {threads:>5} | RSS {rss:7.1f} MB | p95 {p95:8.1f} ms")
+        finally:
+            server.terminate()
+            server.wait()
+        print()
+
+    print("="*72 + "\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="FastSewa concurrent connection benchmark")
+    parser.add_argument('levels', type=int, nargs='*', default=[100, 500, 1000, 2000],
+                        help="open connections per run")
+    args = parser.parse_args()
+    asyncio.run(run_all(args.levels))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Bulk PDF Generation Benchmark
+Times generate_bulk_invoices at different worker counts
+"""
+
+import argparse
+import os
+import time
+
+import pdf_generator
+from pdf_test import test_users, test_enquiries
+
+# =============================================
+# TEST DATA
+# =============================================
+
+def build_batch(size):
+    """Repeats the pdf_test.py sample quotes up to `size` items"""
+    batch = []
+    for i in range(size):
+        enquiry = dict(test_enquiries[i % len(test_enquiries)])
+        enquiry['id'] = 5000 + i
+        batch.append((test_users[i % len(test_users)], enquiry))
+    return batch
+
+# =============================================
+# RUN BENCHMARK
+# =============================================
+
+def run_all(size=48, chunksize=1):
+    print("\n" + "="*60)
+    print(f"⏱️  BULK PDF GENERATION - {size} quotes, chunksize {chunksize}")
+    print("="*60 + "\n")
+
+    batch = build_batch(size)
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, cores})
+    baseline = None
+
+    for workers in worker_counts:
+        started = time.perf_counter()
+        summary = pdf_generator.generate_bulk_invoices(batch, workers=workers, chunksize=chunksize)
+        elapsed = time.perf_counter() - started
+
+        baseline = baseline or elapsed
+        avg_item = sum(r['duration'] for r in summary['results']) / max(1, len(summary['results']))
+
+        print(f"Workers {workers:>2}: {elapsed:6.2f}s | {size / elapsed:6.1f} PDFs/s | "
+              f"avg {avg_item * 1000:6.0f} ms/PDF | speedup {baseline / elapsed:4.1f}x | "
+              f"✅ {len(summary['success'])} ❌ {len(summary['failed'])}")
+
+        if summary['failed']:
+            first_error = next(r['error'] for r in summary['results'] if r['error'])
+            print(f"   First error: {first_error}")
+
+    print("\n" + "="*60 + "\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="FastSewa bulk PDF generation benchmark")
+    parser.add_argument('--size', type=int, default=48, help="quotes per run")
+    parser.add_argument('--chunksize', type=int, default=1, help="quotes handed to a worker at a time")
+    args = parser.parse_args()
+    run_all(args.size, args.chunksize)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Conversation Event Log
+Structured analytics events (which intents match, where users leave each
+flow, how often quotes are made) without slowing the chat turn down.
+
+emit() only appends a dict to an in-memory queue. A background thread
+serialises the queued events in batches to JSON lines in
+EVENT_LOG_DIR/events-<pid>.jsonl; at ROTATE_BYTES the file is gzipped to
+events-<time>-<pid>.jsonl.gz and a new one started. When the queue is
+full (the disk can't keep up) new events are dropped and counted, never
+waited for.
+
+Read the logs with e.g.:
+    zcat event_logs/*.jsonl.gz | jq -c 'select(.event == "quote")'
+"""
+
+import atexit
+import glob
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from collections import deque
+
+import metrics
+
+# =============================================
+# CONFIGURATION
+# =============================================
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+EVENT_LOG_ENABLED = os.environ.get('FASTSEWA_EVENT_LOG', '1') != '0'
+EVENT_LOG_DIR = os.environ.get('FASTSEWA_EVENT_LOG_DIR', os.path.join(BASE_DIR, 'event_logs'))
+
+MAX_QUEUED_EVENTS = 50000          # beyond this, new events are dropped
+BATCH_SIZE = 2000                  # events serialised per write
+FLUSH_INTERVAL = 1.0               # seconds between writes when idle
+ROTATE_BYTES = 16 * 1024 * 1024    # uncompressed size of one file
+KEEP_FILES = 100                   # compressed files kept (oldest deleted)
+
+# =============================================
+# EVENT LOG
+# =============================================
+
+class EventLog:
+    """
+    Bounded in-memory queue drained by a writer thread into rotated,
+    gzipped JSONL files. One file per process, so workers never share one.
+
+    Args:
+        directory (str): Folder for the log files
+        max_queued (int): Queue limit; emit() drops events beyond it
+        rotate_bytes (int): Rotate (and compress) at this file size
+        keep_files (int): Compressed files to keep
+        flush_interval (float): Seconds between writes when not busy
+        batch_size (int): Events per write; a full batch wakes the writer early
+    """
+
+    def __init__(self, directory, max_queued=MAX_QUEUED_EVENTS, rotate_bytes=ROTATE_BYTES,
+                 keep_files=KEEP_FILES, flush_interval=FLUSH_INTERVAL, batch_size=BATCH_SIZE):
+        self.directory = directory
+        self.max_queued = max_queued
+        self.batch_size = batch_size
+        self.rotate_bytes = rotate_bytes
+        self.keep_files = keep_files
+        self.flush_interval = flush_interval
+        self._reset()
+
+    def _reset(self):
+        self._queue = deque()
+        self._wake = threading.Event()
+        self._write_lock = threading.Lock()
+        self._writer = None
+        self._start_lock = threading.Lock()
+        self._file = None
+        self._file_bytes = 0
+        self.stats = {'emitted': 0, 'written': 0, 'dropped': 0, 'batches': 0,
+                      'rotations': 0, 'errors': 0}
+
+    def reset_after_fork(self):
+        """A forked worker gets an empty queue and starts its own writer (and file)"""
+        self._reset()
+
+    # ---------- producer side ----------
+
+    def emit(self, event, **fields):
+        """
+        Queues one event; never blocks. Fields must be JSON-serialisable
+        values (not live objects that keep changing, like session.data).
+        """
+        if self._writer is None:
+            self._start()
+        if len(self._queue) >= self.max_queued:
+            self.stats['dropped'] += 1
+            metrics.EVENTS_DROPPED.inc()
+            return
+        fields['event'] = event
+        fields['ts'] = time.time()
+        self._queue.append(fields)
+        self.stats['emitted'] += 1
+        if len(self._queue) >= self.batch_size:
+            self._wake.set()
+
+    def _start(self):
+        with self._start_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name='event-log', daemon=True)
+                self._writer.start()
+
+    # ---------- writer thread ----------
+
+    def _write_loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                self.stats['errors'] += 1
+                print(f"⚠️ Event log write failed: {e}")
+
+    def flush(self):
+        """Writes everything queued so far (the writer thread does this on its own)"""
+        with self._write_lock:
+            while self._queue:
+                batch = []
+                try:
+                    for _ in range(self.batch_size):
+                        batch.append(self._queue.popleft())
+                except IndexError:
+                    pass
+                self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        lines = []
+        for event in batch:
+            try:
+                lines.append(json.dumps(event, ensure_ascii=False, separators=(',', ':'), default=str))
+            except ValueError:
+                self.stats['errors'] += 1
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+
+        if self._file is None:
+            self._open()
+        self._file.write(data)
+        self._file.flush()
+        self._file_bytes += len(data)
+        self.stats['written'] += len(lines)
+        self.stats['batches'] += 1
+
+        if self._file_bytes >= self.rotate_bytes:
+            self._rotate()
+
+    def _active_path(self):
+        return os.path.join(self.directory, f"events-{os.getpid()}.jsonl")
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._active_path()
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._compress(path)     # left over from an earlier process with this pid
+        self._file = open(path, 'ab')
+        self._file_bytes = 0
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        self._compress(self._active_path())
+        self.stats['rotations'] += 1
+        self._prune()
+
+    def _compress(self, path):
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        target = os.path.join(self.directory, f"events-{stamp}-{os.getpid()}.jsonl.gz")
+        suffix = 1
+        while os.path.exists(target):
+            target = os.path.join(self.directory, f"events-{stamp}-{os.getpid()}-{suffix}.jsonl.gz")
+            suffix += 1
+        with open(path, 'rb') as src, gzip.open(target + '.tmp', 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(target + '.tmp', target)
+        os.remove(path)
+
+    def _prune(self):
+        files = sorted(glob.glob(os.path.join(self.directory, 'events-*.jsonl.gz')), key=os.path.getmtime)
+        for path in files[:max(len(files) - self.keep_files, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # ---------- shutdown / stats ----------
+
+    def close(self):
+        """Writes what is queued and compresses the current file"""
+        self.flush()
+        with self._write_lock:
+            if self._file is not None:
+                self._rotate()
+
+    def snapshot(self):
+        return dict(self.stats, queued=len(self._queue), max_queued=self.max_queued,
+                    directory=self.directory)
+
+
+event_log = EventLog(EVENT_LOG_DIR)
+
+def emit(event, **fields):
+    """Queues an analytics event (no-op when FASTSEWA_EVENT_LOG=0)"""
+    if EVENT_LOG_ENABLED:
+        event_log.emit(event, **fields)
+
+def get_event_log_stats():
+    return dict(event_log.snapshot(), enabled=EVENT_LOG_ENABLED)
+
+if hasattr(os, 'register_at_fork'):  # not on Windows
+    os.register_at_fork(after_in_child=event_log.reset_after_fork)
+
+atexit.register(event_log.flush)   # the writer thread is a daemon
+
+metrics.register(metrics.Gauge(
+    'fastsewa_events_queued',
+    'Analytics events waiting to be written',
+    lambda: len(event_log._queue)
+))
@@ -0,0 +1,87 @@
+"""
+Event Log Benchmark
+Cost added to a chat turn by logging one event: the buffered event log
+versus writing the line to a file synchronously. Then a burst larger
+than the queue, to show events are dropped rather than waited for.
+
+Usage:
+    python event_log_benchmark.py
+    python event_log_benchmark.py --events 500000
+"""
+
+import argparse
+import glob
+import json
+import os
+import tempfile
+import time
+
+from event_log import EventLog
+
+# =============================================
+# RUN BENCHMARK
+# =============================================
+
+def sample_event(i):
+    return dict(user_id=f"user_{i % 5000}", service='FS_BUILD', context_from='waiting_for_plotsize',
+                context_to='waiting_for_location', match='flow', intent=None, quote=None, ms=0.42)
+
+def time_sync_writes(path, events):
+    """Per event: serialise, write, flush (what a direct file write in get_response would do)"""
+    with open(path, 'a', encoding='utf-8') as f:
+        started = time.perf_counter()
+        for i in range(events):
+            f.write(json.dumps(dict(sample_event(i), event='turn', ts=time.time())) + '\n')
+            f.flush()
+        return (time.perf_counter() - started) / events
+
+def time_emits(log, events):
+    started = time.perf_counter()
+    for i in range(events):
+        log.emit('turn', **sample_event(i))
+    return (time.perf_counter() - started) / events
+
+def main():
+    parser = argparse.ArgumentParser(description="FastSewa event log benchmark")
+    parser.add_argument('--events', type=int, default=200000)
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(f"📝 EVENT LOG BENCHMARK ({args.events} events)")
+    print("="*60 + "\n")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        sync = time_sync_writes(os.path.join(workdir, 'sync.jsonl'), args.events)
+        print(f"sync write + flush        {sync * 1e6:8.2f} µs per turn")
+
+        # Writer idle while the turns run (it writes every second at most)
+        log = EventLog(os.path.join(workdir, 'idle'), max_queued=args.events,
+                       batch_size=args.events, flush_interval=3600)
+        idle = time_emits(log, args.events)
+        started = time.perf_counter()
+        log.close()
+        background = time.perf_counter() - started
+        files = glob.glob(os.path.join(workdir, 'idle', '*.jsonl.gz'))
+        size = sum(os.path.getsize(p) for p in files)
+        print(f"emit(), writer idle       {idle * 1e6:8.2f} µs per turn")
+        print(f"   background write + gzip: {background * 1e6 / args.events:.2f} µs per event, "
+              f"{size / 1024:.0f} KB compressed")
+
+        # Non-stop burst: the writer serialises at the same time (shares the GIL)
+        log = EventLog(os.path.join(workdir, 'busy'), max_queued=args.events)
+        busy = time_emits(log, args.events)
+        log.close()
+        print(f"emit(), writer busy       {busy * 1e6:8.2f} µs per turn")
+
+        # Burst bigger than the queue: emit must stay fast and drop the excess
+        small = EventLog(os.path.join(workdir, 'overload'), max_queued=10000,
+                         batch_size=args.events, flush_interval=3600)
+        overloaded = time_emits(small, args.events)
+        print(f"emit(), queue full (10k)  {overloaded * 1e6:8.2f} µs per turn, "
+              f"{small.stats['dropped']} of {args.events} dropped")
+        small.close()
+
+    print("\n" + "="*60 + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,117 @@
 # fastsewa_api.py
-from flask import Flask, request, jsonify, send_file
+"""
+FastSewa Flask API
+
+    python fastsewa_api.py                          # development server
+    FASTSEWA_SESSION_BACKEND=sqlite gunicorn --preload -w 4 fastsewa_api:app
+                                                    # pre-forking workers
+
+create_app() loads everything read-only (intents, matchers, invoice
+template) up front. With --preload that happens once in the master and
+the workers share those memory pages copy-on-write; thread pools,
+renderer processes and the intents watcher start in each worker.
+
+Several workers need the 'sqlite' session backend: with 'memory' each
+worker has its own sessions (a flow breaks when the next message lands
+on another worker, and a warning is printed), and 'journal' refuses to
+run in a forked worker.
+"""
+from flask import Blueprint, Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
-import json
-import random
+import gc
 import os
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import api_common
+import metrics
+from admission import Overloaded
+from idempotency import KEY_HEADER, REPLAYED_HEADER, IdempotencyError
 import pdf_generator  # Your existing module
 import smart_chat     # Your existing module
+from pdf_memory import pdf_memory
+import static_assets as frontend_assets
+
+api = Blueprint('api', __name__)
+frontend = Blueprint('frontend', __name__)
+
+static_assets = None   # StaticAssets, built in create_app()
+
+# =============================================
+# PER-WORKER RESOURCES
+# =============================================
 
-app = Flask(__name__)
-CORS(app)  # Enable cross-origin for frontend
+_worker_lock = threading.Lock()
+_worker_pid = None
+_batch_executor = None
+
+def _start_worker():
+    """First request in this process: start the threads it owns"""
+    global _worker_pid, _batch_executor
+    
+    with _worker_lock:
+        if _worker_pid == os.getpid():
+            return
+        _batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='chat-batch')
+        
+        # Pick up intents.json edits without restarting the workers
+        smart_chat.start_intent_reloader()
+        _worker_pid = os.getpid()
+
+def _reset_after_fork():
+    global _worker_lock, _worker_pid, _batch_executor
+    _worker_lock = threading.Lock()
+    _worker_pid = None
+    _batch_executor = None
+
+if hasattr(os, 'register_at_fork'):  # not on Windows
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+@api.before_app_request
+def _ensure_worker_started():
+    if _worker_pid != os.getpid():
+        _start_worker()
 
 # =============================================
 # API ENDPOINTS
 # =============================================
 
-@app.route('/api/chat', methods=['POST'])
+# Batch endpoint: users processed in parallel per batch (at most
+# api_common.BATCH_MAX_ITEMS messages)
+BATCH_WORKERS = 8
+
+def _idempotency_key(data):
+    return request.headers.get(KEY_HEADER) or data.get('idempotency_key')
+
+@api.route('/api/chat', methods=['POST'])
 def chat_endpoint():
-    """Handle chat messages from frontend"""
+    """
+    Handle chat messages from frontend
+    
+    With an idempotency key (header or body), a repeated message runs
+    once: duplicates get the same response, marked Idempotent-Replayed.
+    """
     try:
         data = request.json
         user_message = data.get('message', '')
         user_id = data.get('user_id', 'default')
         service = data.get('service', None)
         
-        # Get response from your smart_chat module
-        response = smart_chat.get_response(user_message, user_id)
-        
-        # Check conversation state
-        current_context = smart_chat.user_context.get(user_id)
-        current_service = smart_chat.active_service.get(user_id)
+        result, replayed = api_common.run_chat_turn_once(user_message, user_id, _idempotency_key(data))
+        response = jsonify(result)
+        if replayed:
+            response.headers[REPLAYED_HEADER] = 'true'
+        return response
         
-        # Check if PDF was generated
-        pdf_generated = 'PDF Created Successfully' in response
-        pdf_file = None
+    except IdempotencyError as e:
+        return jsonify({'success': False, 'error': str(e)}), 422
         
-        if pdf_generated:
-            # Extract filename from response
-            lines = response.split('\n')
-            for line in lines:
-                if 'FastSewa_Quote_' in line and '.pdf' in line:
-                    pdf_file = line.split(': ')[1]
-                    break
+    except TimeoutError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409, {'Retry-After': '1'}
         
-        return jsonify({
-            'success': True,
-            'response': response,
-            'context': current_context,
-            'service': current_service,
-            'needs_input': current_context is not None,
-            'pdf_generated': pdf_generated,
-            'pdf_file': pdf_file,
-            'user_id': user_id
-        })
+    except Overloaded as e:
+        # Fail fast instead of queueing behind other users' PDFs
+        return jsonify(api_common.overloaded_payload(e, user_id)), 429, {'Retry-After': str(e.retry_after)}
         
     except Exception as e:
         return jsonify({
@@ -63,44 +122,146 @@ def chat_endpoint():
             'needs_input': False
         }), 500
 
-@app.route('/api/services', methods=['GET'])
+@api.route('/api/chat/batch', methods=['POST'])
+def chat_batch_endpoint():
+    """
+    Handle many chat messages in one request (e.g. WhatsApp/SMS gateway)
+    
+    Body: {"messages": [{"user_id": "...", "message": "..."}, ...]}
+    Different users run concurrently; each user's messages run in order.
+    Results come back in input order.
+    """
+    try:
+        results, per_user = api_common.group_batch(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    futures = [_batch_executor.submit(api_common.run_user_messages, user_items)
+               for user_items in per_user.values()]
+    for future in futures:
+        for index, result in future.result():
+            results[index] = result
+    
+    return jsonify(api_common.batch_payload(results))
+
+def follow_pdf_job(job_id):
+    """Yields SSE progress events for a queued PDF until it finishes"""
+    deadline = time.monotonic() + api_common.STREAM_PDF_TIMEOUT
+    last_update = None
+    last_sent = time.monotonic()
+    
+    while time.monotonic() < deadline:
+        event, payload = api_common.pdf_job_update(job_id)
+        if event != 'progress':
+            yield api_common.sse_event(event, payload)
+            return
+        
+        if payload != last_update:
+            yield api_common.sse_event(event, payload)
+            last_update = payload
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent > api_common.STREAM_KEEPALIVE:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        
+        time.sleep(api_common.STREAM_POLL_INTERVAL)
+    
+    yield api_common.stream_timeout_event(job_id)
+
+@api.route('/api/chat/stream', methods=['POST'])
+def chat_stream_endpoint():
+    """
+    Chat over Server-Sent Events
+    
+    Events: 'message' (the reply, same fields as /api/chat, sent at once),
+    'progress' (PDF queued/rendering), then 'done' with the download link,
+    or 'error' / 'timeout'.
+    """
+    data = request.get_json(silent=True) or {}
+    user_message = data.get('message', '')
+    user_id = data.get('user_id', 'default')
+    idempotency_key = _idempotency_key(data)
+    
+    def generate():
+        try:
+            result, _ = api_common.run_chat_turn_once(user_message, user_id, idempotency_key)
+        except IdempotencyError as e:
+            yield api_common.sse_event('error', {'success': False, 'response': str(e)})
+            return
+        except Overloaded as e:
+            yield api_common.sse_event('error', api_common.overloaded_payload(e, user_id))
+            return
+        except Exception as e:
+            yield api_common.sse_event('error', {'success': False, 'response': f"System error: {str(e)}"})
+            return
+        
+        yield api_common.sse_event('message', result)
+        
+        if result['pdf_file']:
+            yield api_common.sse_event('done', {
+                'pdf_file': result['pdf_file'],
+                'download_url': f"/api/download-pdf/{result['pdf_file']}"
+            })
+        elif result['pdf_job_id']:
+            yield from follow_pdf_job(result['pdf_job_id'])
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@api.route('/api/services', methods=['GET'])
 def get_services():
     """Get all available services"""
-    services = []
-    for code, name in smart_chat.SERVICES.items():
-        icon_map = {
-            "FS_BUILD": "🏗️",
-            "FS_SECURE": "🛡️", 
-            "FS_LEGAL": "⚖️",
-            "FS_MEDICAL": "🏥",
-            "FS_LAND": "📋",
-            "FS_REPAIR": "🔧"
-        }
-        services.append({
-            'id': code,
-            'name': name,
-            'icon': icon_map.get(code, '📌')
-        })
-    
-    return jsonify({
-        'success': True,
-        'services': services,
-        'total': len(services)
-    })
-
-@app.route('/api/download-pdf/<filename>', methods=['GET'])
+    return jsonify(api_common.list_services())
+
+@api.route('/api/quote-pdf', methods=['POST'])
+def quote_pdf():
+    """
+    Renders a quote and returns the PDF in this response: nothing is read
+    back from disk and no second download request is needed. See
+    api_common.render_quote_pdf for the body.
+    """
+    try:
+        filename, pdf_bytes = api_common.render_quote_pdf(request.get_json(silent=True))
+        return Response(pdf_bytes, headers=api_common.pdf_response_headers(filename, pdf_bytes))
+    
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    except Overloaded as e:
+        return jsonify({'success': False, 'status': 'overloaded', 'error': str(e),
+                        'retry_after': e.retry_after}), 429, {'Retry-After': str(e.retry_after)}
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': f"PDF Generation Failed: {str(e)}"}), 500
+
+@api.route('/api/download-pdf/<filename>', methods=['GET'])
 def download_pdf(filename):
-    """Download generated PDF"""
+    """Download generated PDF (from memory if it was rendered in memory)"""
+    pdf_bytes = pdf_memory.get(filename)
+    if pdf_bytes is not None:
+        return Response(pdf_bytes, headers=api_common.pdf_response_headers(filename, pdf_bytes))
+    
     try:
-        filepath = os.path.join('generated_pdfs', filename)
-        if os.path.exists(filepath):
+        filepath = api_common.wait_for_pdf_file(filename)
+        if filepath is not None:
             return send_file(filepath, as_attachment=True)
         else:
             return jsonify({'success': False, 'error': 'File not found'}), 404
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-@app.route('/api/reset-session', methods=['POST'])
+@api.route('/api/pdf-status/<job_id>', methods=['GET'])
+def pdf_status(job_id):
+    """Status of a queued PDF job: queued, rendering, done or failed"""
+    status = api_common.pdf_job_status(job_id)
+    if status is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify(status)
+
+@api.route('/api/reset-session', methods=['POST'])
 def reset_session():
     """Reset user session"""
     data = request.json
@@ -110,28 +271,93 @@ def reset_session():
         return jsonify({'success': True, 'message': 'Session reset'})
     return jsonify({'success': False, 'message': 'User ID required'}), 400
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
-        'success': True,
-        'status': 'online',
-        'services': len(smart_chat.SERVICES),
-        'timestamp': datetime.now().isoformat()
-    })
+    return jsonify(api_common.health_status())
+
+@api.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics (stage timings, chat and PDF counters)"""
+    return Response(metrics.render_prometheus(), content_type=metrics.CONTENT_TYPE)
+
+# =============================================
+# FRONTEND (optional)
+# =============================================
+
+# Catch-all: other methods are listed so unknown API calls still get the
+# JSON 404 rather than a 405 from this rule
+@frontend.route('/', defaults={'path': ''}, methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+@frontend.route('/<path:path>', methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+def frontend_file(path):
+    """Precompressed site files with ETag / 304 support"""
+    if request.method not in ('GET', 'HEAD'):
+        return not_found(None)
+    
+    result = static_assets.respond(
+        path,
+        version=request.args.get('v'),
+        if_none_match=request.headers.get('If-None-Match'),
+        accept_encoding=request.headers.get('Accept-Encoding', '')
+    )
+    if result is None:
+        return not_found(None)
+    
+    status, headers, body = result
+    return Response(body, status=status, headers=headers)
 
 # =============================================
 # ERROR HANDLERS
 # =============================================
 
-@app.errorhandler(404)
 def not_found(error):
     return jsonify({'success': False, 'error': 'Endpoint not found'}), 404
 
-@app.errorhandler(500)
 def server_error(error):
     return jsonify({'success': False, 'error': 'Internal server error'}), 500
 
+# =============================================
+# APP FACTORY
+# =============================================
+
+def create_app(chat_config=None, pdf_config=None, freeze=True, serve_frontend=None):
+    """
+    Builds the Flask app and loads the shared read-only state.
+    
+    Args:
+        chat_config (smart_chat.ChatConfig): Defaults to queued PDFs
+        pdf_config (pdf_generator.PDFConfig): Defaults to module settings
+        freeze (bool): Move everything loaded so far out of the garbage
+            collector's reach (gc.freeze), so forked workers don't copy
+            those pages just by running a collection
+        serve_frontend (bool): Serve the website too (default static_assets.SERVE_FRONTEND)
+    """
+    global static_assets
+    
+    app = Flask(__name__, static_folder=None)
+    CORS(app)  # Enable cross-origin for frontend
+    app.register_blueprint(api)
+    app.register_error_handler(404, not_found)
+    app.register_error_handler(500, server_error)
+    
+    # PDFs are rendered by the background worker (python -m pdf_worker),
+    # not in the chat request
+    smart_chat.init(chat_config or smart_chat.ChatConfig(pdf_mode='queue'))
+    pdf_generator.init(pdf_config)
+    
+    if frontend_assets.SERVE_FRONTEND if serve_frontend is None else serve_frontend:
+        static_assets = frontend_assets.StaticAssets(frontend_assets.FRONTEND_DIR,
+                                                     cache_dir=frontend_assets.STATIC_CACHE_DIR)
+        app.register_blueprint(frontend)
+    
+    if freeze and hasattr(gc, 'freeze'):
+        gc.collect()
+        gc.freeze()
+    
+    return app
+
+app = create_app()
+
 # =============================================
 # STARTUP
 # =============================================
@@ -144,9 +370,18 @@ if __name__ == '__main__':
     print(f"   - Chatbot: Ready")
     print("\n🌐 API Endpoints:")
     print("   POST /api/chat        - Chat with bot")
+    print("   POST /api/chat/batch  - Many messages in one request")
+    print("   POST /api/chat/stream - Chat with PDF progress (SSE)")
     print("   GET  /api/services    - List all services")
+    print("   GET  /api/pdf-status/<job_id> - PDF job status")
     print("   GET  /api/health      - Health check")
+    print("   GET  /api/metrics     - Prometheus metrics")
     print("\n🔗 Frontend Integration:")
     print("   Chatbot URL: http://localhost:5000/api/chat")
+    if static_assets is not None:
+        stats = static_assets.snapshot()
+        print(f"   Website:     http://localhost:5000/ ({stats['files']} files, "
+              f"{stats['bytes'] // 1024} KB -> {stats['compressed_bytes'] // 1024} KB compressed)")
+    print("\n🖨️  PDFs are rendered by the worker: python -m pdf_worker")
     
     app.run(debug=True, port=5000, host='0.0.0.0')
\ No newline at end of file
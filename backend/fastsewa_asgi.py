@@ -0,0 +1,495 @@
+"""
+FastSewa ASGI API
+asyncio variant of fastsewa_api.py: same routes. The event loop only
+parses and sends; chat turns (session store and PDF queue I/O) run on a
+small thread pool and PDF rendering goes to a bounded thread pool.
+
+Run:
+    uvicorn fastsewa_asgi:app --port 5000
+    python fastsewa_asgi.py
+"""
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote
+
+import api_common
+import metrics
+from admission import Overloaded
+from idempotency import KEY_HEADER, REPLAYED_HEADER, IdempotencyError
+from pdf_memory import pdf_memory
+import pdf_generator
+import pdf_queue
+import pdf_worker
+import smart_chat
+from static_assets import FRONTEND_DIR, SERVE_FRONTEND, STATIC_CACHE_DIR, StaticAssets
+
+# =============================================
+# CONFIGURATION
+# =============================================
+
+RENDER_WORKERS = 2          # PDFs rendered at the same time
+RENDER_POLL_INTERVAL = 0.5  # seconds between queue checks when idle
+CHAT_WORKERS = 8            # chat turns running at the same time
+MAX_BODY_BYTES = 64 * 1024
+
+# Chat turns only queue the PDF (set at startup, see lifespan); this app's
+# render loop (or an external python -m pdf_worker) renders it
+CHAT_CONFIG = smart_chat.ChatConfig(pdf_mode='queue')
+
+CORS_HEADERS = [
+    (b'access-control-allow-origin', b'*'),
+    (b'access-control-allow-methods', b'GET, POST, OPTIONS'),
+    (b'access-control-allow-headers', b'Content-Type, Idempotency-Key'),
+]
+
+# =============================================
+# RESPONSE HELPERS
+# =============================================
+
+async def send_json(send, payload, status=200, headers=()):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode())] + list(headers) + CORS_HEADERS
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+def header_value(scope, name):
+    """First request header called `name` (case-insensitive), or None"""
+    wanted = name.lower().encode('latin-1')
+    for header, value in scope['headers']:
+        if header == wanted:
+            return value.decode('latin-1')
+    return None
+
+class BodyTooLarge(Exception):
+    """Request body over MAX_BODY_BYTES (app() answers 413)"""
+
+async def read_json(receive):
+    """Reads the request body and parses it as JSON (None if empty/invalid)"""
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise BodyTooLarge(f"Request body too large (max {MAX_BODY_BYTES} bytes)")
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            break
+    try:
+        return json.loads(b''.join(chunks))
+    except ValueError:
+        return None
+
+async def read_json_object(receive):
+    """read_json for endpoints that take a JSON object ({} for anything else)"""
+    data = await read_json(receive)
+    return data if isinstance(data, dict) else {}
+
+# =============================================
+# BACKGROUND PDF RENDERING
+# =============================================
+
+class RenderService:
+    """Drains the PDF queue into a bounded executor while the app runs"""
+
+    def __init__(self, workers=RENDER_WORKERS):
+        self.workers = workers
+        self.executor = None
+        self.wake = None
+        self.task = None
+
+    def start(self):
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='pdf-render')
+        self.wake = asyncio.Event()
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def notify(self):
+        """Called after a chat turn queued a PDF, so it starts without waiting for the poll"""
+        if self.wake is not None:
+            self.wake.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.workers)
+
+        requeued = await loop.run_in_executor(None, pdf_queue.requeue_stale_jobs)
+        if requeued:
+            print(f"🔁 Requeued {requeued} job(s) left by a stopped worker")
+        await loop.run_in_executor(None, pdf_queue.purge_finished_jobs)
+        last_sweep = loop.time()
+
+        while True:
+            await slots.acquire()
+            self.wake.clear()
+            job = await loop.run_in_executor(None, pdf_queue.claim_next_job)
+
+            if job is None:
+                slots.release()
+                # Same periodic sweep as pdf_worker.run
+                if loop.time() - last_sweep > pdf_queue.LEASE_SECONDS / 2:
+                    await loop.run_in_executor(None, pdf_queue.requeue_stale_jobs)
+                    await loop.run_in_executor(None, pdf_queue.purge_finished_jobs)
+                    last_sweep = loop.time()
+                try:
+                    await asyncio.wait_for(self.wake.wait(), RENDER_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            future = loop.run_in_executor(self.executor, pdf_worker.process_job, job)
+            future.add_done_callback(lambda _: slots.release())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        pdf_generator.shutdown_renderer_pool()
+
+renderer = RenderService()
+
+# Chat turns and other session / SQLite work, kept off the event loop
+chat_executor = None
+
+async def run_blocking(func, *args):
+    """Runs func(*args) on the chat thread pool"""
+    return await asyncio.get_running_loop().run_in_executor(chat_executor, func, *args)
+
+# =============================================
+# API ENDPOINTS
+# =============================================
+
+async def chat_endpoint(scope, receive, send):
+    """Handle chat messages from frontend"""
+    data = await read_json_object(receive)
+    user_id = 'default'
+    try:
+        user_message = data.get('message', '')
+        user_id = data.get('user_id', 'default')
+        key = header_value(scope, KEY_HEADER) or data.get('idempotency_key')
+
+        result, replayed = await run_blocking(api_common.run_chat_turn_once, user_message, user_id, key)
+        if result['pdf_job_id'] and not replayed:
+            renderer.notify()
+
+        await send_json(send, result,
+                        headers=[(REPLAYED_HEADER.lower().encode(), b'true')] if replayed else ())
+
+    except IdempotencyError as e:
+        await send_json(send, {'success': False, 'error': str(e)}, status=422)
+
+    except TimeoutError as e:
+        await send_json(send, {'success': False, 'error': str(e)}, status=409,
+                        headers=[(b'retry-after', b'1')])
+
+    except Overloaded as e:
+        await send_json(send, api_common.overloaded_payload(e, user_id), status=429,
+                        headers=[(b'retry-after', str(e.retry_after).encode())])
+
+    except Exception as e:
+        await send_json(send, {
+            'success': False,
+            'response': f"System error: {str(e)}",
+            'context': None,
+            'service': None,
+            'needs_input': False
+        }, status=500)
+
+async def chat_batch_endpoint(scope, receive, send):
+    """Many chat messages in one request (see fastsewa_api.chat_batch_endpoint)"""
+    try:
+        results, per_user = api_common.group_batch(await read_json(receive))
+    except ValueError as e:
+        await send_json(send, {'success': False, 'error': str(e)}, status=400)
+        return
+
+    done = await asyncio.gather(*(run_blocking(api_common.run_user_messages, user_items)
+                                  for user_items in per_user.values()))
+    for user_results in done:
+        for index, result in user_results:
+            results[index] = result
+    if any(result.get('pdf_job_id') for result in results):
+        renderer.notify()
+
+    await send_json(send, api_common.batch_payload(results))
+
+async def chat_stream_endpoint(scope, receive, send):
+    """
+    Chat over Server-Sent Events (see fastsewa_api.chat_stream_endpoint):
+    'message', then 'progress' / 'done' for the PDF, or 'error' / 'timeout'
+    """
+    data = await read_json_object(receive)
+    user_message = data.get('message', '')
+    user_id = data.get('user_id', 'default')
+    key = header_value(scope, KEY_HEADER) or data.get('idempotency_key')
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no')] + CORS_HEADERS
+    })
+
+    async def emit(chunk):
+        await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+
+    try:
+        result, replayed = await run_blocking(api_common.run_chat_turn_once, user_message, user_id, key)
+    except IdempotencyError as e:
+        await emit(api_common.sse_event('error', {'success': False, 'response': str(e)}))
+        result = None
+    except Overloaded as e:
+        await emit(api_common.sse_event('error', api_common.overloaded_payload(e, user_id)))
+        result = None
+    except Exception as e:
+        await emit(api_common.sse_event('error', {'success': False, 'response': f"System error: {str(e)}"}))
+        result = None
+
+    if result is not None:
+        await emit(api_common.sse_event('message', result))
+        if result['pdf_file']:
+            await emit(api_common.sse_event('done', {
+                'pdf_file': result['pdf_file'],
+                'download_url': f"/api/download-pdf/{result['pdf_file']}"
+            }))
+        elif result['pdf_job_id']:
+            if not replayed:
+                renderer.notify()
+            await follow_pdf_job(result['pdf_job_id'], emit)
+
+    await send({'type': 'http.response.body', 'body': b''})
+
+async def follow_pdf_job(job_id, emit):
+    """Sends SSE progress events for a queued PDF until it finishes"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + api_common.STREAM_PDF_TIMEOUT
+    last_update = None
+    last_sent = loop.time()
+
+    while loop.time() < deadline:
+        event, payload = await run_blocking(api_common.pdf_job_update, job_id)
+        if event != 'progress':
+            await emit(api_common.sse_event(event, payload))
+            return
+
+        if payload != last_update:
+            await emit(api_common.sse_event(event, payload))
+            last_update = payload
+            last_sent = loop.time()
+        elif loop.time() - last_sent > api_common.STREAM_KEEPALIVE:
+            await emit(": keep-alive\n\n")
+            last_sent = loop.time()
+
+        await asyncio.sleep(api_common.STREAM_POLL_INTERVAL)
+
+    await emit(api_common.stream_timeout_event(job_id))
+
+async def services_endpoint(scope, receive, send):
+    """Get all available services"""
+    await send_json(send, api_common.list_services())
+
+async def reset_session_endpoint(scope, receive, send):
+    """Reset user session"""
+    data = await read_json_object(receive)
+    user_id = data.get('user_id')
+    if user_id:
+        await run_blocking(smart_chat.reset_user_session, user_id)
+        await send_json(send, {'success': True, 'message': 'Session reset'})
+    else:
+        await send_json(send, {'success': False, 'message': 'User ID required'}, status=400)
+
+async def health_endpoint(scope, receive, send):
+    """Health check endpoint"""
+    await send_json(send, await run_blocking(api_common.health_status))
+
+async def metrics_endpoint(scope, receive, send):
+    """Prometheus metrics (stage timings, chat and PDF counters)"""
+    body = metrics.render_prometheus().encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [(b'content-type', metrics.CONTENT_TYPE.encode()),
+                    (b'content-length', str(len(body)).encode())] + CORS_HEADERS
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def pdf_status_endpoint(scope, receive, send, job_id):
+    """Status of a queued PDF job: queued, rendering, done or failed"""
+    loop = asyncio.get_running_loop()
+    status = await loop.run_in_executor(chat_executor, api_common.pdf_job_status, job_id)
+    if status is None:
+        await send_json(send, {'success': False, 'error': 'Job not found'}, status=404)
+    else:
+        await send_json(send, status)
+
+async def send_pdf(send, filename, body):
+    headers = [(name.lower().encode(), value.encode())
+               for name, value in api_common.pdf_response_headers(filename, body).items()]
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': headers + CORS_HEADERS
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def quote_pdf_endpoint(scope, receive, send):
+    """Renders a quote and returns the PDF in this response (see api_common.render_quote_pdf)"""
+    data = await read_json(receive)
+    try:
+        loop = asyncio.get_running_loop()
+        filename, body = await loop.run_in_executor(renderer.executor, api_common.render_quote_pdf, data)
+    except ValueError as e:
+        await send_json(send, {'success': False, 'error': str(e)}, status=400)
+    except Overloaded as e:
+        await send_json(send, {'success': False, 'status': 'overloaded', 'error': str(e),
+                               'retry_after': e.retry_after}, status=429,
+                        headers=[(b'retry-after', str(e.retry_after).encode())])
+    except Exception as e:
+        await send_json(send, {'success': False, 'error': f"PDF Generation Failed: {str(e)}"}, status=500)
+    else:
+        await send_pdf(send, filename, body)
+
+async def download_pdf_endpoint(scope, receive, send, filename):
+    """Download generated PDF (from memory if it was rendered in memory)"""
+    body = pdf_memory.get(filename)
+    if body is not None:
+        await send_pdf(send, filename, body)
+        return
+
+    def read_file():
+        filepath = api_common.wait_for_pdf_file(filename)
+        if filepath is None:
+            raise FileNotFoundError(filename)
+        with open(filepath, 'rb') as f:
+            return f.read()
+
+    try:
+        body = await asyncio.get_running_loop().run_in_executor(chat_executor, read_file)
+    except FileNotFoundError:
+        await send_json(send, {'success': False, 'error': 'File not found'}, status=404)
+        return
+
+    await send_pdf(send, filename, body)
+
+ROUTES = {
+    ('POST', '/api/chat'): chat_endpoint,
+    ('POST', '/api/chat/batch'): chat_batch_endpoint,
+    ('POST', '/api/chat/stream'): chat_stream_endpoint,
+    ('POST', '/api/quote-pdf'): quote_pdf_endpoint,
+    ('GET', '/api/services'): services_endpoint,
+    ('POST', '/api/reset-session'): reset_session_endpoint,
+    ('GET', '/api/health'): health_endpoint,
+    ('GET', '/api/metrics'): metrics_endpoint,
+}
+
+PREFIX_ROUTES = [
+    ('GET', '/api/download-pdf/', download_pdf_endpoint),
+    ('GET', '/api/pdf-status/', pdf_status_endpoint),
+]
+
+static_assets = None   # built at startup when SERVE_FRONTEND is on
+
+async def frontend_file(scope, send):
+    """Precompressed site files with ETag / 304 support; False if not one"""
+    headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+    version = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('v', [None])[0]
+    result = static_assets.respond(scope['path'], version=version,
+                                   if_none_match=headers.get('if-none-match'),
+                                   accept_encoding=headers.get('accept-encoding', ''))
+    if result is None:
+        return False
+
+    status, response_headers, body = result
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in response_headers]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+    return True
+
+# =============================================
+# ASGI APPLICATION
+# =============================================
+
+async def lifespan(receive, send):
+    global static_assets, chat_executor
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            chat_executor = ThreadPoolExecutor(max_workers=CHAT_WORKERS, thread_name_prefix='chat-turn')
+            smart_chat.init(CHAT_CONFIG)
+            pdf_generator.init()
+            smart_chat.start_intent_reloader()
+            if SERVE_FRONTEND:
+                static_assets = StaticAssets(FRONTEND_DIR, cache_dir=STATIC_CACHE_DIR)
+            renderer.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await renderer.stop()
+            chat_executor.shutdown(wait=True)
+            smart_chat.intent_reloader.stop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    method, path = scope['method'], scope['path']
+
+    if method == 'OPTIONS':
+        await send({'type': 'http.response.start', 'status': 204, 'headers': CORS_HEADERS})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    try:
+        handler = ROUTES.get((method, path))
+        if handler is not None:
+            await handler(scope, receive, send)
+            return
+
+        for route_method, prefix, prefix_handler in PREFIX_ROUTES:
+            if method == route_method and path.startswith(prefix):
+                await prefix_handler(scope, receive, send, unquote(path[len(prefix):]))
+                return
+    except BodyTooLarge as e:
+        # Endpoints read the body before they start their response
+        await send_json(send, {'success': False, 'error': str(e)}, status=413)
+        return
+
+    if method == 'GET' and static_assets is not None and not path.startswith('/api/'):
+        if await frontend_file(scope, send):
+            return
+
+    await send_json(send, {'success': False, 'error': 'Endpoint not found'}, status=404)
+
+# =============================================
+# STARTUP
+# =============================================
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("❌ uvicorn is not installed. Run: pip install uvicorn")
+
+    print("🚀 FastSewa ASGI API Starting...")
+    print(f"   - PDF render workers: {RENDER_WORKERS}")
+    print(f"   - Chat workers: {CHAT_WORKERS}")
+    uvicorn.run(app, host='0.0.0.0', port=5000)
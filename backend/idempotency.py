@@ -0,0 +1,301 @@
+"""
+Idempotent Chat Turns
+A chat message sent twice (double tap, client retry) must not advance
+the user's flow twice or render two PDFs.
+
+The client sends an idempotency key with each message (a new one per
+message, the same one on retries). For a given user and key:
+- the first request runs the turn;
+- duplicates arriving while it runs wait for it and share its result;
+- duplicates within IDEMPOTENCY_TTL seconds get the stored result.
+Only successful turns are stored; a failed one can be retried.
+
+Results live in this process. With several workers (sqlite session
+backend) they are also kept in the shared SQLite file, so a retry that
+lands on another worker gets the same answer (SharedTurnResults).
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# =============================================
+# CONFIGURATION
+# =============================================
+
+IDEMPOTENCY_TTL = 10 * 60       # seconds a result is kept for retries
+IDEMPOTENCY_MAX_ENTRIES = 10000
+IDEMPOTENCY_WAIT_TIMEOUT = 120  # seconds a duplicate waits for the original
+MAX_KEY_LENGTH = 128
+SHARED_POLL_INTERVAL = 0.05     # seconds between checks on another worker's turn
+SHARED_PURGE_INTERVAL = 60      # seconds between deletes of expired rows
+
+KEY_HEADER = 'Idempotency-Key'           # or "idempotency_key" in the JSON body
+REPLAYED_HEADER = 'Idempotent-Replayed'  # set on responses shared with a duplicate
+
+# =============================================
+# ERRORS
+# =============================================
+
+class IdempotencyError(ValueError):
+    """Key reused for a different message, or not a usable key (answered with 422)"""
+
+# =============================================
+# RESULT CACHE
+# =============================================
+
+class _InFlight:
+    __slots__ = ('message', 'done', 'result', 'error')
+
+    def __init__(self, message):
+        self.message = message
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class IdempotentTurns:
+    """
+    Runs each (user_id, key) once and hands the result to every duplicate.
+
+    Args:
+        ttl (int): Seconds a finished result is kept
+        max_entries (int): Cap on kept results (oldest dropped first)
+    """
+
+    def __init__(self, ttl=IDEMPOTENCY_TTL, max_entries=IDEMPOTENCY_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.shared = None              # SharedTurnResults, see share_through()
+        self._results = OrderedDict()   # (user_id, key) -> (expires, message, result), oldest first
+        self._in_flight = {}            # (user_id, key) -> _InFlight
+        self._lock = threading.Lock()
+        self.stats = {'executed': 0, 'replayed': 0, 'coalesced': 0, 'conflicts': 0, 'shared_hits': 0}
+
+    def share_through(self, db_path):
+        """Also keeps results in the SQLite file `db_path`, for every worker"""
+        if self.shared is None or self.shared.db_path != db_path:
+            self.shared = SharedTurnResults(db_path, self.ttl)
+
+    def run(self, user_id, key, message, turn):
+        """
+        Returns (result, replayed): turn() runs unless a result for this
+        key is stored or being produced; replayed is True when the result
+        came from another request.
+
+        Raises:
+            IdempotencyError: the key was used for a different message
+            TimeoutError: the original request didn't finish in time
+        """
+        cache_key = (user_id, key)
+        now = time.monotonic()
+
+        with self._lock:
+            self._expire(now)
+
+            stored = self._results.get(cache_key)
+            if stored is not None:
+                self._check_message(stored[1], message)
+                self.stats['replayed'] += 1
+                return stored[2], True
+
+            call = self._in_flight.get(cache_key)
+            if call is not None:
+                self._check_message(call.message, message)
+                self.stats['coalesced'] += 1
+                owner = False
+            else:
+                call = self._in_flight[cache_key] = _InFlight(message)
+                self.stats['executed'] += 1
+                owner = True
+
+        if not owner:
+            if not call.done.wait(IDEMPOTENCY_WAIT_TIMEOUT):
+                raise TimeoutError("The original request is still running")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        replayed = False
+        try:
+            if self.shared is None:
+                call.result = turn()
+            else:
+                call.result, replayed = self._run_shared(user_id, key, message, turn)
+        except BaseException as e:
+            call.error = e
+            raise
+        else:
+            with self._lock:
+                self._results[cache_key] = (time.monotonic() + self.ttl, message, call.result)
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+            return call.result, replayed
+        finally:
+            with self._lock:
+                self._in_flight.pop(cache_key, None)
+            call.done.set()
+
+    def _run_shared(self, user_id, key, message, turn):
+        """
+        The first request in this process: runs the turn unless another
+        worker has the result or is producing it
+        """
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_TIMEOUT
+        while True:
+            state, original, result = self.shared.claim(user_id, key, message)
+            if state == SharedTurnResults.CLAIMED:
+                break
+            self._check_message(original, message)
+            if state == SharedTurnResults.DONE:
+                self.stats['shared_hits'] += 1
+                return result, True
+            # Running on another worker: wait (a failed turn frees the key)
+            if time.monotonic() > deadline:
+                raise TimeoutError("The original request is still running")
+            time.sleep(SHARED_POLL_INTERVAL)
+
+        try:
+            result = turn()
+        except BaseException:
+            self.shared.release(user_id, key)
+            raise
+        self.shared.finish(user_id, key, result)
+        return result, False
+
+    def _check_message(self, original, message):
+        if original != message:
+            self.stats['conflicts'] += 1
+            raise IdempotencyError("Idempotency key already used for a different message")
+
+    def _expire(self, now):
+        results = self._results
+        while results:
+            cache_key, (expires, _, _) = next(iter(results.items()))
+            if expires > now:
+                break
+            del results[cache_key]
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, stored=len(self._results), in_flight=len(self._in_flight),
+                        ttl=self.ttl, shared=self.shared.db_path if self.shared else None)
+
+    def reset_after_fork(self):
+        self._results = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        if self.shared is not None:
+            self.shared.reset_after_fork()
+
+
+# =============================================
+# SHARED RESULTS (SQLITE)
+# =============================================
+
+class SharedTurnResults:
+    """
+    Idempotency results in a SQLite file shared by all workers (the
+    session database). A row without a result marks a turn in progress;
+    it expires after IDEMPOTENCY_WAIT_TIMEOUT in case its worker died.
+
+    Args:
+        db_path (str): SQLite file path
+        ttl (int): Seconds a finished result is kept
+    """
+
+    CLAIMED, RUNNING, DONE = 'claimed', 'running', 'done'
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS idempotent_turns (
+        user_id TEXT NOT NULL,
+        key     TEXT NOT NULL,
+        message TEXT NOT NULL,
+        result  TEXT,
+        expires REAL NOT NULL,
+        PRIMARY KEY (user_id, key)
+    );
+    CREATE INDEX IF NOT EXISTS idx_idempotent_turns_expires ON idempotent_turns (expires);
+    """
+
+    def __init__(self, db_path, ttl=IDEMPOTENCY_TTL):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self._SCHEMA)
+
+    def _conn(self):
+        """One connection per thread (sqlite3 connections are not shared)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def reset_after_fork(self):
+        """The parent's connections must not be used in a forked worker"""
+        self._local = threading.local()
+
+    def claim(self, user_id, key, message):
+        """
+        Returns (state, message, result): CLAIMED if this caller must run
+        the turn, RUNNING or DONE (with the result) if another one has
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if now - self._last_purge > SHARED_PURGE_INTERVAL:
+                conn.execute("DELETE FROM idempotent_turns WHERE expires < ?", (now,))
+                self._last_purge = now
+            else:
+                conn.execute("DELETE FROM idempotent_turns WHERE user_id = ? AND key = ? AND expires < ?",
+                             (user_id, key, now))
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO idempotent_turns (user_id, key, message, result, expires) "
+                "VALUES (?, ?, ?, NULL, ?)",
+                (user_id, key, message, now + IDEMPOTENCY_WAIT_TIMEOUT)
+            ).rowcount
+            row = None if inserted else conn.execute(
+                "SELECT message, result FROM idempotent_turns WHERE user_id = ? AND key = ?",
+                (user_id, key)
+            ).fetchone()
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return self.CLAIMED, message, None
+        if row[1] is None:
+            return self.RUNNING, row[0], None
+        return self.DONE, row[0], json.loads(row[1])
+
+    def finish(self, user_id, key, result):
+        self._conn().execute(
+            "UPDATE idempotent_turns SET result = ?, expires = ? WHERE user_id = ? AND key = ?",
+            (json.dumps(result), time.time() + self.ttl, user_id, key)
+        )
+
+    def release(self, user_id, key):
+        """The turn failed: frees the key so a retry can run it"""
+        self._conn().execute(
+            "DELETE FROM idempotent_turns WHERE user_id = ? AND key = ? AND result IS NULL",
+            (user_id, key)
+        )
+
+
+def clean_key(key):
+    """The key as sent by the client (None if there is none)"""
+    if key is None:
+        return None
+    if not isinstance(key, str) or len(key.strip()) > MAX_KEY_LENGTH:
+        raise IdempotencyError(f"Idempotency key must be a string of at most {MAX_KEY_LENGTH} characters")
+    return key.strip() or None
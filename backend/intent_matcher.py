@@ -0,0 +1,254 @@
+"""
+Compiled Intent Matchers
+- IntentMatcher: Aho-Corasick automaton over all intents.json patterns
+  (exact substring matching, built once at load)
+- FuzzyIntentMatcher: token inverted index with TF-IDF scoring, for
+  messages that don't contain any pattern word-for-word
+"""
+
+import math
+import re
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # optional: pure-Python scoring is used instead
+    np = None
+
+# =============================================
+# EXACT MATCHER
+# =============================================
+
+NO_MATCH = -1
+
+
+class IntentMatcher:
+    """
+    Finds the first intent (in intents.json order) that has any pattern
+    contained in the message, scanning the message only once.
+
+    Same result as the original loop:
+        for intent in intents:
+            for pattern in intent['patterns']:
+                if pattern.lower() in message.lower(): return intent
+    """
+
+    def __init__(self, intents):
+        self.intents = list(intents)
+
+        # Trie stored as parallel lists indexed by node id (0 = root)
+        self._goto = [{}]        # char -> child node
+        self._fail = [0]         # failure link
+        self._best = [len(self.intents)]  # lowest intent index ending here
+
+        self._always = len(self.intents)  # intent with an empty pattern
+
+        for index, intent in enumerate(self.intents):
+            for pattern in intent.get('patterns', []):
+                self._add(pattern.lower(), index)
+
+        self._build_links()
+
+    def _add(self, pattern, index):
+        """Insert one lowercased pattern into the trie"""
+        if not pattern:
+            # "" in text is always True in the original loop
+            self._always = min(self._always, index)
+            return
+
+        node = 0
+        for ch in pattern:
+            child = self._goto[node].get(ch)
+            if child is None:
+                child = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(len(self.intents))
+                self._goto[node][ch] = child
+            node = child
+
+        if index < self._best[node]:
+            self._best[node] = index
+
+    def _build_links(self):
+        """Breadth-first pass to set failure links and merge outputs"""
+        goto, fail, best = self._goto, self._fail, self._best
+        queue = list(goto[0].values())
+
+        for node in queue:
+            for ch, child in goto[node].items():
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                link = goto[state].get(ch, 0)
+                fail[child] = link if link != child else 0
+
+                # A node also "ends" every pattern that ends at its fail link
+                if best[fail[child]] < best[child]:
+                    best[child] = best[fail[child]]
+
+                queue.append(child)
+
+    def match_index(self, text_lower):
+        """
+        Returns the index of the winning intent, or NO_MATCH.
+        `text_lower` must already be lowercased.
+        """
+        goto, fail, best = self._goto, self._fail, self._best
+        winner = self._always
+        node = 0
+
+        for ch in text_lower:
+            if winner == 0:
+                break
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if best[node] < winner:
+                winner = best[node]
+
+        return winner if winner < len(self.intents) else NO_MATCH
+
+    def match(self, text_lower):
+        """Returns the winning intent dict, or None"""
+        index = self.match_index(text_lower)
+        return self.intents[index] if index != NO_MATCH else None
+
+    @property
+    def node_count(self):
+        return len(self._goto)
+
+# =============================================
+# FUZZY MATCHER (TF-IDF)
+# =============================================
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset({
+    'a', 'an', 'the', 'i', 'me', 'my', 'we', 'our', 'you', 'your', 'is', 'am',
+    'are', 'to', 'for', 'of', 'in', 'on', 'at', 'with', 'and', 'or', 'some',
+    'please', 'can', 'could', 'want', 'would', 'like', 'get', 'it', 'this'
+})
+
+def tokenize(text_lower):
+    """Lowercased text -> content tokens, with a light plural strip (guards -> guard)"""
+    tokens = []
+    for token in _TOKEN_RE.findall(text_lower):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class FuzzyIntentMatcher:
+    """
+    Scores a message against every pattern with a TF-IDF cosine similarity.
+
+    Only postings of the message's own tokens are visited (inverted index)
+    and only the patterns they reach are scored, so lookup cost depends on
+    how many patterns share the message's tokens, not on how many there are.
+    Uses NumPy when installed, plain dicts otherwise.
+
+    Args:
+        intents (list): intents.json 'intents' list
+        threshold (float): Minimum similarity (0..1) to accept a match
+    """
+
+    def __init__(self, intents, threshold=0.5):
+        self.intents = list(intents)
+        self.threshold = threshold
+
+        # Patterns in intent order, so the lowest index wins a tie
+        pattern_tokens, self._pattern_intent = [], []
+        for index, intent in enumerate(self.intents):
+            for pattern in intent.get('patterns', []):
+                tokens = tokenize(pattern.lower())
+                if tokens:
+                    pattern_tokens.append(tokens)
+                    self._pattern_intent.append(index)
+
+        n = len(pattern_tokens)
+        doc_freq = {}
+        for tokens in pattern_tokens:
+            for token in set(tokens):
+                doc_freq[token] = doc_freq.get(token, 0) + 1
+        self.idf = {t: math.log((1 + n) / (1 + df)) + 1 for t, df in doc_freq.items()}
+        self.unknown_idf = math.log(1 + n) + 1   # a token no pattern uses
+
+        # Normalised TF-IDF weights, stored per token (inverted index)
+        postings = {}
+        for pid, tokens in enumerate(pattern_tokens):
+            weights = {}
+            for token in tokens:
+                weights[token] = weights.get(token, 0.0) + self.idf[token]
+            norm = math.sqrt(sum(w * w for w in weights.values()))
+            for token, weight in weights.items():
+                postings.setdefault(token, []).append((pid, weight / norm))
+
+        self.pattern_count = n
+        self._local = threading.local()
+        if np is not None:
+            self._index = {
+                token: (np.fromiter((p for p, _ in items), dtype=np.int32, count=len(items)),
+                        np.fromiter((w for _, w in items), dtype=np.float32, count=len(items)))
+                for token, items in postings.items()
+            }
+        else:
+            self._index = postings
+
+    def _scratch_scores(self):
+        """Per-thread array of pattern scores, all zero between lookups"""
+        scores = getattr(self._local, 'scores', None)
+        if scores is None:
+            scores = self._local.scores = np.zeros(self.pattern_count, dtype=np.float32)
+        return scores
+
+    def _query_vector(self, text_lower):
+        """
+        Normalised query weights for known tokens. Unknown tokens match
+        nothing but still count in the norm, so "home loan" does not score
+        like "home".
+        """
+        weights = {}
+        for token in tokenize(text_lower):
+            weights[token] = weights.get(token, 0.0) + self.idf.get(token, self.unknown_idf)
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        return {t: w / norm for t, w in weights.items() if t in self.idf} if norm else {}
+
+    def score(self, text_lower):
+        """Returns (best intent index or NO_MATCH, similarity)"""
+        query = self._query_vector(text_lower)
+        if not query:
+            return NO_MATCH, 0.0
+
+        if np is not None:
+            # Add up in this thread's zeroed scratch array, read back only
+            # the patterns reached, then zero those again
+            scores = self._scratch_scores()
+            for token, q_weight in query.items():
+                ids, weights = self._index[token]
+                scores[ids] += q_weight * weights
+            reached = np.concatenate([self._index[token][0] for token in query])
+            reached_scores = scores[reached]
+            scores[reached] = 0.0
+            top = reached_scores.max()
+            best_pattern = int(reached[reached_scores == top].min())   # lowest wins a tie
+            best_score = float(top)
+        else:
+            scores = {}
+            for token, q_weight in query.items():
+                for pid, weight in self._index[token]:
+                    scores[pid] = scores.get(pid, 0.0) + q_weight * weight
+            best_pattern = min(scores, key=lambda pid: (-scores[pid], pid))
+            best_score = scores[best_pattern]
+
+        return self._pattern_intent[best_pattern], best_score
+
+    def match(self, text_lower):
+        """Returns the best intent dict if it clears the threshold, else None"""
+        index, similarity = self.score(text_lower)
+        if index == NO_MATCH or similarity < self.threshold:
+            return None
+        return self.intents[index]
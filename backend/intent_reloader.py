@@ -0,0 +1,308 @@
+"""
+Intents Loading & Hot Reload
+Watches intents.json and rebuilds the compiled matchers in a background
+thread. A new file is validated and fully compiled before it is swapped
+in with a single reference assignment, so a chat turn always sees either
+the old intents or the new ones, never a mix.
+
+Compiled intents can also be kept in a binary snapshot next to the JSON,
+so a cold worker unpickles the matchers instead of building them:
+    python intent_reloader.py --snapshot intents.snapshot
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from datetime import datetime
+
+import metrics
+from intent_matcher import FuzzyIntentMatcher, IntentMatcher, np
+
+# =============================================
+# COMPILED INTENTS
+# =============================================
+
+class IntentsError(ValueError):
+    """intents.json is missing, unreadable or malformed"""
+
+
+class CompiledIntents:
+    """One immutable, ready-to-use version of intents.json"""
+
+    __slots__ = ('intents', 'matcher', 'fuzzy_matcher', 'signature', 'loaded_at')
+
+    def __init__(self, intents, fuzzy_threshold, signature=None):
+        self.intents = intents
+        self.matcher = IntentMatcher(intents)
+        self.fuzzy_matcher = FuzzyIntentMatcher(intents, threshold=fuzzy_threshold)
+        self.signature = signature
+        self.loaded_at = time.time()
+
+    @property
+    def pattern_count(self):
+        return sum(len(intent['patterns']) for intent in self.intents)
+
+
+def validate_intents(data):
+    """
+    Checks the intents.json structure and returns the 'intents' list.
+    Raises IntentsError describing the first problem found.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('intents'), list):
+        raise IntentsError("top level must be an object with an 'intents' list")
+
+    intents = data['intents']
+    if not intents:
+        raise IntentsError("'intents' is empty")
+
+    tags = set()
+    for position, intent in enumerate(intents):
+        where = f"intent #{position}"
+        if not isinstance(intent, dict):
+            raise IntentsError(f"{where} is not an object")
+
+        tag = intent.get('tag')
+        if not isinstance(tag, str) or not tag:
+            raise IntentsError(f"{where} has no 'tag'")
+        if tag in tags:
+            raise IntentsError(f"duplicate tag '{tag}'")
+        tags.add(tag)
+
+        for field in ('patterns', 'responses'):
+            values = intent.get(field)
+            if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+                raise IntentsError(f"'{tag}': '{field}' must be a list of strings")
+        if not intent['responses']:
+            raise IntentsError(f"'{tag}' has no responses")
+
+        if 'context_set' in intent and not isinstance(intent['context_set'], str):
+            raise IntentsError(f"'{tag}': 'context_set' must be a string")
+
+    return intents
+
+
+def file_signature(path):
+    """(mtime_ns, size) - changes whenever the file is rewritten"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_intents(path, fuzzy_threshold, snapshot_path=None):
+    """
+    Reads, validates and compiles intents.json into a CompiledIntents.
+
+    Args:
+        path (str): intents.json location
+        fuzzy_threshold (float): FuzzyIntentMatcher threshold
+        snapshot_path (str): Optional binary snapshot; used when it was built
+            from this exact intents.json, (re)written after compiling otherwise
+    """
+    try:
+        signature = file_signature(path)
+        with open(path, 'rb') as file:
+            raw = file.read()
+    except OSError as e:
+        raise IntentsError(f"cannot read {path}: {e}") from e
+
+    key = snapshot_key(raw)
+    if snapshot_path:
+        compiled = load_snapshot(snapshot_path, key)
+        if compiled is not None:
+            compiled.signature = signature
+            compiled.loaded_at = time.time()
+            compiled.fuzzy_matcher.threshold = fuzzy_threshold
+            return compiled
+
+    try:
+        data = json.loads(raw.decode('utf-8'))
+    except ValueError as e:
+        raise IntentsError(f"cannot read {path}: {e}") from e
+
+    compiled = CompiledIntents(validate_intents(data), fuzzy_threshold, signature)
+
+    if snapshot_path:
+        try:
+            save_snapshot(compiled, snapshot_path, key)
+        except OSError as e:
+            print(f"⚠️  Could not write intents snapshot {snapshot_path}: {e}")
+
+    return compiled
+
+# =============================================
+# BINARY SNAPSHOT
+# =============================================
+
+# Header: magic line + digest of the intents.json it was built from.
+# Snapshots are pickles - only load files this app wrote itself.
+SNAPSHOT_MAGIC = b'FASTSEWA-INTENTS 1\n'
+
+def snapshot_key(raw):
+    """Digest of the intents.json bytes (and of the index layout in use)"""
+    layout = b'numpy' if np is not None else b'python'
+    return hashlib.sha256(SNAPSHOT_MAGIC + layout + b'\0' + raw).digest()
+
+def save_snapshot(compiled, snapshot_path, key):
+    """Writes the compiled intents atomically (temp file + rename)"""
+    temp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(SNAPSHOT_MAGIC)
+        file.write(key)
+        pickle.dump(compiled, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, snapshot_path)
+
+def load_snapshot(snapshot_path, key):
+    """Returns the CompiledIntents stored for `key`, or None if missing, stale or unreadable"""
+    try:
+        with open(snapshot_path, 'rb') as file:
+            if file.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC or file.read(len(key)) != key:
+                return None
+            compiled = pickle.load(file)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError):
+        return None
+
+    return compiled if isinstance(compiled, CompiledIntents) else None
+
+# =============================================
+# RELOADER
+# =============================================
+
+class IntentReloader:
+    """
+    Polls intents.json and swaps in a rebuilt CompiledIntents on change.
+
+    Args:
+        path (str): intents.json location
+        current (callable): Returns the CompiledIntents in use
+        swap (callable): Installs a new CompiledIntents
+        fuzzy_threshold (callable): Returns the threshold to build with
+        interval (float): Seconds between file checks
+        snapshot_path (str): Optional binary snapshot kept up to date
+    """
+
+    def __init__(self, path, current, swap, fuzzy_threshold, interval=2.0, snapshot_path=None):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.current = current
+        self.swap = swap
+        self.fuzzy_threshold = fuzzy_threshold
+        self.interval = interval
+
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_duration = None
+        self._failed_signature = None
+
+        self._lock = threading.Lock()   # one rebuild at a time
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='intents-reloader', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def reset_after_fork(self):
+        """The watcher thread does not survive fork(); call start() again in the child"""
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:  # never let the watcher thread die
+                print(f"❌ Intents reloader error: {e}")
+
+    def check(self):
+        """Reloads if the file changed since the version in use; returns True if swapped"""
+        try:
+            signature = file_signature(self.path)
+        except OSError:
+            return False    # mid-replace or deleted: keep serving the current intents
+
+        if signature == self.current().signature or signature == self._failed_signature:
+            return False
+        return self.reload()
+
+    def reload(self):
+        """Rebuilds from disk now; the current intents stay in use if the new file is invalid"""
+        with self._lock:
+            started = time.perf_counter()
+            signature = self._signature_or_none()
+            try:
+                compiled = load_intents(self.path, self.fuzzy_threshold(), self.snapshot_path)
+            except IntentsError as e:
+                duration = time.perf_counter() - started
+                self.failures += 1
+                self.last_error = str(e)
+                self._failed_signature = signature
+                metrics.INTENT_RELOADS.inc('failed')
+                print(f"❌ intents.json reload failed after {duration * 1000:.1f} ms: {e}")
+                return False
+
+            self.swap(compiled)
+            duration = time.perf_counter() - started
+            self.reloads += 1
+            self.last_error = None
+            self.last_duration = duration
+            self._failed_signature = None
+            metrics.INTENT_RELOADS.inc('success')
+            metrics.STAGE_SECONDS.observe(duration, 'intent_reload')
+            print(f"🔁 intents.json reloaded in {duration * 1000:.1f} ms "
+                  f"({len(compiled.intents)} intents, {compiled.pattern_count} patterns)")
+            return True
+
+    def _signature_or_none(self):
+        try:
+            return file_signature(self.path)
+        except OSError:
+            return None
+
+    def snapshot(self):
+        compiled = self.current()
+        return {
+            'watching': self.running,
+            'intents': len(compiled.intents),
+            'patterns': compiled.pattern_count,
+            'loaded_at': datetime.fromtimestamp(compiled.loaded_at).isoformat(),
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_reload_ms': round(self.last_duration * 1000, 2) if self.last_duration is not None else None,
+            'last_error': self.last_error
+        }
+
+# =============================================
+# MAIN EXECUTION
+# =============================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the compiled intents snapshot")
+    parser.add_argument('--intents', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intents.json'))
+    parser.add_argument('--snapshot', required=True, help="output file, e.g. intents.snapshot")
+    args = parser.parse_args()
+
+    if os.path.exists(args.snapshot):
+        os.remove(args.snapshot)   # always rebuild
+
+    started = time.perf_counter()
+    compiled = load_intents(args.intents, fuzzy_threshold=0.5, snapshot_path=args.snapshot)
+    print(f"✅ Snapshot written: {args.snapshot} ({len(compiled.intents)} intents, "
+          f"{compiled.pattern_count} patterns, {(time.perf_counter() - started) * 1000:.1f} ms)")
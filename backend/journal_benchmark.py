@@ -0,0 +1,150 @@
+"""
+Session Journal Benchmark
+1. Chat-turn saves per second through the journaled store, with every
+   save waiting for its fsync (group commit) versus one fsync per save.
+2. Startup replay time for a journal of a million records.
+
+Usage:
+    python journal_benchmark.py
+    python journal_benchmark.py --records 2000000 --threads 32
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import session_journal
+from session_journal import FULL, RESET, UPDATE, encode
+from session_store import JournaledSessionStore, Session
+
+# =============================================
+# WORKLOAD
+# =============================================
+
+# One construction flow per user: pick the service, plot size, location,
+# then the quote resets the session
+FLOW = [
+    ('waiting_for_plotsize', 'FS_BUILD', {}),
+    ('waiting_for_location', 'FS_BUILD', {'plot_size': '1500'}),
+    ('waiting_for_location', 'FS_BUILD', {'location': 'Pune'}),
+]
+
+def write_journal(path, records, users):
+    """Synthetic journal: flows of `users` users, interleaved, until `records`"""
+    now = int(time.time())
+    written = 0
+    with open(path, 'wb') as f:
+        while written < records:
+            chunk = []
+            for step in range(len(FLOW) + 1):
+                for user in range(users):
+                    user_id = f"user_{user}"
+                    if step == len(FLOW):
+                        if user % 4:                   # most flows finish
+                            chunk.append(encode([RESET, user_id]))
+                        continue
+                    context, service, data = FLOW[step]
+                    op = FULL if step == 0 else UPDATE
+                    chunk.append(encode([op, user_id, context, service, data, now]))
+            chunk = chunk[:records - written]
+            f.write(b''.join(chunk))
+            written += len(chunk)
+    return os.path.getsize(path)
+
+def run_saves(path, threads, saves_per_thread):
+    """Saves/s with wait_for_commit on, and the average fsync group size"""
+    store = JournaledSessionStore(path, max_sessions=1000000)
+
+    def worker(index):
+        for i in range(saves_per_thread):
+            user_id = f"t{index}_{i % 50}"
+            session = Session('waiting_for_location', 'FS_BUILD', {'plot_size': str(i)})
+            store.save(user_id, session)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    stats = store.journal.snapshot()
+    store.close()
+    return threads * saves_per_thread / elapsed, stats['avg_group']
+
+def fsync_per_save(path, threads, saves_per_thread):
+    """Baseline: every save writes and fsyncs its own record"""
+    record = encode([UPDATE, 'u', 'waiting_for_location', 'FS_BUILD', {'plot_size': '1'}, 0])
+    lock = threading.Lock()
+
+    with open(path, 'ab') as f:
+        def worker():
+            for _ in range(saves_per_thread):
+                with lock:
+                    f.write(record)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+    return threads * saves_per_thread / (time.perf_counter() - started)
+
+# =============================================
+# MAIN EXECUTION
+# =============================================
+
+def main():
+    parser = argparse.ArgumentParser(description="FastSewa session journal benchmark")
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=50000, help="users with a flow in progress at once")
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--saves', type=int, default=200, help="saves per thread")
+    parser.add_argument('--dir', default=None, help="folder on the disk to test (default: temp folder)")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("📒 SESSION JOURNAL BENCHMARK")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as workdir:
+        single = fsync_per_save(os.path.join(workdir, 'single.journal'), args.threads, args.saves)
+        grouped, avg_group = run_saves(os.path.join(workdir, 'saves.journal'), args.threads, args.saves)
+        print(f"\n✍️  Saves ({args.threads} threads, each waiting for its fsync)")
+        print(f"   fsync per save:  {single:9.0f} saves/s")
+        print(f"   group commit:    {grouped:9.0f} saves/s ({avg_group} records per fsync)")
+
+        path = os.path.join(workdir, 'replay.journal')
+        size = write_journal(path, args.records, args.users)
+
+        started = time.perf_counter()
+        states, _, _, _ = session_journal.replay_file(path)
+        replayed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        store = JournaledSessionStore(path, max_sessions=1000000)
+        total = time.perf_counter() - started
+        restored = store.stats['restored']
+
+        store.journal.compact_now()
+        compacted = store.journal.snapshot()['file_records']
+        store.close()
+        started = time.perf_counter()
+        JournaledSessionStore(path, max_sessions=1000000).close()
+        after_compaction = time.perf_counter() - started
+
+        print(f"\n♻️  Replay: {args.records} records ({size / 1024 / 1024:.0f} MB) -> {len(states)} sessions")
+        print(f"   parse + apply:   {replayed * 1000:9.0f} ms")
+        print(f"   store startup:   {total * 1000:9.0f} ms ({restored} sessions restored)")
+        print(f"   after compaction:{after_compaction * 1000:9.0f} ms ({compacted} records)")
+
+    print("\n" + "="*60 + "\n")
+
+if __name__ == "__main__":
+    main()
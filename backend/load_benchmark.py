@@ -0,0 +1,290 @@
+"""
+Chat Load Test & Benchmark Suite
+Drives realistic multi-turn conversations (built from intents.json) through
+smart_chat.get_response directly and through the Flask test client.
+
+Usage:
+    python load_benchmark.py                          # both targets, defaults
+    python load_benchmark.py --target direct --conversations 500 --concurrency 16
+    python load_benchmark.py --compare benchmark_results/baseline.json
+
+Reports p50/p95/p99 turn latency, turns/s, PDFs/s and peak RSS, and saves
+everything as JSON so releases can be compared.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from intent_matcher import IntentMatcher
+
+RESULTS_DIR = "benchmark_results"
+
+# =============================================
+# CONVERSATION GENERATOR
+# =============================================
+
+CITIES = ['Noida', 'Bangalore', 'Pune', 'Chandigarh', 'Jaipur', 'Lucknow', 'Indore', 'Kochi']
+PROPERTY_TYPES = ['Office', 'Residential Society', 'Warehouse', 'Shop', 'Factory']
+SYMPTOMS = ['fever and cough', 'back pain', 'post-surgery care', 'diabetes checkup']
+
+# Answers for each step of the guided flows in smart_chat
+FLOW_ANSWERS = {
+    'waiting_for_plotsize': lambda rng: f"{rng.choice([800, 1200, 1500, 2000, 2400])} sqft",
+    'waiting_for_location': lambda rng: rng.choice(CITIES),
+    'waiting_for_property_type': lambda rng: rng.choice(PROPERTY_TYPES),
+    'waiting_for_guard_count': lambda rng: str(rng.randint(1, 6)),
+    'waiting_for_security_location': lambda rng: rng.choice(CITIES),
+    'waiting_for_symptoms': lambda rng: rng.choice(SYMPTOMS),
+    'waiting_for_medical_location': lambda rng: rng.choice(CITIES),
+}
+
+# Next step after each answer (None = flow ends with a PDF)
+FLOW_NEXT = {
+    'waiting_for_plotsize': 'waiting_for_location',
+    'waiting_for_location': None,
+    'waiting_for_property_type': 'waiting_for_guard_count',
+    'waiting_for_guard_count': 'waiting_for_security_location',
+    'waiting_for_security_location': None,
+    'waiting_for_symptoms': 'waiting_for_medical_location',
+    'waiting_for_medical_location': None,
+}
+
+def routable_patterns(intents):
+    """Patterns per tag that really route to their own intent (first match wins)"""
+    matcher = IntentMatcher(intents)
+    by_tag = {}
+    for intent in intents:
+        usable = [p for p in intent['patterns'] if matcher.match(p.lower()) is intent]
+        if usable:
+            by_tag[intent['tag']] = (intent, usable)
+    return by_tag
+
+def build_conversations(intents, count, seed=42, flow_share=0.7):
+    """
+    Returns a list of conversations (lists of messages), e.g.
+    greeting -> construction -> plot size -> location -> thanks
+    """
+    rng = random.Random(seed)
+    by_tag = routable_patterns(intents)
+    flow_tags = [t for t, (i, _) in by_tag.items() if i.get('context_set') in FLOW_ANSWERS]
+    info_tags = [t for t, (i, _) in by_tag.items()
+                 if t.endswith('_start') and i.get('context_set') not in FLOW_ANSWERS]
+
+    conversations = []
+    for _ in range(count):
+        messages = []
+        if 'greeting' in by_tag and rng.random() < 0.8:
+            messages.append(rng.choice(by_tag['greeting'][1]))
+
+        if flow_tags and rng.random() < flow_share:
+            intent, patterns = by_tag[rng.choice(flow_tags)]
+            messages.append(rng.choice(patterns))
+            step = intent['context_set']
+            while step is not None:
+                messages.append(FLOW_ANSWERS[step](rng))
+                step = FLOW_NEXT[step]
+        elif info_tags:
+            messages.append(rng.choice(by_tag[rng.choice(info_tags)][1]))
+        else:
+            messages.append("what services do you offer")
+
+        if 'thanks' in by_tag and rng.random() < 0.5:
+            messages.append(rng.choice(by_tag['thanks'][1]))
+        conversations.append(messages)
+
+    return conversations
+
+# =============================================
+# DRIVERS
+# =============================================
+
+def direct_driver(pdf_mode):
+    import smart_chat
+    smart_chat.init(smart_chat.ChatConfig(pdf_mode=pdf_mode))
+
+    def send(user_id, message):
+        response = smart_chat.get_response(message, user_id)
+        return 'PDF Created Successfully' in response or 'PDF Job Queued' in response
+    return send
+
+def flask_driver(pdf_mode):
+    import fastsewa_api
+    import smart_chat
+    app = fastsewa_api.create_app(smart_chat.ChatConfig(pdf_mode=pdf_mode), freeze=False)
+    local = threading.local()
+
+    def send(user_id, message):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        data = client.post('/api/chat', json={'message': message, 'user_id': user_id}).get_json()
+        if not data.get('success'):
+            raise RuntimeError(data.get('response'))
+        return bool(data.get('pdf_generated') or data.get('pdf_job_id'))
+    return send
+
+DRIVERS = {'direct': direct_driver, 'flask': flask_driver}
+
+# =============================================
+# RUNNER
+# =============================================
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_target(target, conversations, concurrency, run_id, pdf_mode):
+    send = DRIVERS[target](pdf_mode)
+    latencies, errors, pdfs = [], 0, 0
+    lock = threading.Lock()
+
+    def run_conversation(index, messages):
+        nonlocal errors, pdfs
+        user_id = f"load_{run_id}_{target}_{index}"
+        local_lat, local_err, local_pdf = [], 0, 0
+        for message in messages:
+            started = time.perf_counter()
+            try:
+                if send(user_id, message):
+                    local_pdf += 1
+            except Exception:
+                local_err += 1
+            local_lat.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local_lat)
+            errors += local_err
+            pdfs += local_pdf
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda args: run_conversation(*args), enumerate(conversations)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        'target': target,
+        'concurrency': concurrency,
+        'conversations': len(conversations),
+        'turns': len(latencies),
+        'errors': errors,
+        'pdfs': pdfs,
+        'elapsed_s': round(elapsed, 3),
+        'turns_per_s': round(len(latencies) / elapsed, 1),
+        'pdfs_per_s': round(pdfs / elapsed, 2),
+        'latency_ms': {
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'max': ms(latencies[-1] if latencies else None)
+        },
+        'peak_rss_mb': round(peak_rss_mb() or 0, 1)
+    }
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current, baseline_path, tolerance):
+    """Prints p95 / throughput changes against a saved run; returns False on regression"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {r['target']: r for r in json.load(f)['results']}
+
+    ok = True
+    print("\n📊 Compared with", baseline_path)
+    for result in current['results']:
+        old = baseline.get(result['target'])
+        if not old:
+            continue
+        p95_change = (result['latency_ms']['p95'] - old['latency_ms']['p95']) / old['latency_ms']['p95']
+        tps_change = (result['turns_per_s'] - old['turns_per_s']) / old['turns_per_s']
+        regressed = p95_change > tolerance or tps_change < -tolerance
+        ok = ok and not regressed
+        print(f"   {'❌' if regressed else '✅'} {result['target']:<7} "
+              f"p95 {p95_change:+.1%} | turns/s {tps_change:+.1%}")
+    return ok
+
+# =============================================
+# MAIN EXECUTION
+# =============================================
+
+def main():
+    parser = argparse.ArgumentParser(description="FastSewa chat load test")
+    parser.add_argument('--target', choices=['direct', 'flask', 'all'], default='all')
+    parser.add_argument('--conversations', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--pdf-mode', choices=['sync', 'queue', 'memory'], default='sync',
+                        help="sync renders PDFs in the turn; queue only enqueues them; "
+                             "memory renders them in the turn without writing first")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="JSON file (default benchmark_results/<timestamp>.json)")
+    parser.add_argument('--compare', help="previous JSON result to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    with open('intents.json', 'r', encoding='utf-8') as f:
+        intents = json.load(f)['intents']
+    conversations = build_conversations(intents, args.conversations, seed=args.seed)
+
+    targets = ['direct', 'flask'] if args.target == 'all' else [args.target]
+    run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+
+    print("\n" + "="*60)
+    print(f"🚦 FASTSEWA LOAD TEST - {len(conversations)} conversations, "
+          f"{sum(map(len, conversations))} turns, concurrency {args.concurrency}")
+    print("="*60 + "\n")
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': vars(args),
+        'results': []
+    }
+
+    for target in targets:
+        result = run_target(target, conversations, args.concurrency, run_id, args.pdf_mode)
+        report['results'].append(result)
+        lat = result['latency_ms']
+        print(f"{target:<7} {result['turns_per_s']:8.1f} turns/s | {result['pdfs_per_s']:6.2f} PDFs/s | "
+              f"p50 {lat['p50']:8.2f} ms | p95 {lat['p95']:8.2f} ms | p99 {lat['p99']:8.2f} ms | "
+              f"errors {result['errors']} | peak RSS {result['peak_rss_mb']} MB")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load_{run_id}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Saved: {output}")
+
+    ok = compare(report, args.compare, args.tolerance) if args.compare else True
+    print("\n" + "="*60 + "\n")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
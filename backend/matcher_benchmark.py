@@ -0,0 +1,132 @@
+"""
+Intent Matcher Benchmark
+Compares the compiled IntentMatcher against the original per-pattern loop,
+and times FuzzyIntentMatcher lookups on large pattern sets
+"""
+
+import json
+import random
+import string
+import timeit
+
+from intent_matcher import FuzzyIntentMatcher, IntentMatcher, np
+
+# =============================================
+# ORIGINAL LOOP (as it was in smart_chat.get_response)
+# =============================================
+
+def legacy_match(intents, user_input_lower):
+    for intent in intents:
+        for pattern in intent['patterns']:
+            if pattern.lower() in user_input_lower:
+                return intent
+    return None
+
+# =============================================
+# TEST DATA
+# =============================================
+
+SAMPLE_MESSAGES = [
+    "hi there",
+    "i want to build a 3bhk house in noida",
+    "need security guard for my society",
+    "can you help me with gst filing for my startup",
+    "my ac is not working, need repair",
+    "what is the weather like today in bangalore",
+    "thanks a lot, bye",
+    "please verify this agricultural land before i buy it, the seller is in a hurry",
+]
+
+def load_intents():
+    with open('intents.json', 'r', encoding='utf-8') as file:
+        return json.load(file)['intents']
+
+def synthetic_intents(base_intents, extra_patterns, seed=42):
+    """Pads the real intents with random patterns to simulate a large file"""
+    rng = random.Random(seed)
+    intents = [dict(intent, patterns=list(intent['patterns'])) for intent in base_intents]
+
+    for i in range(extra_patterns):
+        word = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(6, 14)))
+        intents[i % len(intents)]['patterns'].append(f"{word} {i}")
+
+    return intents
+
+def vocabulary_intents(base_intents, extra_patterns, vocab_size=3000, seed=7):
+    """Pads the real intents with 2-4 word patterns drawn from a shared vocabulary"""
+    rng = random.Random(seed)
+    vocab = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+             for _ in range(vocab_size)]
+    intents = [dict(intent, patterns=list(intent['patterns'])) for intent in base_intents]
+
+    for i in range(extra_patterns):
+        words = rng.sample(vocab, rng.randint(2, 4))
+        intents[i % len(intents)]['patterns'].append(' '.join(words))
+
+    return intents, vocab
+
+# =============================================
+# RUN BENCHMARK
+# =============================================
+
+def run_fuzzy_case(label, intents, messages, number=200):
+    build_started = timeit.default_timer()
+    fuzzy = FuzzyIntentMatcher(intents)
+    build = timeit.default_timer() - build_started
+
+    lowered = [m.lower() for m in messages]
+    seconds = min(timeit.repeat(lambda: [fuzzy.match(m) for m in lowered], repeat=5, number=number))
+    per_lookup = seconds / (number * len(lowered)) * 1e6
+
+    print(f"{label:<24} {fuzzy.pattern_count:>7} patterns | "
+          f"lookup {per_lookup:8.2f} µs | build {build:6.2f} s")
+
+def run_case(label, intents, messages, repeat=5, number=200):
+    matcher = IntentMatcher(intents)
+    lowered = [m.lower() for m in messages]
+
+    # Correctness: same winner as the original loop for every message
+    for msg in lowered:
+        assert matcher.match(msg) is legacy_match(intents, msg), msg
+
+    legacy = min(timeit.repeat(
+        lambda: [legacy_match(intents, m) for m in lowered], repeat=repeat, number=number))
+    compiled = min(timeit.repeat(
+        lambda: [matcher.match(m) for m in lowered], repeat=repeat, number=number))
+
+    per_legacy = legacy / (number * len(lowered)) * 1e6
+    per_compiled = compiled / (number * len(lowered)) * 1e6
+    patterns = sum(len(i['patterns']) for i in intents)
+
+    print(f"{label:<24} {patterns:>7} patterns | "
+          f"loop {per_legacy:8.2f} µs | compiled {per_compiled:8.2f} µs | "
+          f"{per_legacy / per_compiled:5.1f}x")
+
+def run_all():
+    print("\n" + "="*60)
+    print("⏱️  INTENT MATCHER BENCHMARK (per message)")
+    print("="*60 + "\n")
+
+    base = load_intents()
+    run_case("intents.json", base, SAMPLE_MESSAGES)
+
+    for extra in (1000, 5000, 20000):
+        run_case(f"intents.json + {extra}", synthetic_intents(base, extra),
+                 SAMPLE_MESSAGES, number=20)
+
+    print("\n" + "="*60)
+    print(f"⏱️  FUZZY (TF-IDF) MATCHER - {'NumPy' if np is not None else 'pure Python'} scoring")
+    print("="*60 + "\n")
+
+    run_fuzzy_case("intents.json", base, SAMPLE_MESSAGES + ["need guards for my shop"])
+
+    for extra in (10000, 50000):
+        intents, vocab = vocabulary_intents(base, extra)
+        rng = random.Random(1)
+        messages = SAMPLE_MESSAGES + [' '.join(rng.sample(vocab, 4)) for _ in range(8)]
+        run_fuzzy_case(f"intents.json + {extra}", intents, messages, number=20)
+
+    print("\n" + "="*60 + "\n")
+
+if __name__ == "__main__":
+    run_all()
@@ -0,0 +1,187 @@
+"""
+Metrics
+Low-overhead counters and timing histograms, exported in Prometheus text format.
+
+Recording only bumps a bucket count under a small lock; all formatting
+happens when /api/metrics is scraped.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency buckets in seconds (100µs .. 30s)
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# =============================================
+# METRIC TYPES
+# =============================================
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for k, v in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+class Counter:
+    """Monotonic counter, optionally split by label values"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {value}")
+        return lines
+
+
+class Histogram:
+    """Bucketed histogram, optionally split by label values"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}    # labelvalues -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labelvalues):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labelvalues)
+
+    def count(self, *labelvalues):
+        series = self._series.get(labelvalues)
+        return sum(series[:-1]) if series else 0
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+
+        for labelvalues, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                labels = _format_labels(self.labelnames, labelvalues, ('le', le))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time (costs nothing until scraped)"""
+
+    def __init__(self, name, documentation, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        try:
+            lines.append(f"{self.name} {self.callback()}")
+        except Exception:
+            pass
+        return lines
+
+# =============================================
+# REGISTRY
+# =============================================
+
+_registry = []
+_registry_lock = threading.Lock()
+
+def register(metric):
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+def unregister(name):
+    with _registry_lock:
+        _registry[:] = [m for m in _registry if m.name != name]
+
+def render_prometheus():
+    """All registered metrics in Prometheus text exposition format"""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.expose())
+    return '\n'.join(lines) + '\n'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# =============================================
+# FASTSEWA METRICS
+# =============================================
+
+STAGE_SECONDS = register(Histogram(
+    'fastsewa_stage_seconds',
+    'Time spent in each processing stage',
+    labelnames=('stage',)
+))
+
+CHAT_REQUESTS = register(Counter(
+    'fastsewa_chat_requests_total',
+    'Chat turns handled, by active service code',
+    labelnames=('service',)
+))
+
+PDFS = register(Counter(
+    'fastsewa_pdfs_total',
+    'Quote PDFs by result (generated, cached, failed, rejected)',
+    labelnames=('result',)
+))
+
+INTENT_RELOADS = register(Counter(
+    'fastsewa_intent_reloads_total',
+    'intents.json hot reloads by result (success, failed)',
+    labelnames=('result',)
+))
+
+EVENTS_DROPPED = register(Counter(
+    'fastsewa_events_dropped_total',
+    'Analytics events dropped because the event log queue was full'
+))
+
+def stage_timer(stage):
+    """with stage_timer('intent_match'): ..."""
+    return STAGE_SECONDS.time(stage)
@@ -0,0 +1,441 @@
+"""
+Native Invoice PDF
+Writes the quote straight to PDF bytes in pure Python: same layout and
+fields as invoice_template.html, no HTML step and no wkhtmltopdf process.
+
+Everything that does not depend on the quote (fonts, page objects,
+header, labels, note box, footer) is built once at import; a quote only
+lays out its own values. Long values (a detailed description, a long
+amount) continue on further pages; customer details are cut short.
+
+The quote number, date and time (STAMP_FIELDS) are drawn separately from
+the rest of the layout, so pdf_generator can reuse the pages laid out for
+an identical earlier quote and only stamp the new quote's values on them.
+"""
+
+from datetime import datetime
+
+# =============================================
+# PAGE & STYLE
+# =============================================
+
+PAGE_WIDTH = 595.28     # A4 in points
+PAGE_HEIGHT = 841.89
+LEFT = 60.0             # 0.5in page margin + container padding
+RIGHT = PAGE_WIDTH - 60.0
+TOP = 60.0
+BOTTOM = PAGE_HEIGHT - 60.0   # content ends here; the rest flows onto a new page
+CONTINUED_PAD = 10.0          # space above a box that continues from the previous page
+
+# Customer details longer than this many lines end in '...'
+INFO_MAX_LINES = 3
+
+REGULAR, BOLD = 'F1', 'F2'
+
+def _rgb(hex_color):
+    value = hex_color.lstrip('#')
+    return tuple(int(value[i:i + 2], 16) / 255 for i in (0, 2, 4))
+
+# Colours from invoice_template.html
+BLUE = _rgb('#2563eb')
+WHITE = _rgb('#ffffff')
+GRAY_50 = _rgb('#f9fafb')
+GRAY_200 = _rgb('#e5e7eb')
+GRAY_500 = _rgb('#6b7280')
+GRAY_600 = _rgb('#4b5563')
+GRAY_800 = _rgb('#1f2937')
+AMBER_100 = _rgb('#fef3c7')
+AMBER_500 = _rgb('#f59e0b')
+AMBER_800 = _rgb('#92400e')
+
+# Standard Type1 font widths (1/1000 em) for codes 32..126; other codes use 556
+_HELVETICA = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584
+]
+_HELVETICA_BOLD = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584
+]
+_WIDTHS = {
+    REGULAR: [556] * 32 + _HELVETICA + [556] * 129,
+    BOLD: [556] * 32 + _HELVETICA_BOLD + [556] * 129,
+}
+
+# =============================================
+# TEXT HELPERS
+# =============================================
+
+# Characters the standard fonts (WinAnsiEncoding) can't show
+_REPLACEMENTS = {'₹': 'Rs.', '\u2009': ' ', '\u202f': ' '}
+
+def encode(text):
+    """str -> WinAnsi bytes; unsupported characters become '?'"""
+    text = str(text)
+    if not text.isascii():
+        for char, replacement in _REPLACEMENTS.items():
+            text = text.replace(char, replacement)
+    return text.encode('cp1252', errors='replace')
+
+def text_width(raw, font, size):
+    widths = _WIDTHS[font]
+    return sum(widths[b] for b in raw) * size / 1000
+
+def wrap(text, font, size, max_width):
+    """Greedy word wrap; returns a list of encoded lines"""
+    lines, line = [], b''
+    for word in encode(text).split():
+        candidate = line + b' ' + word if line else word
+        if text_width(candidate, font, size) <= max_width:
+            line = candidate
+            continue
+        if line:
+            lines.append(line)
+        # A single word wider than the column is split by characters
+        while text_width(word, font, size) > max_width and len(word) > 1:
+            cut = len(word) - 1
+            while cut > 1 and text_width(word[:cut], font, size) > max_width:
+                cut -= 1
+            lines.append(word[:cut])
+            word = word[cut:]
+        line = word
+    if line or not lines:
+        lines.append(line)
+    return lines
+
+def clip(lines, max_lines, font, size, max_width):
+    """Keeps the first `max_lines` lines, the last ending in '...' if any were cut"""
+    if len(lines) <= max_lines:
+        return lines
+    last = lines[max_lines - 1]
+    while last and text_width(last + b'...', font, size) > max_width:
+        last = last[:-1]
+    return lines[:max_lines - 1] + [last.rstrip() + b'...']
+
+def _num(value):
+    return f"{value:.2f}".rstrip('0').rstrip('.')
+
+def _escape(raw):
+    return raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+def text(x, y_top, raw, font, size, color):
+    """Text op at x / baseline y measured from the top of the page"""
+    return (f"BT /{font} {_num(size)} Tf {_num(color[0])} {_num(color[1])} {_num(color[2])} rg "
+            f"{_num(x)} {_num(PAGE_HEIGHT - y_top)} Td (").encode() + _escape(raw) + b") Tj ET\n"
+
+def text_right(x_right, y_top, raw, font, size, color):
+    return text(x_right - text_width(raw, font, size), y_top, raw, font, size, color)
+
+def spans(x, y_top, parts, size):
+    """Consecutive (raw, font, color) runs on one line; returns (ops, width)"""
+    ops, width = [], 0.0
+    for raw, font, color in parts:
+        ops.append(text(x + width, y_top, raw, font, size, color))
+        width += text_width(raw, font, size)
+    return b''.join(ops), width
+
+def rect(x, y_top, width, height, color):
+    """Filled rectangle with its top edge at y_top"""
+    return (f"{_num(color[0])} {_num(color[1])} {_num(color[2])} rg "
+            f"{_num(x)} {_num(PAGE_HEIGHT - y_top - height)} {_num(width)} {_num(height)} re f\n").encode()
+
+def hline(x1, x2, y_top, width, color):
+    return (f"{_num(color[0])} {_num(color[1])} {_num(color[2])} RG {_num(width)} w "
+            f"{_num(x1)} {_num(PAGE_HEIGHT - y_top)} m {_num(x2)} {_num(PAGE_HEIGHT - y_top)} l S\n").encode()
+
+def shifted(ops, dy):
+    """Draws a block built at y_top = 0 with its top at dy"""
+    return f"q 1 0 0 1 0 {_num(-dy)} cm\n".encode() + ops + b"Q\n"
+
+# =============================================
+# STATIC PARTS (built once)
+# =============================================
+
+def _build_header():
+    badge = encode("SERVICE QUOTE")
+    badge_width = text_width(badge, BOLD, 10.5) + 24
+    return b''.join([
+        text(LEFT, TOP + 22, encode("FastSewa"), BOLD, 24, BLUE),
+        text(LEFT, TOP + 38, encode("Your Trusted Service Partner"), REGULAR, 9, GRAY_500),
+        rect(RIGHT - badge_width, TOP + 6, badge_width, 24, BLUE),
+        text(RIGHT - badge_width + 12, TOP + 22, badge, BOLD, 10.5, WHITE),
+        hline(LEFT, RIGHT, TOP + 52, 2.25, BLUE),
+        text(LEFT, INFO_TOP, encode("CUSTOMER DETAILS"), BOLD, 10.5, BLUE),
+        text_right(RIGHT, INFO_TOP, encode("QUOTE INFORMATION"), BOLD, 10.5, BLUE),
+    ])
+
+def _build_total_label():
+    return text(LEFT + 15, 28, encode("Estimated Amount:"), BOLD, 15, WHITE)
+
+def _build_note_and_footer():
+    note_lines = wrap("Note: This is a preliminary quote. Final pricing will be confirmed after "
+                      "site inspection and detailed requirement analysis. Our team will contact "
+                      "you within 24 hours to schedule a consultation.", REGULAR, 10, RIGHT - LEFT - 30)
+    note_height = 24 + 14 * len(note_lines)
+
+    ops = [rect(LEFT, 0, RIGHT - LEFT, note_height, AMBER_100),
+           rect(LEFT, 0, 3, note_height, AMBER_500)]
+    for i, line in enumerate(note_lines):
+        y = 22 + 14 * i
+        if i == 0 and line.startswith(b'Note:'):
+            ops.append(spans(LEFT + 15, y, [(b'Note:', BOLD, AMBER_800),
+                                            (line[5:], REGULAR, AMBER_800)], 10)[0])
+        else:
+            ops.append(text(LEFT + 15, y, line, REGULAR, 10, AMBER_800))
+
+    footer_top = note_height + 16
+    ops.append(hline(LEFT, RIGHT, footer_top, 1.5, GRAY_200))
+
+    footer_lines = [
+        ([(b"Thank you for choosing ", REGULAR, GRAY_500), (b"FastSewa", BOLD, BLUE),
+          (b"!", REGULAR, GRAY_500)], 9),
+        ([(b"For queries, contact us at: ", REGULAR, GRAY_500), (b"support@fastsewa.com", BOLD, BLUE),
+          (b" | +91-1800-FASTSEWA", REGULAR, GRAY_500)], 9),
+        ([(b"This is a computer-generated quote and does not require a signature.",
+           REGULAR, GRAY_500)], 8.25),
+    ]
+    for i, (parts, size) in enumerate(footer_lines):
+        width = sum(text_width(raw, font, size) for raw, font, _ in parts)
+        y = footer_top + 20 + 14 * i + (6 if i == 2 else 0)
+        ops.append(spans((PAGE_WIDTH - width) / 2, y, parts, size)[0])
+
+    return b''.join(ops), footer_top + 60
+
+INFO_TOP = TOP + 76
+INFO_LINE = 16
+INFO_COLUMN = (RIGHT - LEFT) / 2 - 10
+TOTAL_LINE = 18
+DETAIL_LABEL_X = LEFT + 18
+DETAIL_VALUE_WIDTH = (RIGHT - LEFT) * 0.55
+GAP = 20
+
+HEADER_OPS = _build_header()
+TOTAL_LABEL_OPS = _build_total_label()
+NOTE_FOOTER_OPS, NOTE_FOOTER_HEIGHT = _build_note_and_footer()
+
+CUSTOMER_LABELS = [(encode(label), text_width(encode(label), BOLD, 10.5) + 3)
+                   for label in ("Name:", "Phone:", "Address:")]
+QUOTE_LABELS = [encode(label) + b' ' for label in ("Quote ID:", "Date:", "Time:")]
+QUOTE_BOTTOM = INFO_TOP + 18 + INFO_LINE * len(QUOTE_LABELS)
+SERVICE_HEADING_OPS = text(LEFT + 18, 28, encode("Service Details"), BOLD, 13.5, GRAY_800)
+
+# Optional rows, shown when the value isn't 'N/A' (as in the template)
+OPTIONAL_ROWS = (('plot_area', "Plot Area:"), ('property_type', "Property Type:"),
+                 ('guard_count', "Number of Guards:"))
+
+# =============================================
+# PDF FILE STRUCTURE
+# =============================================
+
+def _build_file_prefix():
+    """Header and the objects that never change (1-3), with their offsets"""
+    objects = [
+        b"<< /Type /Catalog /Pages 4 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    return bytes(out), offsets
+
+FILE_PREFIX, PREFIX_OFFSETS = _build_file_prefix()
+XREF_PREFIX = b"".join(f"{offset:010d} 00000 n \n".encode() for offset in PREFIX_OFFSETS)
+PAGES_NUMBER = 4    # then each page and its content stream, then the info dictionary
+
+PAGE_PREFIX = (f"<< /Type /Page /Parent {PAGES_NUMBER} 0 R "
+               f"/MediaBox [0 0 {_num(PAGE_WIDTH)} {_num(PAGE_HEIGHT)}] "
+               f"/Resources << /Font << /{REGULAR} 2 0 R /{BOLD} 3 0 R >> >> /Contents ").encode()
+
+def _pdf_date(now):
+    return now.strftime("D:%Y%m%d%H%M%S")
+
+# =============================================
+# RENDERING
+# =============================================
+
+class _Flow:
+    """Content of the pages laid out so far and the position on the last one"""
+
+    def __init__(self, first_page_ops):
+        self.pages = [[first_page_ops]]
+        self.y = TOP
+
+    def fits(self, height):
+        return self.y + height <= BOTTOM
+
+    def new_page(self):
+        self.pages.append([])
+        self.y = TOP
+
+    def place(self, ops, height):
+        """Draws a block built at y_top = 0 at the current position"""
+        self.pages[-1].append(shifted(ops, self.y))
+        self.y += height
+
+    def framed(self, slices, fill, bar=None, keep=1):
+        """
+        Places a box made of (height, ops) slices, each built at y_top = 0.
+        The box breaks between slices at the bottom of a page and goes on,
+        framed again, on the next one; the first `keep` slices stay together.
+        """
+        if not self.fits(sum(height for height, _ in slices[:keep])):
+            self.new_page()
+
+        start, pad = 0, 0.0
+        while True:
+            end, height = start, pad
+            while end < len(slices) and (end == start or self.fits(height + slices[end][0])):
+                height += slices[end][0]
+                end += 1
+
+            ops = [rect(LEFT, 0, RIGHT - LEFT, height, fill)]
+            if bar is not None:
+                ops.append(rect(LEFT, 0, 3, height, bar))
+            y = pad
+            for slice_height, slice_ops in slices[start:end]:
+                ops.append(shifted(slice_ops, y))
+                y += slice_height
+            self.place(b''.join(ops), height)
+
+            if end == len(slices):
+                return
+            self.new_page()
+            start, pad = end, CONTINUED_PAD
+
+    def content(self):
+        return [b''.join(ops) for ops in self.pages]
+
+def _info_section(context):
+    ops = []
+    left_y = INFO_TOP + 18
+    values = (context.get('customer_name', ''), context.get('customer_phone', ''),
+              context.get('customer_address', ''))
+
+    for (label, label_width), value in zip(CUSTOMER_LABELS, values):
+        width = INFO_COLUMN - label_width
+        lines = clip(wrap(value, REGULAR, 10.5, width), INFO_MAX_LINES, REGULAR, 10.5, width)
+        ops.append(text(LEFT, left_y, label, BOLD, 10.5, GRAY_800))
+        for line in lines:
+            ops.append(text(LEFT + label_width, left_y, line, REGULAR, 10.5, GRAY_600))
+            left_y += INFO_LINE
+
+    return b''.join(ops), max(left_y, QUOTE_BOTTOM)
+
+# Printed by stamp(), not by layout(): every quote has its own
+STAMP_FIELDS = ('quote_id', 'date', 'time')
+
+def stamp(context):
+    """Quote information column of the first page (STAMP_FIELDS)"""
+    ops = []
+    y = INFO_TOP + 18
+    for label, key in zip(QUOTE_LABELS, STAMP_FIELDS):
+        value = encode(context.get(key, ''))
+        width = text_width(label, BOLD, 10.5) + text_width(value, REGULAR, 10.5)
+        ops.append(spans(RIGHT - width, y, [(label, BOLD, GRAY_800),
+                                            (value, REGULAR, GRAY_600)], 10.5)[0])
+        y += INFO_LINE
+    return b''.join(ops)
+
+def _service_slices(context):
+    """Heading, one slice per line of each row and the rules between rows"""
+    rows = [("Service Category:", context.get('service_category', '')),
+            ("Description:", context.get('service_description', ''))]
+    for key, label in OPTIONAL_ROWS:
+        value = context.get(key, 'N/A')
+        if value != 'N/A':
+            rows.append((label, value))
+
+    slices = [(38, SERVICE_HEADING_OPS)]
+    for index, (label, value) in enumerate(rows):
+        if index:
+            slices.append((8, hline(DETAIL_LABEL_X, RIGHT - 15, 8, 0.75, GRAY_200)))
+        for i, line in enumerate(wrap(value, REGULAR, 10.5, DETAIL_VALUE_WIDTH)):
+            ops = text_right(RIGHT - 15, 14, line, REGULAR, 10.5, GRAY_800)
+            if i == 0:
+                ops = text(DETAIL_LABEL_X, 14, encode(label), BOLD, 10.5, GRAY_600) + ops
+            slices.append((14, ops))
+
+    height, ops = slices[-1]
+    slices[-1] = (height + 16, ops)
+    return slices
+
+def _total_slices(context):
+    """The label with the first line of the amount, then its other lines"""
+    lines = wrap(context.get('total_amount', ''), BOLD, 15, (RIGHT - LEFT) / 2)
+    slices = [(28, TOTAL_LABEL_OPS + text_right(RIGHT - 15, 28, lines[0], BOLD, 15, WHITE))]
+    for line in lines[1:]:
+        slices.append((TOTAL_LINE, text_right(RIGHT - 15, TOTAL_LINE, line, BOLD, 15, WHITE)))
+
+    height, ops = slices[-1]
+    slices[-1] = (height + 16, ops)
+    return slices
+
+def layout(context):
+    """Content stream of each page of the quote, without STAMP_FIELDS"""
+    info_ops, info_bottom = _info_section(context)
+    flow = _Flow(HEADER_OPS + info_ops)
+    flow.y = info_bottom + 10
+
+    flow.framed(_service_slices(context), GRAY_50, bar=BLUE, keep=2)
+    flow.y += GAP
+    flow.framed(_total_slices(context), BLUE)
+    flow.y += GAP
+
+    if not flow.fits(NOTE_FOOTER_HEIGHT):
+        flow.new_page()
+    flow.place(NOTE_FOOTER_OPS, NOTE_FOOTER_HEIGHT)
+    return flow.content()
+
+def render_invoice(context, now=None, pages=None):
+    """
+    Lays out one quote and returns the complete PDF as bytes.
+
+    Args:
+        context (dict): Same keys as invoice_template.html
+            (customer_name, quote_id, service_category, total_amount, ...)
+        now (datetime): Creation date stored in the file (default: now)
+        pages (list): layout() of a quote that differs from this one only
+            in STAMP_FIELDS (default: lay this one out)
+    """
+    if pages is None:
+        pages = layout(context)
+    pages = [pages[0] + stamp(context)] + pages[1:]
+
+    title = _escape(encode(f"FastSewa Service Quote {context.get('quote_id', '')}"))
+    info = (b"<< /Title (" + title + b") /Producer (FastSewa native_pdf) /CreationDate ("
+            + _pdf_date(now or datetime.now()).encode() + b") >>")
+
+    out = bytearray(FILE_PREFIX)
+    offsets = []
+    page_numbers = [PAGES_NUMBER + 1 + 2 * i for i in range(len(pages))]
+    kids = ' '.join(f"{number} 0 R" for number in page_numbers)
+
+    offsets.append(len(out))
+    out += f"{PAGES_NUMBER} 0 obj\n<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>\nendobj\n".encode()
+    for number, content in zip(page_numbers, pages):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + PAGE_PREFIX + f"{number + 1} 0 R >>\nendobj\n".encode()
+        offsets.append(len(out))
+        out += (f"{number + 1} 0 obj\n<< /Length {len(content)} >>\nstream\n".encode()
+                + content + b"\nendstream\nendobj\n")
+    info_number = PAGES_NUMBER + 1 + 2 * len(pages)
+    offsets.append(len(out))
+    out += f"{info_number} 0 obj\n".encode() + info + b"\nendobj\n"
+
+    xref_offset = len(out)
+    out += f"xref\n0 {info_number + 1}\n0000000000 65535 f \n".encode() + XREF_PREFIX
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += (f"trailer\n<< /Size {info_number + 1} /Root 1 0 R /Info {info_number} 0 R >>\n"
+            f"startxref\n{xref_offset}\n%%EOF\n").encode()
+    return bytes(out)
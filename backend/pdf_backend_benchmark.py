@@ -0,0 +1,64 @@
+"""
+PDF Backend Benchmark
+Time per quote for each rendering backend, written to a temporary folder
+with the PDF cache off. wkhtmltopdf backends are skipped when it isn't
+installed.
+
+Usage:
+    python pdf_backend_benchmark.py
+    python pdf_backend_benchmark.py --quotes 50
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import pdf_generator
+from pdf_test import test_users, test_enquiries
+
+# =============================================
+# RUN BENCHMARK
+# =============================================
+
+def run_backend(backend, quotes):
+    items = [(test_users[i % len(test_users)], dict(test_enquiries[i % len(test_enquiries)], id=5000 + i))
+             for i in range(quotes)]
+
+    pdf_generator.create_invoice_pdf(*items[0], backend=backend)   # warm up
+    started = time.perf_counter()
+    for user, enquiry in items:
+        pdf_generator.create_invoice_pdf(user, enquiry, backend=backend)
+    return (time.perf_counter() - started) / quotes
+
+def main():
+    parser = argparse.ArgumentParser(description="FastSewa PDF backend benchmark")
+    parser.add_argument('--quotes', type=int, default=20)
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(f"⏱️  PDF BACKENDS ({args.quotes} quotes each, cache off)")
+    print("="*60 + "\n")
+
+    pdf_generator.PDF_CACHE_ENABLED = False
+    has_wkhtmltopdf = os.path.exists(pdf_generator.resolve_wkhtmltopdf())
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        pdf_generator.init(pdf_generator.PDFConfig(output_dir=output_dir))
+
+        timings = {}
+        for backend in ('process', 'pool', 'native'):
+            if backend != 'native' and not has_wkhtmltopdf:
+                print(f"{backend:<10} skipped (wkhtmltopdf not found)")
+                continue
+            timings[backend] = run_backend(backend, args.quotes)
+            print(f"{backend:<10} {timings[backend] * 1000:9.2f} ms per quote")
+
+        pdf_generator.shutdown_renderer_pool()
+
+    if 'process' in timings:
+        print(f"\n🚀 native is {timings['process'] / timings['native']:.0f}x faster than process")
+    print("\n" + "="*60 + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Content-Addressed PDF Cache
+Identical quotes are laid out once; repeats reuse the laid-out pages and
+only have their own quote number, date and time stamped on them
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+# =============================================
+# CACHE
+# =============================================
+
+class PDFCache:
+    """
+    Maps a hash of the render context to the pages laid out for it.
+    Bounded LRU index, kept in memory.
+
+    Args:
+        max_entries (int): Index size limit
+        ignore_fields (iterable): Context keys left out of the hash; each
+            render prints these itself, they are never part of a cached value
+    """
+
+    def __init__(self, max_entries=1000, ignore_fields=()):
+        self.max_entries = max_entries
+        self.ignore_fields = frozenset(ignore_fields)
+        self._index = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def key_for(self, context):
+        """SHA-256 of the context without the ignored (per-quote) fields"""
+        stable = {k: v for k, v in context.items() if k not in self.ignore_fields}
+        payload = json.dumps(stable, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def lookup(self, key):
+        """Returns the cached value, or None (counts a hit or miss)"""
+        with self._lock:
+            value = self._index.get(key)
+
+            if value is None:
+                self.stats['misses'] += 1
+                return None
+
+            self._index.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+
+    def store(self, key, value):
+        with self._lock:
+            self._index[key] = value
+            self._index.move_to_end(key)
+
+            while len(self._index) > self.max_entries:
+                self._index.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._index.clear()
+
+    def snapshot(self):
+        """Counters plus current index size"""
+        with self._lock:
+            return dict(self.stats, entries=len(self._index), max_entries=self.max_entries)
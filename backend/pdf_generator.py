@@ -1,19 +1,337 @@
-import jinja2
-import pdfkit
 import os
+import shutil
+import tempfile
+import threading
+import time
 from datetime import datetime
+import metrics
+import native_pdf
+from admission import AdmissionGate, Overloaded
+import quote_ids
+from pdf_cache import PDFCache
+from pdf_memory import pdf_memory
+from pdf_renderer_pool import RendererPool
 
 # =============================================
 # CONFIGURATION
 # =============================================
 
-# Path to wkhtmltopdf executable
-PATH_WKHTMLTOPDF = r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe'
-config = pdfkit.configuration(wkhtmltopdf=PATH_WKHTMLTOPDF)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Output directory for PDFs
-OUTPUT_DIR = "generated_pdfs"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+# Path to wkhtmltopdf executable. None = FASTSEWA_WKHTMLTOPDF, then
+# wkhtmltopdf on PATH, then the default Windows install location.
+# Looked up on first render, not at import.
+PATH_WKHTMLTOPDF = None
+DEFAULT_WKHTMLTOPDF = r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe'
+
+# Output directory for PDFs (created on first use)
+OUTPUT_DIR = os.path.join(BASE_DIR, "generated_pdfs")
+
+# wkhtmltopdf options used for every quote
+PDF_OPTIONS = {
+    'page-size': 'A4',
+    'margin-top': '0.5in',
+    'margin-right': '0.5in',
+    'margin-bottom': '0.5in',
+    'margin-left': '0.5in',
+    'encoding': "UTF-8",
+    'enable-local-file-access': None
+}
+
+# Rendering backend (can also be chosen per call, see create_invoice_pdf):
+#   'process' - start one wkhtmltopdf per quote (pdfkit.from_string)
+#   'pool'    - keep warm wkhtmltopdf workers alive between quotes
+#   'native'  - write the PDF directly in Python (native_pdf.py), no
+#               HTML or wkhtmltopdf; same fields, simpler styling
+RENDER_BACKEND = 'process'
+RENDER_POOL_SIZE = 2
+RENDER_POOL_MAX_JOBS = 200    # recycle a worker after this many quotes
+RENDER_TIMEOUT = 60           # seconds per quote
+
+# Identical quotes are laid out once ('native' backend). Every quote
+# prints its own number (quote_ids), date and time: native_pdf draws
+# those (STAMP_FIELDS) apart from the cached pages, on each render. The
+# wkhtmltopdf backends print them inside the HTML page, so they render
+# every quote in full. enquiry_id is not printed at all.
+PDF_CACHE_ENABLED = True
+PDF_CACHE_MAX_ENTRIES = 1000
+PDF_CACHE_IGNORE_FIELDS = native_pdf.STAMP_FIELDS + ('enquiry_id',)
+
+# Admission control for generate_invoice (chat turns in 'sync' PDF mode):
+# at most PDF_MAX_CONCURRENT renders at once, PDF_MAX_WAITING more wait up
+# to PDF_WAIT_TIMEOUT seconds; beyond that it raises Overloaded at once
+# (the API answers 429 + Retry-After) instead of piling up wkhtmltopdfs.
+PDF_MAX_CONCURRENT = 2
+PDF_MAX_WAITING = 8
+PDF_WAIT_TIMEOUT = 15
+
+# Quotes rendered to bytes (create_invoice_bytes, the 'memory' PDF mode,
+# /api/quote-pdf) are served from memory. With PDF_PERSIST on, a copy is
+# also written to OUTPUT_DIR by a background thread (see pdf_memory.py);
+# FASTSEWA_PDF_PERSIST=0 keeps them in memory only.
+PDF_PERSIST = os.environ.get('FASTSEWA_PDF_PERSIST', '1') != '0'
+
+# Bulk generation: worker processes (None = one per CPU core)
+BULK_WORKERS = None
+
+# Invoice template (compiled once, reloaded only when the file changes)
+TEMPLATE_DIR = BASE_DIR
+TEMPLATE_NAME = 'invoice_template.html'
+
+# Optional folder for Jinja's compiled bytecode, so a cold worker can skip
+# compiling the template. None = keep compiled template in memory only.
+TEMPLATE_BYTECODE_DIR = None
+
+# =============================================
+# INITIALISATION
+# =============================================
+
+# Importing this module only defines things: wkhtmltopdf, the output
+# folder and the template are set up lazily on first use, or up front
+# by init() at server startup.
+
+class PDFConfig:
+    """
+    Settings for init(); fields left as None keep the module defaults.
+
+    Args:
+        wkhtmltopdf (str): Path to the wkhtmltopdf executable
+        output_dir (str): Folder the PDFs are written to
+        render_backend (str): 'process', 'pool' or 'native'
+        template_bytecode_dir (str): Folder for compiled template bytecode
+        max_concurrent (int): Quotes rendered at once by generate_invoice
+        max_waiting (int): Quotes allowed to wait for a render slot
+    """
+
+    __slots__ = ('wkhtmltopdf', 'output_dir', 'render_backend', 'template_bytecode_dir',
+                 'max_concurrent', 'max_waiting')
+
+    def __init__(self, wkhtmltopdf=None, output_dir=None, render_backend=None,
+                 template_bytecode_dir=None, max_concurrent=None, max_waiting=None):
+        self.wkhtmltopdf = wkhtmltopdf
+        self.output_dir = output_dir
+        self.render_backend = render_backend
+        self.template_bytecode_dir = template_bytecode_dir
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+
+_pdfkit_config = None
+_ready_dirs = set()
+
+def init(config=None, precompile=True):
+    """
+    Applies `config`, creates the output folder, locates wkhtmltopdf and
+    compiles the invoice template, so the first quote pays none of it.
+    Everything here also happens on demand if init() is never called.
+    """
+    global PATH_WKHTMLTOPDF, OUTPUT_DIR, RENDER_BACKEND, PDF_MAX_CONCURRENT, PDF_MAX_WAITING
+    global _pdfkit_config
+
+    if config is not None:
+        if config.wkhtmltopdf is not None:
+            PATH_WKHTMLTOPDF = config.wkhtmltopdf
+            _pdfkit_config = None
+        if config.output_dir is not None:
+            OUTPUT_DIR = config.output_dir
+        if config.render_backend is not None:
+            RENDER_BACKEND = config.render_backend
+        if config.max_concurrent is not None:
+            PDF_MAX_CONCURRENT = config.max_concurrent
+        if config.max_waiting is not None:
+            PDF_MAX_WAITING = config.max_waiting
+    pdf_gate.configure(PDF_MAX_CONCURRENT, PDF_MAX_WAITING, PDF_WAIT_TIMEOUT)
+
+    ensure_output_dir()
+    if precompile:
+        bytecode_dir = config.template_bytecode_dir if config is not None else None
+        precompile_template(bytecode_dir)
+
+def resolve_wkhtmltopdf():
+    """Path of the wkhtmltopdf executable to use"""
+    return (PATH_WKHTMLTOPDF
+            or os.environ.get('FASTSEWA_WKHTMLTOPDF')
+            or shutil.which('wkhtmltopdf')
+            or DEFAULT_WKHTMLTOPDF)
+
+def get_pdfkit_config():
+    """pdfkit configuration, created on the first 'process' render"""
+    global _pdfkit_config
+
+    if _pdfkit_config is None:
+        import pdfkit
+        _pdfkit_config = pdfkit.configuration(wkhtmltopdf=resolve_wkhtmltopdf())
+    return _pdfkit_config
+
+def ensure_output_dir():
+    """Creates OUTPUT_DIR once per path and returns it"""
+    output_dir = OUTPUT_DIR
+    if output_dir not in _ready_dirs:
+        os.makedirs(output_dir, exist_ok=True)
+        _ready_dirs.add(output_dir)
+    return output_dir
+
+# =============================================
+# TEMPLATE CACHE
+# =============================================
+
+_template_lock = threading.Lock()
+_template_cache = {'env': None, 'template': None, 'mtime': None}
+
+def _build_environment(bytecode_dir=None):
+    """Creates the single Jinja2 environment used for all quotes"""
+    import jinja2  # imported here: it is the slowest part of importing this module
+
+    bytecode_cache = None
+    if bytecode_dir:
+        os.makedirs(bytecode_dir, exist_ok=True)
+        bytecode_cache = jinja2.FileSystemBytecodeCache(bytecode_dir)
+
+    return jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+        bytecode_cache=bytecode_cache,
+        auto_reload=True
+    )
+
+def get_invoice_template():
+    """
+    Returns the compiled invoice template.
+    Compiles on first use and again only if the file's mtime has changed.
+    """
+    mtime = os.stat(os.path.join(TEMPLATE_DIR, TEMPLATE_NAME)).st_mtime_ns
+    cache = _template_cache
+
+    if cache['template'] is not None and cache['mtime'] == mtime:
+        return cache['template']
+
+    with _template_lock:
+        if cache['template'] is None or cache['mtime'] != mtime:
+            if cache['env'] is None:
+                cache['env'] = _build_environment(TEMPLATE_BYTECODE_DIR)
+            cache['template'] = cache['env'].get_template(TEMPLATE_NAME)
+            cache['mtime'] = mtime
+
+    return cache['template']
+
+def precompile_template(bytecode_dir=None):
+    """
+    Compiles the invoice template ahead of time (call once at startup).
+
+    Args:
+        bytecode_dir (str): Optional folder to store compiled bytecode in,
+            so later worker processes load it instead of compiling again.
+    """
+    global TEMPLATE_BYTECODE_DIR
+
+    with _template_lock:
+        if bytecode_dir:
+            TEMPLATE_BYTECODE_DIR = bytecode_dir
+        _template_cache.update(env=None, template=None, mtime=None)
+
+    return get_invoice_template()
+
+# =============================================
+# RENDERER POOL
+# =============================================
+
+_pool_lock = threading.Lock()
+_renderer_pool = None
+
+def get_renderer_pool():
+    """Returns the shared warm renderer pool, creating it on first use"""
+    global _renderer_pool
+
+    if _renderer_pool is None:
+        with _pool_lock:
+            if _renderer_pool is None:
+                _renderer_pool = RendererPool(
+                    resolve_wkhtmltopdf(),
+                    options=PDF_OPTIONS,
+                    size=RENDER_POOL_SIZE,
+                    max_jobs=RENDER_POOL_MAX_JOBS,
+                    timeout=RENDER_TIMEOUT
+                )
+    return _renderer_pool
+
+def shutdown_renderer_pool():
+    """Stops all warm renderer workers"""
+    global _renderer_pool
+
+    with _pool_lock:
+        if _renderer_pool is not None:
+            _renderer_pool.close()
+            _renderer_pool = None
+
+def _reset_after_fork():
+    """In a forked worker: the parent's renderer processes are not ours to use or stop"""
+    global _renderer_pool, _pool_lock, _template_lock
+    _renderer_pool = None
+    _pool_lock = threading.Lock()
+    _template_lock = threading.Lock()
+    pdf_gate.reset_after_fork()
+
+if hasattr(os, 'register_at_fork'):  # not on Windows
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def render_pdf(html, filepath, backend=None):
+    """Converts rendered HTML to a PDF file with wkhtmltopdf ('process' or 'pool')"""
+    if (backend or RENDER_BACKEND) == 'pool':
+        get_renderer_pool().render(html, os.path.abspath(filepath))
+    else:
+        import pdfkit
+        pdfkit.from_string(html, filepath, configuration=get_pdfkit_config(), options=PDF_OPTIONS)
+
+def render_native_pdf(context):
+    """
+    Native PDF bytes of a quote, reusing the pages laid out for an
+    identical earlier quote. Returns (pdf_bytes, reused_layout).
+    """
+    if not PDF_CACHE_ENABLED:
+        return native_pdf.render_invoice(context), False
+    
+    key = pdf_cache.key_for(context)
+    pages = pdf_cache.lookup(key)
+    if pages is not None:
+        return native_pdf.render_invoice(context, pages=pages), True
+    
+    pages = native_pdf.layout(context)
+    pdf_cache.store(key, pages)
+    return native_pdf.render_invoice(context, pages=pages), False
+
+def render_pdf_bytes(html, backend=None):
+    """Converts rendered HTML to PDF bytes with wkhtmltopdf ('process' or 'pool')"""
+    if (backend or RENDER_BACKEND) == 'pool':
+        # Warm workers only write to a path: use a temporary file
+        fd, tmp_path = tempfile.mkstemp(suffix='.pdf', prefix='fastsewa_')
+        os.close(fd)
+        try:
+            get_renderer_pool().render(html, tmp_path)
+            with open(tmp_path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(tmp_path)
+    
+    import pdfkit
+    return pdfkit.from_string(html, False, configuration=get_pdfkit_config(), options=PDF_OPTIONS)
+
+# =============================================
+# PDF CACHE
+# =============================================
+
+pdf_cache = PDFCache(PDF_CACHE_MAX_ENTRIES, PDF_CACHE_IGNORE_FIELDS)
+
+def get_pdf_cache_stats():
+    """Hit / miss / eviction counters of the PDF cache"""
+    return pdf_cache.snapshot()
+
+# =============================================
+# ADMISSION CONTROL
+# =============================================
+
+pdf_gate = AdmissionGate('PDF generation', PDF_MAX_CONCURRENT, PDF_MAX_WAITING, PDF_WAIT_TIMEOUT)
+
+def get_pdf_admission_stats():
+    """Render limit, current load and rejection counts of generate_invoice"""
+    return pdf_gate.snapshot()
 
 # =============================================
 # SERVICE MAPPING
@@ -35,9 +353,9 @@ def get_service_name(code):
 # MAIN PDF GENERATION FUNCTION
 # =============================================
 
-def generate_invoice(user_data, enquiry_data):
+def create_invoice_pdf(user_data, enquiry_data, backend=None):
     """
-    Generates professional PDF invoice/quote
+    Renders the quote and writes the PDF to OUTPUT_DIR
     
     Args:
         user_data (dict): Customer information
@@ -46,72 +364,153 @@ def generate_invoice(user_data, enquiry_data):
             - address: str
             
         enquiry_data (dict): Service request details
-            - id: int/str (unique identifier)
+            - id: int/str (caller's enquiry reference, optional; the
+              quote gets its own unique number from quote_ids)
             - service_type: str (FS_BUILD, FS_SECURE, etc.)
             - form_data: dict with service-specific details
+        
+        backend (str): 'process', 'pool' or 'native' (default RENDER_BACKEND)
     
     Returns:
-        str: Success/error message with filename
+        str: Path of the generated PDF (raises on failure)
     """
     
     try:
-        # 1. Setup Jinja2 Template Environment
-        current_directory = os.path.dirname(os.path.abspath(__file__))
-        template_loader = jinja2.FileSystemLoader(current_directory)
-        template_env = jinja2.Environment(loader=template_loader)
-        template = template_env.get_template('invoice_template.html')
-        
-        # 2. Extract and validate data
-        forms = enquiry_data.get('form_data', {})
-        enquiry_id = enquiry_data.get('id', 'UNKNOWN')
-        service_code = enquiry_data.get('service_type', 'GENERAL')
-        
-        # 3. Prepare context for HTML rendering
-        context = {
-            'customer_name': user_data.get('full_name', 'Valued Customer'),
-            'customer_phone': user_data.get('phone', 'Not Provided'),
-            'customer_address': user_data.get('address', 'Not Provided'),
-            'quote_id': f"FS-{enquiry_id}",
-            'date': datetime.now().strftime("%d %B %Y"),
-            'time': datetime.now().strftime("%I:%M %p"),
-            'service_category': get_service_name(service_code),
-            'service_description': forms.get('requirements', 'Standard Service Request'),
-            'amount': forms.get('budget_range', 'Estimate on Request'),
-            'total_amount': forms.get('budget_range', 'To Be Confirmed'),
-            
-            # Additional service-specific details
-            'plot_area': forms.get('plot_area', 'N/A'),
-            'property_type': forms.get('property_type', 'N/A'),
-            'guard_count': forms.get('guard_count', 'N/A'),
-            'symptoms': forms.get('symptoms', 'N/A')
-        }
+        return _write_invoice_pdf(user_data, enquiry_data, backend or RENDER_BACKEND)
+    except Exception:
+        metrics.PDFS.inc('failed')
+        raise
+
+def _invoice_context(user_data, enquiry_data):
+    """Template context and file name of a new quote (takes a quote number)"""
+    
+    # 1. Extract and validate data
+    forms = enquiry_data.get('form_data', {})
+    quote_number = quote_ids.next_quote_id()
+    service_code = enquiry_data.get('service_type', 'GENERAL')
+    
+    # 2. Prepare context for HTML rendering
+    context = {
+        'customer_name': user_data.get('full_name', 'Valued Customer'),
+        'customer_phone': user_data.get('phone', 'Not Provided'),
+        'customer_address': user_data.get('address', 'Not Provided'),
+        'quote_id': f"FS-{quote_number}",
+        'enquiry_id': enquiry_data.get('id'),
+        'date': datetime.now().strftime("%d %B %Y"),
+        'time': datetime.now().strftime("%I:%M %p"),
+        'service_category': get_service_name(service_code),
+        'service_description': forms.get('requirements', 'Standard Service Request'),
+        'amount': forms.get('budget_range', 'Estimate on Request'),
+        'total_amount': forms.get('budget_range', 'To Be Confirmed'),
         
-        # 4. Render HTML from template
-        output_html = template.render(context)
+        # Additional service-specific details
+        'plot_area': forms.get('plot_area', 'N/A'),
+        'property_type': forms.get('property_type', 'N/A'),
+        'guard_count': forms.get('guard_count', 'N/A'),
+        'symptoms': forms.get('symptoms', 'N/A')
+    }
+    
+    # 3. Generate unique filename (the quote number is never reused)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"FastSewa_Quote_{quote_number}_{timestamp}.pdf"
+    return context, filename
+
+def _write_invoice_pdf(user_data, enquiry_data, backend):
+    context, filename = _invoice_context(user_data, enquiry_data)
+    filepath = os.path.join(ensure_output_dir(), filename)
+    reused = False
+    
+    if backend == 'native':
+        # 4. Lay out the PDF directly (or reuse an identical quote's pages) and write it
+        with metrics.stage_timer('pdf_native'):
+            pdf_bytes, reused = render_native_pdf(context)
+        with metrics.stage_timer('file_write'):
+            with open(filepath, 'wb') as f:
+                f.write(pdf_bytes)
+    else:
+        # 4. Render HTML from the cached, compiled template
+        with metrics.stage_timer('template_render'):
+            output_html = get_invoice_template().render(context)
         
-        # 5. Generate unique filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"FastSewa_Quote_{enquiry_id}_{timestamp}.pdf"
-        filepath = os.path.join(OUTPUT_DIR, filename)
+        # 5. Convert HTML to PDF (wkhtmltopdf writes the file itself)
+        with metrics.stage_timer('pdf_convert'):
+            render_pdf(output_html, filepath, backend)
+    
+    metrics.PDFS.inc('cached' if reused else 'generated')
+    return filepath
+
+def create_invoice_bytes(user_data, enquiry_data, backend=None, persist=None):
+    """
+    Renders the quote in memory, without the disk round-trip of
+    create_invoice_pdf. The bytes stay downloadable from pdf_memory and,
+    if persisted, are written to OUTPUT_DIR in the background.
+    
+    Args:
+        user_data (dict): Customer information (see create_invoice_pdf)
+        enquiry_data (dict): Service request details (see create_invoice_pdf)
+        backend (str): 'process', 'pool' or 'native' (default RENDER_BACKEND)
+        persist (bool): Save a copy to OUTPUT_DIR (default PDF_PERSIST)
+    
+    Returns:
+        tuple: (filename, pdf_bytes) (raises on failure)
+    """
+    
+    backend = backend or RENDER_BACKEND
+    reused = False
+    try:
+        context, filename = _invoice_context(user_data, enquiry_data)
         
-        # 6. Convert HTML to PDF
-        pdfkit.from_string(
-            output_html, 
-            filepath, 
-            configuration=config,
-            options={
-                'page-size': 'A4',
-                'margin-top': '0.5in',
-                'margin-right': '0.5in',
-                'margin-bottom': '0.5in',
-                'margin-left': '0.5in',
-                'encoding': "UTF-8",
-                'enable-local-file-access': None
-            }
-        )
+        if backend == 'native':
+            with metrics.stage_timer('pdf_native'):
+                pdf_bytes, reused = render_native_pdf(context)
+        else:
+            with metrics.stage_timer('template_render'):
+                output_html = get_invoice_template().render(context)
+            with metrics.stage_timer('pdf_convert'):
+                pdf_bytes = render_pdf_bytes(output_html, backend)
+    except Exception:
+        metrics.PDFS.inc('failed')
+        raise
+    
+    persist = PDF_PERSIST if persist is None else persist
+    pdf_memory.put(filename, pdf_bytes, ensure_output_dir() if persist else None)
+    
+    metrics.PDFS.inc('cached' if reused else 'generated')
+    return filename, pdf_bytes
+
+def generate_invoice(user_data, enquiry_data, backend=None, in_memory=False):
+    """
+    Generates professional PDF invoice/quote
+    
+    Args:
+        user_data (dict): Customer information (see create_invoice_pdf)
+        enquiry_data (dict): Service request details (see create_invoice_pdf)
+        backend (str): 'process', 'pool' or 'native' (default RENDER_BACKEND)
+        in_memory (bool): Render with create_invoice_bytes instead of
+            writing the file first
+    
+    Returns:
+        str: Success/error message with filename
+    
+    Raises:
+        Overloaded: Too many quotes are rendering or waiting already
+    """
+    
+    try:
+        with pdf_gate.slot():
+            if in_memory:
+                filename, _ = create_invoice_bytes(user_data, enquiry_data, backend)
+                filepath = os.path.join(OUTPUT_DIR, filename) if PDF_PERSIST else 'memory'
+            else:
+                filepath = create_invoice_pdf(user_data, enquiry_data, backend)
+                filename = os.path.basename(filepath)
         
         return f"✅ PDF Created Successfully: {filename}\n📄 Location: {filepath}"
         
+    except Overloaded:
+        metrics.PDFS.inc('rejected')
+        raise
+        
     except FileNotFoundError:
         return "❌ Error: invoice_template.html not found. Please ensure template file is in the same directory."
     
@@ -122,25 +521,78 @@ def generate_invoice(user_data, enquiry_data):
 # UTILITY FUNCTION (Optional - for bulk generation)
 # =============================================
 
-def generate_bulk_invoices(enquiries_list):
+def _bulk_render_one(user_data, enquiry_data):
+    """Renders one bulk item and returns its result record"""
+    started = time.perf_counter()
+    result = {'id': enquiry_data.get('id'), 'filename': None, 'duration': 0.0, 'error': None}
+    
+    try:
+        result['filename'] = os.path.basename(create_invoice_pdf(user_data, enquiry_data))
+    except Exception as e:
+        result['error'] = str(e)
+    
+    result['duration'] = time.perf_counter() - started
+    return result
+
+def _bulk_render_chunk(chunk):
+    """Runs in a worker process: renders several items in one task"""
+    return [_bulk_render_one(user_data, enquiry_data) for user_data, enquiry_data in chunk]
+
+def iter_bulk_invoices(enquiries_list, workers=None, chunksize=1):
+    """
+    Renders enquiries across a bounded process pool
+    
+    Args:
+        enquiries_list: List of (user_data, enquiry_data) tuples
+        workers (int): Max worker processes (default BULK_WORKERS / CPU count)
+        chunksize (int): Items sent to a worker per task
+    
+    Yields:
+        dict: {'id', 'filename', 'duration', 'error'} as each item finishes
+    """
+    items = list(enquiries_list)
+    workers = workers or BULK_WORKERS or os.cpu_count() or 1
+    chunksize = max(1, chunksize)
+    
+    if workers == 1 or len(items) <= 1:
+        for user_data, enquiry_data in items:
+            yield _bulk_render_one(user_data, enquiry_data)
+        return
+    
+    from concurrent.futures import ProcessPoolExecutor, as_completed  # pulls in multiprocessing
+    
+    chunks = [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+    
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        futures = [pool.submit(_bulk_render_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+def generate_bulk_invoices(enquiries_list, workers=None, chunksize=1, on_result=None):
     """
     Generate multiple PDFs in batch
     
     Args:
         enquiries_list: List of (user_data, enquiry_data) tuples
+        workers (int): Max worker processes (default BULK_WORKERS / CPU count)
+        chunksize (int): Items sent to a worker per task
+        on_result (callable): Called with each item's result as it finishes
     
     Returns:
-        dict: Summary of successes and failures
+        dict: Summary of successes and failures, plus per-item results
     """
-    results = {"success": [], "failed": []}
+    results = {"success": [], "failed": [], "results": []}
     
-    for user_data, enquiry_data in enquiries_list:
-        result = generate_invoice(user_data, enquiry_data)
+    for item in iter_bulk_invoices(enquiries_list, workers=workers, chunksize=chunksize):
+        results["results"].append(item)
         
-        if "✅" in result:
-            results["success"].append(enquiry_data.get('id'))
+        if item['error'] is None:
+            results["success"].append(item['id'])
         else:
-            results["failed"].append(enquiry_data.get('id'))
+            results["failed"].append(item['id'])
+        
+        if on_result is not None:
+            on_result(item)
     
     return results
 
@@ -0,0 +1,154 @@
+"""
+In-Memory PDFs
+Quotes rendered straight to bytes (pdf_generator.create_invoice_bytes)
+are served from memory; writing them into generated_pdfs/ is optional
+and happens on a background thread, off the request path.
+
+- put() keeps the bytes in a bounded LRU (by total size) so
+  /api/download-pdf/<filename> can answer without touching the disk.
+- With persist on, the bytes are also queued for the writer thread,
+  which writes each file to a temporary name and renames it into place.
+  When the queue is full (the disk can't keep up) put() writes the file
+  itself rather than lose the archive copy.
+
+The store belongs to one process. With several workers a download can
+reach a worker that didn't render the PDF: it then serves the saved file
+(waiting briefly for the writer, see api_common.wait_for_pdf_file), so
+persist must stay on; memory-only PDFs need a single-process server.
+"""
+
+import atexit
+import os
+import threading
+from collections import OrderedDict, deque
+
+# =============================================
+# CONFIGURATION
+# =============================================
+
+MEMORY_PDF_MAX_BYTES = 64 * 1024 * 1024   # PDFs kept in memory for downloads
+MAX_QUEUED_WRITES = 200                   # beyond this, put() writes inline
+
+# =============================================
+# STORE
+# =============================================
+
+class MemoryPDFStore:
+    """
+    Recently rendered PDFs by filename, plus an asynchronous disk writer.
+
+    Args:
+        max_bytes (int): Memory limit for kept PDFs (oldest dropped first)
+        max_queued (int): Pending disk writes before put() writes inline
+    """
+
+    def __init__(self, max_bytes=MEMORY_PDF_MAX_BYTES, max_queued=MAX_QUEUED_WRITES):
+        self.max_bytes = max_bytes
+        self.max_queued = max_queued
+        self._reset()
+
+    def _reset(self):
+        self._pdfs = OrderedDict()   # filename -> bytes, oldest first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._queue = deque()        # (path, bytes) waiting for the writer
+        self._wake = threading.Condition(threading.Lock())
+        self._writing = 0
+        self._writer = None
+        self.stats = {'stored': 0, 'hits': 0, 'misses': 0, 'evictions': 0,
+                      'persisted': 0, 'inline_writes': 0, 'errors': 0}
+
+    def reset_after_fork(self):
+        """A forked worker starts empty, with its own writer thread"""
+        self._reset()
+
+    # ---------- memory ----------
+
+    def put(self, filename, data, directory=None):
+        """
+        Keeps `data` for downloads and, when `directory` is given, queues
+        it to be written there as `filename`
+        """
+        with self._lock:
+            old = self._pdfs.pop(filename, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._pdfs[filename] = data
+            self._bytes += len(data)
+            self.stats['stored'] += 1
+            while self._bytes > self.max_bytes and len(self._pdfs) > 1:
+                _, dropped = self._pdfs.popitem(last=False)
+                self._bytes -= len(dropped)
+                self.stats['evictions'] += 1
+
+        if directory is not None:
+            self._persist(os.path.join(directory, filename), data)
+
+    def get(self, filename):
+        """The PDF's bytes, or None if it isn't (or no longer) in memory"""
+        with self._lock:
+            data = self._pdfs.get(filename)
+            if data is None:
+                self.stats['misses'] += 1
+                return None
+            self._pdfs.move_to_end(filename)
+            self.stats['hits'] += 1
+            return data
+
+    # ---------- disk ----------
+
+    def _persist(self, path, data):
+        with self._wake:
+            if len(self._queue) < self.max_queued:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name='pdf-persist', daemon=True)
+                    self._writer.start()
+                self._queue.append((path, data))
+                self._wake.notify()
+                return
+        self.stats['inline_writes'] += 1
+        self._write(path, data)
+
+    def _write_loop(self):
+        while True:
+            with self._wake:
+                while not self._queue:
+                    self._wake.wait()
+                path, data = self._queue.popleft()
+                self._writing += 1
+            try:
+                self._write(path, data)
+            finally:
+                with self._wake:
+                    self._writing -= 1
+                    self._wake.notify_all()
+
+    def _write(self, path, data):
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self.stats['persisted'] += 1
+        except OSError as e:
+            self.stats['errors'] += 1
+            print(f"⚠️ Could not save {os.path.basename(path)}: {e}")
+
+    def flush(self, timeout=30):
+        """Waits until every queued PDF is on disk; False on timeout"""
+        with self._wake:
+            return self._wake.wait_for(lambda: not self._queue and not self._writing, timeout)
+
+    def snapshot(self):
+        with self._lock:
+            kept, kept_bytes = len(self._pdfs), self._bytes
+        return dict(self.stats, kept=kept, kept_bytes=kept_bytes, max_bytes=self.max_bytes,
+                    queued_writes=len(self._queue))
+
+
+pdf_memory = MemoryPDFStore()
+
+if hasattr(os, 'register_at_fork'):  # not on Windows
+    os.register_at_fork(after_in_child=pdf_memory.reset_after_fork)
+
+atexit.register(pdf_memory.flush)   # the writer thread is a daemon
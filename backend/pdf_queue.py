@@ -0,0 +1,249 @@
+"""
+Durable PDF Job Queue
+SQLite-backed queue so PDF rendering runs outside the chat request
+"""
+
+import json
+import os
+import sqlite3
+import time
+import uuid
+
+from admission import Overloaded
+
+# =============================================
+# CONFIGURATION
+# =============================================
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdf_jobs.db')
+
+# A job left in 'rendering' longer than this is assumed to belong to a
+# crashed worker and is put back in the queue
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+
+# Done and failed jobs are deleted this long after they finished (the
+# status stays pollable until then). 0 = keep them forever.
+KEEP_FINISHED_SECONDS = 24 * 3600
+
+# Backpressure: submit_job refuses new jobs (Overloaded, a 429 from the
+# API) while this many are already waiting. 0 = no limit.
+MAX_QUEUED_JOBS = 500
+QUEUE_RETRY_AFTER = 10    # seconds suggested to rejected clients
+
+# Job states
+QUEUED = 'queued'
+RENDERING = 'rendering'
+DONE = 'done'
+FAILED = 'failed'
+
+# =============================================
+# DATABASE
+# =============================================
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pdf_jobs (
+    job_id       TEXT PRIMARY KEY,
+    status       TEXT NOT NULL,
+    user_data    TEXT NOT NULL,
+    enquiry_data TEXT NOT NULL,
+    pdf_file     TEXT,
+    error        TEXT,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    created_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pdf_jobs_status ON pdf_jobs (status);
+"""
+
+_initialised = set()
+
+def _connect(db_path=None):
+    """Opens a connection (one per call; SQLite connections are cheap)"""
+    path = db_path or DB_PATH
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+
+    if path not in _initialised:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        _initialised.add(path)
+
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def _row_to_job(row):
+    if row is None:
+        return None
+    return {
+        'job_id': row['job_id'],
+        'status': row['status'],
+        'user_data': json.loads(row['user_data']),
+        'enquiry_data': json.loads(row['enquiry_data']),
+        'pdf_file': row['pdf_file'],
+        'error': row['error'],
+        'attempts': row['attempts'],
+        'created_at': row['created_at'],
+        'updated_at': row['updated_at']
+    }
+
+# =============================================
+# PRODUCER SIDE (chat / API)
+# =============================================
+
+def submit_job(user_data, enquiry_data, db_path=None):
+    """
+    Adds a PDF job to the queue
+
+    Returns:
+        str: job id to poll with get_job()
+
+    Raises:
+        Overloaded: MAX_QUEUED_JOBS jobs are waiting already
+    """
+    job_id = uuid.uuid4().hex
+    now = time.time()
+
+    conn = _connect(db_path)
+    try:
+        if MAX_QUEUED_JOBS:
+            depth = conn.execute("SELECT COUNT(*) FROM pdf_jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            if depth >= MAX_QUEUED_JOBS:
+                raise Overloaded(f"PDF queue is full ({depth} jobs waiting)", QUEUE_RETRY_AFTER)
+        conn.execute(
+            "INSERT INTO pdf_jobs (job_id, status, user_data, enquiry_data, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, QUEUED, json.dumps(user_data), json.dumps(enquiry_data), now, now)
+        )
+    finally:
+        conn.close()
+
+    return job_id
+
+def get_job(job_id, db_path=None):
+    """Returns the job as a dict, or None if unknown"""
+    conn = _connect(db_path)
+    try:
+        row = conn.execute("SELECT * FROM pdf_jobs WHERE job_id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _row_to_job(row)
+
+def queue_position(job_id, db_path=None):
+    """How many queued jobs are ahead of this one (0 = next), or None"""
+    conn = _connect(db_path)
+    try:
+        row = conn.execute(
+            "SELECT COUNT(*) FROM pdf_jobs WHERE status = ? "
+            "AND rowid < (SELECT rowid FROM pdf_jobs WHERE job_id = ?)",
+            (QUEUED, job_id)
+        ).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+def queue_depth(db_path=None):
+    """Number of jobs waiting to be rendered"""
+    conn = _connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM pdf_jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+    finally:
+        conn.close()
+
+# =============================================
+# WORKER SIDE
+# =============================================
+
+def claim_next_job(db_path=None):
+    """Atomically moves the oldest queued job to 'rendering' and returns it"""
+    conn = _connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT * FROM pdf_jobs WHERE status = ? ORDER BY rowid LIMIT 1", (QUEUED,)
+        ).fetchone()
+
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+
+        conn.execute(
+            "UPDATE pdf_jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+            (RENDERING, time.time(), row['job_id'])
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    job = _row_to_job(row)
+    job['status'] = RENDERING
+    job['attempts'] += 1
+    return job
+
+def complete_job(job_id, pdf_file, db_path=None):
+    _set_result(job_id, DONE, pdf_file=pdf_file, db_path=db_path)
+
+def fail_job(job_id, error, db_path=None):
+    _set_result(job_id, FAILED, error=error, db_path=db_path)
+
+def _set_result(job_id, status, pdf_file=None, error=None, db_path=None):
+    conn = _connect(db_path)
+    try:
+        conn.execute(
+            "UPDATE pdf_jobs SET status = ?, pdf_file = ?, error = ?, updated_at = ? WHERE job_id = ?",
+            (status, pdf_file, error, time.time(), job_id)
+        )
+    finally:
+        conn.close()
+
+def requeue_stale_jobs(lease_seconds=LEASE_SECONDS, db_path=None):
+    """
+    Puts back jobs whose worker died mid-render.
+    Jobs that already used MAX_ATTEMPTS are marked failed instead.
+
+    Returns:
+        int: number of jobs requeued
+    """
+    cutoff = time.time() - lease_seconds
+    conn = _connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "UPDATE pdf_jobs SET status = ?, error = 'Worker stopped during render', updated_at = ? "
+            "WHERE status = ? AND updated_at < ? AND attempts >= ?",
+            (FAILED, time.time(), RENDERING, cutoff, MAX_ATTEMPTS)
+        )
+        cursor = conn.execute(
+            "UPDATE pdf_jobs SET status = ?, updated_at = ? WHERE status = ? AND updated_at < ?",
+            (QUEUED, time.time(), RENDERING, cutoff)
+        )
+        conn.execute("COMMIT")
+        return cursor.rowcount
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def purge_finished_jobs(max_age=KEEP_FINISHED_SECONDS, db_path=None):
+    """
+    Deletes done and failed jobs that finished more than `max_age`
+    seconds ago, so the table only holds recent history.
+
+    Returns:
+        int: number of jobs deleted
+    """
+    if not max_age:
+        return 0
+    conn = _connect(db_path)
+    try:
+        cursor = conn.execute(
+            "DELETE FROM pdf_jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (DONE, FAILED, time.time() - max_age)
+        )
+        return cursor.rowcount
+    finally:
+        conn.close()
@@ -0,0 +1,251 @@
+"""
+Warm PDF Renderer Pool
+Keeps wkhtmltopdf processes alive between quotes instead of starting one per PDF
+"""
+
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+
+# With --read-args-from-stdin, wkhtmltopdf (0.12.x) reads one line of
+# arguments per job, appends them to its own command line and converts.
+# Its progress goes to stderr and ends with a "Done" line per job; the
+# progress bar redraws itself with carriage returns. After "Done" it may
+# still print for the same job (e.g. "Exit with code 1 due to network
+# error" for a missing image), so its output is read until it has been
+# quiet this long and the next job starts clean.
+JOB_SETTLE_SECONDS = 0.05
+
+# Options that silence the progress output the workers wait for
+SILENCING_OPTIONS = ('quiet', 'q', '--quiet', '-q')
+
+# =============================================
+# HELPERS
+# =============================================
+
+class RendererError(Exception):
+    """Raised when a render fails or the worker process dies"""
+
+
+def options_to_args(options):
+    """Converts a pdfkit-style options dict into wkhtmltopdf arguments"""
+    args = []
+    for key, value in (options or {}).items():
+        args.append(key if key.startswith('-') else f"--{key}")
+        if value is not None:
+            args.append(str(value))
+    return args
+
+
+def wkhtmltopdf_version(wkhtmltopdf):
+    """Version line of the wkhtmltopdf executable, or None if it can't be run"""
+    try:
+        result = subprocess.run([wkhtmltopdf, '--version'], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    output = (result.stdout or result.stderr).strip()
+    return output if output.startswith('wkhtmltopdf') else None
+
+
+def _status(line):
+    """A stderr line as last drawn (progress redraws with carriage returns)"""
+    return line.rsplit('\r', 1)[-1].strip()
+
+
+def _quote(arg):
+    """Quotes one argument for wkhtmltopdf's --read-args-from-stdin parser"""
+    return '"' + arg.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+# =============================================
+# WORKER (one warm wkhtmltopdf process)
+# =============================================
+
+class RendererWorker:
+    """
+    A wkhtmltopdf process started with --read-args-from-stdin.
+    Each job is one line "<input.html> <output.pdf>" on stdin; WebKit and
+    fonts are loaded once and reused for every following job.
+    """
+
+    def __init__(self, wkhtmltopdf, options=None, timeout=60):
+        self.wkhtmltopdf = wkhtmltopdf
+        self.options = {key: value for key, value in (options or {}).items()
+                        if key not in SILENCING_OPTIONS}
+        self.timeout = timeout
+        self.jobs_done = 0
+        self._process = None
+        self._lines = None
+
+    def start(self):
+        args = [self.wkhtmltopdf] + options_to_args(self.options) + ['--read-args-from-stdin']
+        self._process = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            errors='replace'
+        )
+        self._lines = queue.Queue()
+        threading.Thread(
+            target=self._pump_stderr,
+            args=(self._process.stderr, self._lines),
+            daemon=True
+        ).start()
+        self.jobs_done = 0
+
+    @staticmethod
+    def _pump_stderr(stream, lines):
+        for line in stream:
+            lines.put(line)
+        lines.put(None)  # EOF: process exited
+
+    @property
+    def alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def render(self, html, output_path):
+        """Renders one HTML string to output_path, raises RendererError"""
+        if self.alive:
+            self._drain()
+        if not self.alive:
+            self.start()
+
+        fd, html_path = tempfile.mkstemp(suffix='.html', prefix='fastsewa_')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(html)
+
+            try:
+                self._process.stdin.write(f"{_quote(html_path)} {_quote(output_path)}\n")
+                self._process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                raise RendererError(f"Renderer process died: {e}")
+
+            problems = self._wait_for_job()
+            self.jobs_done += 1
+
+            # Warnings (a missing image...) still give a usable PDF
+            if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+                raise RendererError('; '.join(problems) or "Renderer produced no output")
+        finally:
+            try:
+                os.remove(html_path)
+            except OSError:
+                pass
+
+    def _drain(self):
+        """Drops output left over from earlier jobs (restarts a dead process)"""
+        while True:
+            try:
+                line = self._lines.get_nowait()
+            except queue.Empty:
+                return
+            if line is None:
+                self.close()
+                return
+
+    def _wait_for_job(self):
+        """
+        Reads this job's output: until "Done" (or "Exit with code" when it
+        ends without one), then until JOB_SETTLE_SECONDS of quiet.
+
+        Returns:
+            list: error / exit lines printed for the job
+        """
+        problems = []
+        while True:
+            try:
+                line = self._lines.get(timeout=self.timeout)
+            except queue.Empty:
+                self.close()
+                raise RendererError(f"Render timed out after {self.timeout}s")
+
+            if line is None:
+                raise RendererError("Renderer process exited unexpectedly")
+            status = _status(line)
+            if status.startswith(('Error:', 'Exit with code')):
+                problems.append(status)
+            if status == 'Done' or status.startswith('Exit with code'):
+                break
+
+        while True:
+            try:
+                line = self._lines.get(timeout=JOB_SETTLE_SECONDS)
+            except queue.Empty:
+                return problems
+            if line is None:
+                self._lines.put(None)   # let the next render() see the exit
+                return problems
+            status = _status(line)
+            if status.startswith(('Error:', 'Exit with code')):
+                problems.append(status)
+
+    def close(self):
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=5)
+        except Exception:
+            process.kill()
+
+# =============================================
+# POOL
+# =============================================
+
+class RendererPool:
+    """
+    Fixed-size pool of warm renderer workers.
+
+    Args:
+        wkhtmltopdf (str): Path to the wkhtmltopdf executable
+        options (dict): pdfkit-style options applied to every job
+        size (int): Number of worker processes
+        max_jobs (int): Recycle a worker after this many jobs
+        timeout (int): Seconds to wait for one render
+    """
+
+    def __init__(self, wkhtmltopdf, options=None, size=2, max_jobs=200, timeout=60):
+        self.size = size
+        self.max_jobs = max_jobs
+        self._new_worker = lambda: RendererWorker(wkhtmltopdf, options, timeout)
+        self._idle = queue.LifoQueue()
+        self.stats = {'jobs': 0, 'failed': 0, 'recycled': 0, 'crashed': 0}
+        self._stats_lock = threading.Lock()
+
+        # Workers start lazily on their first job
+        for _ in range(size):
+            self._idle.put(self._new_worker())
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def render(self, html, output_path):
+        """Renders on the next idle worker (blocks while all are busy)"""
+        worker = self._idle.get()
+        try:
+            worker.render(html, output_path)
+            self._count('jobs')
+        except RendererError:
+            self._count('failed')
+            if not worker.alive:
+                self._count('crashed')
+                worker.close()
+                worker = self._new_worker()
+            raise
+        finally:
+            if worker.jobs_done >= self.max_jobs:
+                self._count('recycled')
+                worker.close()
+                worker = self._new_worker()
+            self._idle.put(worker)
+
+    def close(self):
+        for _ in range(self.size):
+            self._idle.get().close()
@@ -3,8 +3,15 @@ PDF Generation Testing Script
 Tests all 6 FastSewa services with sample data
 """
 
+import os
+import re
+import tempfile
+import time
+
+import native_pdf
 import pdf_generator
 from datetime import datetime
+from pdf_renderer_pool import RendererError, RendererPool, wkhtmltopdf_version
 
 # =============================================
 # TEST DATA
@@ -135,6 +142,170 @@ def run_all_tests():
     
     print("="*60 + "\n")
 
+# =============================================
+# NATIVE BACKEND CHECKS (no wkhtmltopdf needed)
+# =============================================
+
+def native_context(**overrides):
+    """Render context of a typical quote, as pdf_generator builds it"""
+    context = {
+        'customer_name': 'Amit Sharma',
+        'customer_phone': '+91-9876543210',
+        'customer_address': 'Sector 22, Noida, UP',
+        'quote_id': 'FS-100000',
+        'date': '20 December 2025',
+        'time': '04:52 PM',
+        'service_category': pdf_generator.get_service_name('FS_MEDICAL'),
+        'service_description': 'Home nursing care for elderly patient',
+        'amount': 'As per consultation',
+        'total_amount': 'As per consultation',
+        'plot_area': 'N/A',
+        'property_type': 'N/A',
+        'guard_count': 'N/A',
+        'symptoms': 'N/A'
+    }
+    context.update(overrides)
+    return context
+
+def native_pages(pdf_bytes):
+    """Content streams of a native_pdf file, in page order"""
+    return [pdf_bytes[m.end():m.end() + int(m.group(1))]
+            for m in re.finditer(rb'<< /Length (\d+) >>\nstream\n', pdf_bytes)]
+
+def drawn_items(content):
+    """(kind, y from the bottom of the page, text) of every text and box on a page"""
+    items, offsets = [], [0.0]
+    for line in content.split(b'\n'):
+        shift = re.match(rb'q 1 0 0 1 0 (\S+) cm$', line)
+        text_op = re.search(rb'(\S+) Td \((.*)\) Tj ET$', line)
+        box = re.search(rb'\S+ (\S+) \S+ \S+ re f$', line)
+        if shift:
+            offsets.append(offsets[-1] + float(shift.group(1)))
+        elif line == b'Q':
+            offsets.pop()
+        elif text_op:
+            raw = re.sub(rb'\\(.)', rb'\1', text_op.group(2))
+            items.append(('text', float(text_op.group(1)) + offsets[-1], raw.decode('cp1252')))
+        elif box:
+            items.append(('box', float(box.group(1)) + offsets[-1], ''))
+    return items
+
+def check(results, name, ok):
+    print(f"{'✅' if ok else '❌'} {name}")
+    results['success' if ok else 'failed'] += 1
+
+def run_native_tests():
+    print("\n" + "="*60)
+    print("🧪 NATIVE PDF BACKEND - LAYOUT CHECKS")
+    print("="*60 + "\n")
+    
+    results = {"success": 0, "failed": 0}
+    lowest = native_pdf.PAGE_HEIGHT - native_pdf.BOTTOM
+    
+    # A regular quote fits on one page
+    pages = native_pages(native_pdf.render_invoice(native_context()))
+    check(results, "Regular quote is one page", len(pages) == 1)
+    
+    # A very long description continues on further pages, nothing is lost
+    words = [f"symptom{i}" for i in range(3000)]
+    pdf = native_pdf.render_invoice(native_context(service_description=' '.join(words)))
+    pages = native_pages(pdf)
+    items = [item for page in pages for item in drawn_items(page)]
+    drawn_words = ' '.join(text for kind, _, text in items if kind == 'text').split()
+    check(results, f"3000-word description spans pages ({len(pages)})",
+          len(pages) > 1 and b'/Count %d ' % len(pages) in pdf)
+    check(results, "Every word of the description is drawn", drawn_words.count('symptom2999') == 1
+          and all(word in drawn_words for word in words))
+    check(results, "Nothing is drawn below the bottom margin", all(y >= lowest for _, y, _ in items))
+    check(results, "Note and footer are on the last page",
+          any('computer-generated quote' in text for _, _, text in drawn_items(pages[-1])))
+    
+    # A long amount wraps onto more lines instead of being cut
+    amount = ' '.join(["Rs. 25,000 per month for each guard plus GST"] * 8)
+    items = [item for page in native_pages(native_pdf.render_invoice(native_context(total_amount=amount)))
+             for item in drawn_items(page)]
+    drawn = ' '.join(text for kind, _, text in items if kind == 'text').split()
+    check(results, "Long amount is drawn in full", ' '.join(drawn).count(amount) == 1)
+    
+    # Customer details are cut short with an ellipsis
+    items = drawn_items(native_pages(native_pdf.render_invoice(
+        native_context(customer_address='Flat 12, ' * 200)))[0])
+    address = [text for _, _, text in items if '12,' in text]
+    check(results, "Long address is cut to a few lines with '...'",
+          len(address) == native_pdf.INFO_MAX_LINES and address[-1].endswith('...'))
+    
+    # Quotes with identical content reuse the laid-out pages; each still
+    # shows its own quote number, date and time
+    first = native_context(quote_id='FS-100001', date='20 December 2025', time='04:52 PM')
+    second = native_context(quote_id='FS-100002', date='21 December 2025', time='09:15 AM')
+    pdf_generator.pdf_cache.clear()
+    _, first_reused = pdf_generator.render_native_pdf(first)
+    pdf, second_reused = pdf_generator.render_native_pdf(second)
+    shown = [text for _, _, text in drawn_items(native_pages(pdf)[0])]
+    check(results, "Identical content is a PDF cache hit", not first_reused and second_reused)
+    check(results, "Cached quote shows its own number, date and time",
+          {'FS-100002', '21 December 2025', '09:15 AM'} <= set(shown)
+          and not {'FS-100001', '20 December 2025', '04:52 PM'} & set(shown))
+    check(results, "Cached quote matches a fresh render",
+          native_pages(pdf) == native_pages(native_pdf.render_invoice(second)))
+    _, reused = pdf_generator.render_native_pdf(native_context(customer_name='Priya Singh'))
+    check(results, "Different content is a miss", not reused)
+    
+    print(f"\n📊 Native checks: ✅ {results['success']} ❌ {results['failed']}")
+    print("="*60 + "\n")
+    return results['failed'] == 0
+
+# =============================================
+# RENDERER POOL CHECK (needs a real wkhtmltopdf)
+# =============================================
+
+def run_pool_tests():
+    """
+    Sends several jobs through one warm wkhtmltopdf (--read-args-from-stdin),
+    including one with a missing image, whose extra output after "Done"
+    must not be taken for the next job's. Skipped without wkhtmltopdf.
+    """
+    wkhtmltopdf = pdf_generator.resolve_wkhtmltopdf()
+    version = wkhtmltopdf_version(wkhtmltopdf)
+    if version is None:
+        print(f"⏭️  Renderer pool check skipped: no wkhtmltopdf at {wkhtmltopdf}\n")
+        return True
+    
+    print("\n" + "="*60)
+    print(f"🧪 RENDERER POOL - {version}")
+    print("="*60 + "\n")
+    
+    results = {"success": 0, "failed": 0}
+    jobs = [
+        ("plain", "<html><body><h1>Quote 1</h1></body></html>"),
+        ("missing image", '<html><body><h1>Quote 2</h1><img src="file:///fastsewa/missing.png"></body></html>'),
+        ("after missing image", "<html><body><h1>Quote 3</h1></body></html>"),
+        ("plain", "<html><body><h1>Quote 4</h1></body></html>"),
+    ]
+    pool = RendererPool(wkhtmltopdf, options=pdf_generator.PDF_OPTIONS, size=1, timeout=30)
+    
+    with tempfile.TemporaryDirectory() as output_dir:
+        try:
+            for number, (label, html) in enumerate(jobs, 1):
+                path = os.path.join(output_dir, f"job_{number}.pdf")
+                started = time.perf_counter()
+                try:
+                    pool.render(html, path)
+                    with open(path, 'rb') as f:
+                        ok = f.read(5) == b'%PDF-'
+                except RendererError as e:
+                    print(f"   {e}")
+                    ok = False
+                check(results, f"Job {number} ({label}): own PDF in {time.perf_counter() - started:.2f}s", ok)
+        finally:
+            pool.close()
+    
+    check(results, "One worker process served every job", pool.stats['crashed'] == 0)
+    
+    print(f"\n📊 Pool checks: ✅ {results['success']} ❌ {results['failed']}")
+    print("="*60 + "\n")
+    return results['failed'] == 0
+
 # =============================================
 # INTERACTIVE TEST MODE
 # =============================================
@@ -174,6 +345,8 @@ def interactive_test():
 
 if __name__ == "__main__":
     try:
+        run_native_tests()
+        run_pool_tests()
         run_all_tests()
         
         # Optional: Uncomment for interactive mode
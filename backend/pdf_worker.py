@@ -0,0 +1,76 @@
+"""
+PDF Worker
+Drains the PDF job queue. Run from the backend folder:
+
+    python -m pdf_worker            # run forever
+    python -m pdf_worker --once     # process what is queued, then exit
+"""
+
+import argparse
+import os
+import time
+
+import pdf_generator
+import pdf_queue
+
+# =============================================
+# WORKER LOOP
+# =============================================
+
+def process_job(job):
+    """Renders one claimed job and records the result"""
+    try:
+        filepath = pdf_generator.create_invoice_pdf(job['user_data'], job['enquiry_data'])
+        pdf_queue.complete_job(job['job_id'], os.path.basename(filepath))
+        print(f"✅ Job {job['job_id']}: {os.path.basename(filepath)}")
+    except Exception as e:
+        pdf_queue.fail_job(job['job_id'], str(e))
+        print(f"❌ Job {job['job_id']} failed: {e}")
+
+def run(poll_interval=0.5, once=False):
+    requeued = pdf_queue.requeue_stale_jobs()
+    if requeued:
+        print(f"🔁 Requeued {requeued} job(s) left by a stopped worker")
+    pdf_queue.purge_finished_jobs()
+
+    last_sweep = time.time()
+
+    while True:
+        job = pdf_queue.claim_next_job()
+
+        if job is not None:
+            process_job(job)
+            continue
+
+        if once:
+            return
+
+        # Periodically pick up jobs abandoned by other crashed workers
+        # and drop old finished ones
+        if time.time() - last_sweep > pdf_queue.LEASE_SECONDS / 2:
+            pdf_queue.requeue_stale_jobs()
+            pdf_queue.purge_finished_jobs()
+            last_sweep = time.time()
+
+        time.sleep(poll_interval)
+
+# =============================================
+# MAIN EXECUTION
+# =============================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FastSewa PDF worker")
+    parser.add_argument('--poll', type=float, default=0.5, help="seconds between queue checks when idle")
+    parser.add_argument('--once', action='store_true', help="exit when the queue is empty")
+    args = parser.parse_args()
+
+    print("🖨️  FastSewa PDF Worker Started")
+    print(f"   - Queue: {pdf_queue.DB_PATH}")
+    print(f"   - Backend: {pdf_generator.RENDER_BACKEND}\n")
+
+    try:
+        run(poll_interval=args.poll, once=args.once)
+    except KeyboardInterrupt:
+        print("\n⚠️ Worker stopped.")
+    finally:
+        pdf_generator.shutdown_renderer_pool()
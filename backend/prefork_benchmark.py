@@ -0,0 +1,136 @@
+"""
+Pre-fork Memory Benchmark
+Compares per-worker memory when the app is built once in the master
+before forking (gunicorn --preload) with every worker building its own.
+
+Usage:
+    python prefork_benchmark.py
+    python prefork_benchmark.py --workers 8 --patterns 50000
+
+Reports USS (memory only that worker holds) and PSS per worker, read
+from /proc/<pid>/smaps_rollup, so Linux only.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from matcher_benchmark import SAMPLE_MESSAGES, load_intents, vocabulary_intents
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+SMAPS = '/proc/self/smaps_rollup'
+
+# =============================================
+# WORKER SIDE
+# =============================================
+
+def memory_kb():
+    """{'uss', 'pss', 'rss'} of this process in kB"""
+    fields = {}
+    with open(SMAPS, 'r') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+        'pss': fields.get('Pss', 0),
+        'rss': fields.get('Rss', 0)
+    }
+
+def serve_some_requests(app, turns):
+    """Stand-in for real traffic: chat turns from different users"""
+    client = app.test_client()
+    for i in range(turns):
+        message = SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)]
+        client.post('/api/chat', json={'message': message, 'user_id': f"prefork_{os.getpid()}_{i}"})
+
+def run_mode(preload, workers, turns):
+    """Runs in its own interpreter; prints per-worker memory as JSON"""
+    # Importing fastsewa_api builds the app: in the master when preloaded,
+    # otherwise in every worker after the fork
+    preloaded = importlib.import_module('fastsewa_api') if preload else None
+
+    children = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            api_module = preloaded or importlib.import_module('fastsewa_api')
+            serve_some_requests(api_module.app, turns)
+            with os.fdopen(write_fd, 'w') as out:
+                out.write(json.dumps(memory_kb()))
+            os._exit(0)
+        os.close(write_fd)
+        children.append((pid, read_fd))
+
+    results = []
+    for pid, read_fd in children:
+        with os.fdopen(read_fd, 'r') as pipe:
+            results.append(json.loads(pipe.read()))
+        os.waitpid(pid, 0)
+
+    print(json.dumps(results))
+
+# =============================================
+# MAIN EXECUTION
+# =============================================
+
+def measure(preload, workers, turns, env):
+    args = [sys.executable, os.path.abspath(__file__), '--child',
+            '--workers', str(workers), '--turns', str(turns)]
+    if preload:
+        args.append('--preload')
+    output = subprocess.run(args, cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True).stdout
+    results = json.loads(output.strip().splitlines()[-1])
+    return {key: sum(r[key] for r in results) / len(results) / 1024 for key in results[0]}
+
+def report(label, workers, turns, env):
+    separate = measure(False, workers, turns, env)
+    shared = measure(True, workers, turns, env)
+
+    print(f"\n{label}")
+    for name, result in (("per-worker build", separate), ("preload + fork", shared)):
+        print(f"   {name:<17} USS {result['uss']:7.1f} MB | PSS {result['pss']:7.1f} MB | RSS {result['rss']:7.1f} MB")
+    saved = separate['uss'] - shared['uss']
+    print(f"   💾 saved per worker: {saved:.1f} MB USS ({saved * workers:.1f} MB across {workers} workers)")
+
+def main():
+    parser = argparse.ArgumentParser(description="FastSewa pre-fork memory benchmark")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--turns', type=int, default=50, help="chat turns per worker before measuring")
+    parser.add_argument('--patterns', type=int, default=20000, help="extra synthetic patterns")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--preload', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(args.preload, args.workers, args.turns)
+        return
+
+    if not os.path.exists(SMAPS) or not hasattr(os, 'fork'):
+        raise SystemExit("❌ Needs Linux (fork + /proc/self/smaps_rollup)")
+
+    print("\n" + "="*60)
+    print(f"🧠 PRE-FORK MEMORY BENCHMARK ({args.workers} workers, {args.turns} turns each)")
+    print("="*60)
+
+    report("intents.json", args.workers, args.turns, dict(os.environ))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        intents, _ = vocabulary_intents(load_intents(), args.patterns)
+        large_path = os.path.join(workdir, 'intents_large.json')
+        with open(large_path, 'w', encoding='utf-8') as f:
+            json.dump({'intents': intents}, f)
+        report(f"intents.json + {args.patterns}", args.workers, args.turns,
+               dict(os.environ, FASTSEWA_INTENTS=large_path))
+
+    print("\n" + "="*60 + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Quote ID Allocator
+Unique, increasing quote numbers shared by every thread and worker process.
+
+Each process leases a block of numbers from a small SQLite counter and
+hands them out from memory; the database is only touched once per block.
+Numbers left in a block when a process stops are simply skipped.
+"""
+
+import itertools
+import os
+import sqlite3
+import threading
+
+# =============================================
+# CONFIGURATION
+# =============================================
+
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'quote_ids.db')
+
+FIRST_ID = 100000    # above the old 4-digit random ids
+BLOCK_SIZE = 1000    # numbers leased per database round trip
+
+# =============================================
+# BLOCK STORE
+# =============================================
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS id_blocks (
+    name    TEXT PRIMARY KEY,
+    next_id INTEGER NOT NULL
+);
+"""
+
+_initialised = set()
+
+def lease_block(name, size, db_path=None):
+    """Reserves `size` numbers for this process; returns the first one"""
+    path = db_path or DB_PATH
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        if path not in _initialised:
+            conn.executescript(_SCHEMA)
+            _initialised.add(path)
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT next_id FROM id_blocks WHERE name = ?", (name,)).fetchone()
+        start = row[0] if row else FIRST_ID
+        conn.execute(
+            "INSERT INTO id_blocks (name, next_id) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET next_id = excluded.next_id",
+            (name, start + size)
+        )
+        conn.execute("COMMIT")
+        return start
+    finally:
+        conn.close()
+
+# =============================================
+# ALLOCATOR
+# =============================================
+
+class IdAllocator:
+    """
+    Hands out unique ids from leased blocks.
+
+    The hot path is one next() on an itertools.count (atomic in CPython),
+    so threads don't queue on a lock; only the thread that finds the block
+    used up takes the lock and leases the next one.
+
+    Args:
+        name (str): Counter name in the store (one sequence per name)
+        block_size (int): Numbers leased at a time
+        db_path (str): SQLite file (default DB_PATH)
+    """
+
+    def __init__(self, name, block_size=BLOCK_SIZE, db_path=None):
+        self.name = name
+        self.block_size = block_size
+        self.db_path = db_path
+        self._block = (itertools.count(), 0)   # (counter, end): empty until first use
+        self._lock = threading.Lock()
+
+    def next_id(self):
+        counter, end = self._block
+        value = next(counter)
+        if value < end:
+            return value
+        return self._next_from_new_block()
+
+    def _next_from_new_block(self):
+        with self._lock:
+            while True:
+                counter, end = self._block
+                value = next(counter)
+                if value < end:     # another thread leased a block meanwhile
+                    return value
+                start = lease_block(self.name, self.block_size, self.db_path)
+                self._block = (itertools.count(start), start + self.block_size)
+
+    def reset_after_fork(self):
+        """A forked child must not reuse the parent's block"""
+        self._block = (itertools.count(), 0)
+        self._lock = threading.Lock()
+
+
+quote_allocator = IdAllocator('quote')
+
+def next_quote_id():
+    """Next quote number (e.g. 100042), unique across threads and processes"""
+    return quote_allocator.next_id()
+
+if hasattr(os, 'register_at_fork'):  # not on Windows
+    os.register_at_fork(after_in_child=quote_allocator.reset_after_fork)
@@ -0,0 +1,402 @@
+"""
+Session Journal
+Append-only write-ahead log that lets the in-memory session store survive
+a worker restart (see JournaledSessionStore in session_store.py).
+
+- Every save()/reset() becomes one short JSON line with only what changed.
+- A background thread writes everything that has piled up since its last
+  write and fsyncs once for the whole group (group commit); callers can
+  wait until their record is on disk.
+- Once the file holds many more records than there are live sessions, it
+  is rewritten as one record per session and swapped in atomically.
+- A torn last line (crash mid-write) is ignored and cut off on open.
+- One process per journal: opening it takes a lock on <journal>.lock,
+  so a second server on the same file fails at startup.
+
+Records:
+    ["S", user_id, context, service, {changed fields}, unix_time]   update
+    ["F", user_id, context, service, {all fields}, unix_time]       full state
+    ["R", user_id]                                                  reset
+
+Usage:
+    python session_journal.py chat_sessions.journal    (replay and report)
+"""
+
+import argparse
+import gc
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:   # Windows: no advisory locks, one process per journal is up to you
+    fcntl = None
+
+# =============================================
+# CONFIGURATION
+# =============================================
+
+COMMIT_TIMEOUT = 5.0          # seconds a caller waits for its fsync at most
+COMPACT_MIN_RECORDS = 50000   # don't compact small journals
+COMPACT_RATIO = 4             # compact when records > ratio * live sessions
+REPLAY_CHUNK_BYTES = 4 * 1024 * 1024
+
+UPDATE = 'S'
+FULL = 'F'
+RESET = 'R'
+
+# =============================================
+# RECORDS
+# =============================================
+
+def encode(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+
+@contextmanager
+def paused_gc():
+    """Replay builds millions of small lists/dicts that all stay alive, so
+    garbage collections during it would only cost time"""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+def _parse_chunk(body):
+    """Records in `body` (complete lines only)"""
+    # Raw newlines only ever separate records (json escapes them inside
+    # strings), so a whole chunk parses as one array in a single call
+    try:
+        return json.loads(b'[' + body.rstrip(b'\n').replace(b'\n', b',') + b']')
+    except ValueError:
+        records = []
+        for line in body.splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue    # damaged record: skip it, keep the rest
+        return records
+
+def apply_records(records, states):
+    """
+    Folds records into {user_id: [context, service, data, unix_time]}
+    """
+    get = states.get
+    for record in records:
+        try:
+            if record[0] == RESET:
+                states.pop(record[1], None)
+                continue
+            op, user_id, context, service, data, stamp = record
+            state = get(user_id)
+            if state is None or op != UPDATE:
+                states[user_id] = [context, service, data, stamp]
+            else:
+                state[2].update(data)
+                state[0], state[1], state[3] = context, service, stamp
+        except (IndexError, TypeError, ValueError, AttributeError):
+            continue    # malformed record
+    return states
+
+def replay_file(path, chunk_bytes=REPLAY_CHUNK_BYTES):
+    """
+    Reads the journal in chunks and folds it into session states.
+
+    Returns:
+        (states, records, good_bytes, total_bytes): good_bytes ends at the
+        last complete line; anything after it is a torn write
+    """
+    states, count, good_bytes, total_bytes = {}, 0, 0, 0
+    try:
+        with paused_gc(), open(path, 'rb') as f:
+            tail = b''
+            while True:
+                chunk = f.read(chunk_bytes)
+                total_bytes += len(chunk)
+                if not chunk:
+                    break
+                chunk = tail + chunk
+                cut = chunk.rfind(b'\n') + 1
+                tail = chunk[cut:]
+                if cut:
+                    records = _parse_chunk(chunk[:cut])
+                    count += len(records)
+                    good_bytes += cut
+                    apply_records(records, states)
+    except FileNotFoundError:
+        pass
+    return states, count, good_bytes, total_bytes
+
+# =============================================
+# JOURNAL
+# =============================================
+
+class SessionJournal:
+    """
+    Append-only journal file with a group-commit writer thread.
+
+    Args:
+        path (str): Journal file
+        compact (callable): Returns the live state as full records (calling
+            begin_compaction with its lock held); run by the writer thread
+            when the journal is due for compaction
+        compact_min_records (int): Never compact below this many records
+        compact_ratio (int): Compact once records > ratio * live sessions
+    """
+
+    def __init__(self, path, compact=None, compact_min_records=COMPACT_MIN_RECORDS,
+                 compact_ratio=COMPACT_RATIO):
+        self.path = path
+        self.compact_source = compact
+        self.compact_min_records = compact_min_records
+        self.compact_ratio = compact_ratio
+        self.stats = {'records': 0, 'bytes': 0, 'commits': 0, 'compactions': 0,
+                      'errors': 0, 'replayed_records': 0, 'replay_ms': 0.0, 'torn_bytes': 0}
+
+        self._cond = threading.Condition()
+        self._buffer = []
+        self._appended = 0       # sequence number of the last appended record
+        self._durable = 0        # ... and of the last one on disk
+        self._live = 0
+        self._file_records = 0
+        self._stop = False
+        self._compact_requested = False
+        self._file = None
+        self._lock_file = None
+        self._writer = None
+
+    # ---------- startup ----------
+
+    def _lock(self):
+        """Takes <journal>.lock; RuntimeError if another process holds it"""
+        if fcntl is None:
+            return
+        self._lock_file = open(self.path + '.lock', 'a')
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            raise RuntimeError(f"Session journal {self.path} is in use by another process "
+                               "(one process per journal; use the sqlite backend for several)")
+
+    def replay(self):
+        """
+        Reads the journal back, drops a torn tail and opens it for appending.
+
+        Returns:
+            {user_id: [context, service, data, unix_time]}
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock()
+
+        started = time.perf_counter()
+        states, records, good_bytes, total_bytes = replay_file(self.path)
+
+        self._file = open(self.path, 'ab')
+        if total_bytes > good_bytes:
+            self._file.truncate(good_bytes)
+            self.stats['torn_bytes'] = total_bytes - good_bytes
+
+        self._file_records = records
+        self._live = len(states)
+        self.stats['replayed_records'] = records
+        self.stats['replay_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return states
+
+    def start(self):
+        if self._file is None:
+            self.replay()
+        self._writer = threading.Thread(target=self._write_loop, name='session-journal', daemon=True)
+        self._writer.start()
+
+    # ---------- producer side ----------
+
+    def append(self, record, live=None):
+        """
+        Queues one record for the next group commit.
+
+        Returns:
+            int: sequence number to pass to wait()
+        """
+        line = encode(record)
+        with self._cond:
+            self._buffer.append(line)
+            self._appended += 1
+            if live is not None:
+                self._live = live
+            self._cond.notify_all()
+            return self._appended
+
+    def wait(self, seq, timeout=COMMIT_TIMEOUT):
+        """
+        Blocks until record `seq` has been through a commit; False on
+        timeout (failed writes are counted in stats['errors'])
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._durable < seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._writer is None:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    # ---------- writer thread ----------
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not self._buffer and not self._stop and not self._compact_requested:
+                    self._cond.wait()
+                if not self._buffer and self._stop:
+                    return
+                batch, self._buffer = self._buffer, []
+                seq = self._appended
+                requested, self._compact_requested = self._compact_requested, False
+
+            if batch:
+                try:
+                    data = b''.join(batch)
+                    self._file.write(data)
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                    self.stats['records'] += len(batch)
+                    self.stats['bytes'] += len(data)
+                    self.stats['commits'] += 1
+                    self._file_records += len(batch)
+                except OSError as e:
+                    self.stats['errors'] += 1
+                    print(f"⚠️ Session journal write failed: {e}")
+
+                with self._cond:
+                    self._durable = seq
+                    self._cond.notify_all()
+
+            if requested or self._due_for_compaction():
+                try:
+                    self._compact()
+                except OSError as e:
+                    self.stats['errors'] += 1
+                    print(f"⚠️ Session journal compaction failed: {e}")
+
+    def _due_for_compaction(self):
+        return (self.compact_source is not None
+                and self._file_records >= self.compact_min_records
+                and self._file_records > self.compact_ratio * max(self._live, 1))
+
+    def compact_now(self, timeout=30):
+        """Has the writer thread compact the journal now; True once done"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            done = self.stats['compactions']
+            self._compact_requested = True
+            self._cond.notify_all()
+            while self.stats['compactions'] == done:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._writer is None:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def _compact(self):
+        """
+        Rewrites the journal as one record per live session: the store's
+        full records (copied after begin_compaction) plus anything queued
+        since, then swaps the new file in with a rename.
+        """
+        records = self.compact_source()
+        tmp_path = self.path + '.compact'
+        with open(tmp_path, 'wb') as f:
+            f.write(b''.join(encode(record) for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+
+        with self._cond:
+            # Lines appended after the snapshot still belong in the new file
+            pending = self._buffer
+            self._buffer = []
+            with open(tmp_path, 'ab') as f:
+                f.write(b''.join(pending))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            _fsync_dir(self.path)
+
+            self._file.close()
+            self._file = open(self.path, 'ab')
+            self._file_records = len(records) + len(pending)
+            self._live = len(records)
+            self._durable = self._appended
+            self.stats['compactions'] += 1
+            self._cond.notify_all()
+
+    def begin_compaction(self):
+        """
+        Called with the store locked, right before it copies its state:
+        records queued so far are covered by that copy and are dropped
+        """
+        with self._cond:
+            self._buffer = []
+
+    # ---------- shutdown ----------
+
+    def close(self):
+        """Writes what is queued and closes the file"""
+        if self._writer is not None:
+            with self._cond:
+                self._stop = True
+                self._cond.notify_all()
+            self._writer.join(timeout=COMMIT_TIMEOUT)
+            self._writer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._lock_file is not None:
+            self._lock_file.close()   # releases the lock
+            self._lock_file = None
+
+    def snapshot(self):
+        with self._cond:
+            queued = len(self._buffer)
+        commits = self.stats['commits']
+        return dict(self.stats, path=self.path, file_records=self._file_records, queued=queued,
+                    avg_group=round(self.stats['records'] / commits, 1) if commits else 0)
+
+
+def _fsync_dir(path):
+    """Makes a rename durable (no-op where directories can't be opened)"""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+# =============================================
+# MAIN EXECUTION
+# =============================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a session journal and report")
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    states, records, good_bytes, total_bytes = replay_file(args.path)
+    elapsed = time.perf_counter() - started
+
+    print(f"✅ {records} records ({good_bytes / 1024 / 1024:.1f} MB) -> {len(states)} sessions "
+          f"in {elapsed * 1000:.0f} ms")
+    if total_bytes > good_bytes:
+        print(f"⚠️ {total_bytes - good_bytes} bytes of torn tail ignored")
@@ -0,0 +1,502 @@
+"""
+Chat Session Store
+One compact Session object per user, with idle-TTL and LRU eviction.
+
+Backends share one interface, so smart_chat does not care where state lives:
+    get(user_id)            -> Session (new, unsaved one if unknown)
+    peek(user_id)           -> Session or None
+    save(user_id, session)  -> persist (an empty session is deleted)
+    reset(user_id)          -> forget the user
+    snapshot()              -> counters for /api/health
+
+    SessionStore           - in-process memory (default, single worker)
+    JournaledSessionStore  - memory plus a write-ahead journal that is
+                             replayed after a restart (single worker)
+    SQLiteSessionStore     - shared SQLite file (WAL), for multiple workers
+"""
+
+import json
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from session_journal import FULL, RESET, UPDATE, SessionJournal, paused_gc
+
+# =============================================
+# SESSION
+# =============================================
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Session:
+    """Conversation state for one user (flow step, selected service, answers)"""
+
+    __slots__ = ('_context', '_service', 'data', 'last_seen')
+
+    def __init__(self, context=None, service=None, data=None):
+        self._context = _intern(context)
+        self._service = _intern(service)
+        self.data = data if data is not None else {}
+        self.last_seen = time.monotonic()
+
+    # Context / service names repeat across thousands of users, so they
+    # are interned and every session points at the same string object
+    @property
+    def context(self):
+        return self._context
+
+    @context.setter
+    def context(self, value):
+        self._context = _intern(value)
+
+    @property
+    def service(self):
+        return self._service
+
+    @service.setter
+    def service(self, value):
+        self._service = _intern(value)
+
+    def is_empty(self):
+        return self._context is None and self._service is None and not self.data
+
+    def clear(self):
+        self._context = None
+        self._service = None
+        self.data = {}
+
+    def to_json(self):
+        return json.dumps({'context': self._context, 'service': self._service, 'data': self.data},
+                          ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, payload):
+        state = json.loads(payload)
+        return cls(state.get('context'), state.get('service'), state.get('data'))
+
+    def __repr__(self):
+        return f"Session(context={self._context!r}, service={self._service!r}, data={self.data!r})"
+
+# =============================================
+# STORE
+# =============================================
+
+class SessionStore:
+    """
+    Thread-safe in-memory session store.
+
+    Args:
+        ttl (int): Seconds of inactivity before a session is dropped
+        max_sessions (int): Hard cap; least recently used sessions go first
+    """
+
+    def __init__(self, ttl=1800, max_sessions=10000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()   # user_id -> Session, oldest first
+        self._lock = threading.Lock()
+        self.stats = {'created': 0, 'evicted_idle': 0, 'evicted_lru': 0, 'reset': 0}
+
+    def get(self, user_id):
+        """Returns the user's session (a new, unsaved one if unknown)"""
+        now = time.monotonic()
+
+        with self._lock:
+            self._expire(now)
+
+            session = self._sessions.get(user_id)
+            if session is None:
+                session = Session()
+            else:
+                self._sessions.move_to_end(user_id)
+
+            session.last_seen = now
+            return session
+
+    def save(self, user_id, session):
+        """Keeps the session (or drops it once it holds no state)"""
+        with self._lock:
+            self._save_locked(user_id, session)
+
+    def _save_locked(self, user_id, session):
+        if session.is_empty():
+            self._sessions.pop(user_id, None)
+            return
+
+        if user_id not in self._sessions:
+            self.stats['created'] += 1
+        self._sessions[user_id] = session
+        self._sessions.move_to_end(user_id)
+
+        while len(self._sessions) > self.max_sessions:
+            evicted, _ = self._sessions.popitem(last=False)
+            self.stats['evicted_lru'] += 1
+            self._forget(evicted)
+
+    def _forget(self, user_id):
+        """Called for every session dropped by eviction (lock held)"""
+
+    def peek(self, user_id):
+        """Returns the session without creating or refreshing it (or None)"""
+        with self._lock:
+            return self._sessions.get(user_id)
+
+    def reset(self, user_id):
+        """Drops the user's session entirely"""
+        with self._lock:
+            if self._sessions.pop(user_id, None) is not None:
+                self.stats['reset'] += 1
+
+    def _expire(self, now):
+        """Removes idle sessions; the oldest are always at the front"""
+        cutoff = now - self.ttl
+        sessions = self._sessions
+
+        while sessions:
+            user_id, session = next(iter(sessions.items()))
+            if session.last_seen > cutoff:
+                break
+            del sessions[user_id]
+            self.stats['evicted_idle'] += 1
+            self._forget(user_id)
+
+    def sweep(self):
+        """Expires idle sessions now (get() also does this as it goes)"""
+        with self._lock:
+            self._expire(time.monotonic())
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def snapshot(self):
+        """Counters plus number of live sessions"""
+        with self._lock:
+            return dict(self.stats, live=len(self._sessions),
+                        ttl=self.ttl, max_sessions=self.max_sessions, backend='memory')
+
+# =============================================
+# JOURNALED MEMORY BACKEND (survives restarts)
+# =============================================
+
+class JournaledSessionStore(SessionStore):
+    """
+    In-memory sessions backed by an append-only journal, so half-finished
+    flows survive a worker restart. Reads cost what the memory backend
+    costs; save() and reset() append a short record of what changed, and
+    the journal's writer thread fsyncs them in groups.
+
+    Like 'memory', this is for one worker process per journal file.
+
+    Args:
+        journal_path (str): Journal file (replayed here on startup)
+        ttl (int): Seconds of inactivity before a session is dropped
+        max_sessions (int): Hard cap; least recently used sessions go first
+        wait_for_commit (bool): save() returns once its record is on disk
+            (one fsync per group of concurrent saves; async servers must
+            run turns on a thread pool, as fastsewa_asgi does, or every
+            save gets an fsync of its own and blocks the event loop)
+        touch_interval (int): Seconds between records for a session that
+            was saved unchanged (keeps its TTL right after a replay)
+        **journal_options: compact_min_records / compact_ratio
+    """
+
+    def __init__(self, journal_path, ttl=1800, max_sessions=10000, wait_for_commit=True,
+                 touch_interval=60, **journal_options):
+        super().__init__(ttl=ttl, max_sessions=max_sessions)
+        self.wait_for_commit = wait_for_commit
+        self.touch_interval = touch_interval
+        self._journaled = {}   # user_id -> (context, service, data copy, unix time) last written
+
+        self.journal = SessionJournal(journal_path, compact=self._compact_records, **journal_options)
+        started = time.perf_counter()
+        with paused_gc():
+            self._restore(self.journal.replay())
+        self.stats['restore_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        self.journal.start()
+
+    def _restore(self, states):
+        """Loads replayed sessions that haven't expired, oldest first"""
+        wall_now, now = time.time(), time.monotonic()
+        cutoff = wall_now - self.ttl
+
+        for user_id, (context, service, data, stamp) in sorted(states.items(), key=lambda item: item[1][3]):
+            if stamp <= cutoff:
+                continue
+            session = Session(context, service, data)
+            session.last_seen = now - (wall_now - stamp)
+            self._sessions[user_id] = session
+            self._journaled[user_id] = (session.context, session.service, dict(data), stamp)
+
+        while len(self._sessions) > self.max_sessions:
+            evicted, _ = self._sessions.popitem(last=False)
+            self._journaled.pop(evicted, None)
+        self.stats['restored'] = len(self._sessions)
+
+    def _record(self, user_id, session):
+        """Journal record for what changed since the last write (or None)"""
+        last = self._journaled.get(user_id)
+
+        if session.is_empty():
+            if last is None:
+                return None
+            del self._journaled[user_id]
+            return [RESET, user_id]
+
+        stamp = int(time.time())
+        data = session.data
+        if last is None or any(key not in data for key in last[2]):
+            op, changed = FULL, dict(data)
+        else:
+            previous = last[2]
+            changed = {key: value for key, value in data.items()
+                       if key not in previous or previous[key] != value}
+            if (not changed and session.context == last[0] and session.service == last[1]
+                    and stamp - last[3] < self.touch_interval):
+                return None
+            op = UPDATE
+
+        self._journaled[user_id] = (session.context, session.service, dict(data), stamp)
+        return [op, user_id, session.context, session.service, changed, stamp]
+
+    def _forget(self, user_id):
+        # Evicted sessions need no record: replay applies the TTL and the
+        # cap again, and compaction leaves them out
+        self._journaled.pop(user_id, None)
+
+    def _commit(self, record):
+        """Appends the record (store lock held); returns its sequence number"""
+        if record is None:
+            return None
+        return self.journal.append(record, live=len(self._sessions))
+
+    def _wait(self, seq):
+        if seq is not None and self.wait_for_commit:
+            self.journal.wait(seq)
+
+    def save(self, user_id, session):
+        with self._lock:
+            self._save_locked(user_id, session)
+            seq = self._commit(self._record(user_id, session))
+        self._wait(seq)
+
+    def reset(self, user_id):
+        with self._lock:
+            if self._sessions.pop(user_id, None) is not None:
+                self.stats['reset'] += 1
+            seq = self._commit([RESET, user_id] if self._journaled.pop(user_id, None) else None)
+        self._wait(seq)
+
+    def _compact_records(self):
+        """Full records of every live session, for the journal's compaction"""
+        with self._lock:
+            self.journal.begin_compaction()
+            entries = list(self._journaled.items())
+        return [[FULL, user_id, context, service, data, stamp]
+                for user_id, (context, service, data, stamp) in entries]
+
+    def close(self):
+        self.journal.close()
+
+    def snapshot(self):
+        stats = super().snapshot()
+        stats.update(backend='journal', journal=self.journal.snapshot())
+        return stats
+
+# =============================================
+# SQLITE BACKEND (shared between worker processes)
+# =============================================
+
+class SQLiteSessionStore:
+    """
+    Sessions in a local SQLite file (WAL mode), so every gunicorn worker
+    on the machine sees the same conversation state.
+
+    Writes are batched: save() updates an in-memory pending map that a
+    background thread flushes every `flush_interval` seconds in one
+    transaction. Reads check the pending map first. Use flush_interval=0
+    to write through immediately.
+
+    Args:
+        db_path (str): SQLite file path
+        ttl (int): Seconds of inactivity before a session expires
+        max_sessions (int): Cap on stored sessions (oldest purged first)
+        flush_interval (float): Seconds between batched writes
+    """
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS chat_sessions (
+        user_id   TEXT PRIMARY KEY,
+        state     TEXT NOT NULL,
+        last_seen REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_chat_sessions_last_seen ON chat_sessions (last_seen);
+    """
+
+    def __init__(self, db_path, ttl=1800, max_sessions=100000, flush_interval=0.05):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.flush_interval = flush_interval
+        self.stats = {'evicted_idle': 0, 'evicted_lru': 0, 'reset': 0,
+                      'flushes': 0, 'rows_written': 0}
+
+        self._local = threading.local()
+        self._pending = {}           # user_id -> (state json, last_seen) or None (delete)
+        self._pending_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._last_purge = 0.0
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self._SCHEMA)
+
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+
+    def _conn(self):
+        """One connection per thread (sqlite3 connections are not shared)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---------- reads ----------
+
+    def _load(self, user_id):
+        with self._pending_lock:
+            if user_id in self._pending:
+                pending = self._pending[user_id]
+                return None if pending is None else Session.from_json(pending[0])
+
+        row = self._conn().execute(
+            "SELECT state FROM chat_sessions WHERE user_id = ? AND last_seen > ?",
+            (user_id, time.time() - self.ttl)
+        ).fetchone()
+        return Session.from_json(row[0]) if row else None
+
+    def get(self, user_id):
+        """Returns the user's session (a new, unsaved one if unknown)"""
+        return self._load(user_id) or Session()
+
+    def peek(self, user_id):
+        return self._load(user_id)
+
+    # ---------- writes ----------
+
+    def save(self, user_id, session):
+        """Queues the session for the next batched write"""
+        entry = None if session.is_empty() else (session.to_json(), time.time())
+        with self._pending_lock:
+            self._pending[user_id] = entry
+        if self._flusher is None:
+            self.flush()
+
+    def reset(self, user_id):
+        with self._pending_lock:
+            self._pending[user_id] = None
+        self.stats['reset'] += 1
+        if self._flusher is None:
+            self.flush()
+
+    def flush(self):
+        """Writes all pending changes in a single transaction"""
+        with self._pending_lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return
+
+        upserts = [(uid, e[0], e[1]) for uid, e in batch.items() if e is not None]
+        deletes = [(uid,) for uid, e in batch.items() if e is None]
+
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if upserts:
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT INTO chat_sessions (user_id, state, last_seen) VALUES (?, ?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET state = excluded.state, last_seen = excluded.last_seen",
+                    upserts
+                )
+                self.stats['rows_written'] += conn.total_changes - before
+            if deletes:
+                conn.executemany("DELETE FROM chat_sessions WHERE user_id = ?", deletes)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            # Put the batch back unless newer changes arrived meanwhile
+            with self._pending_lock:
+                for uid, entry in batch.items():
+                    self._pending.setdefault(uid, entry)
+            raise
+
+        self.stats['flushes'] += 1
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                if time.time() - self._last_purge > 60:
+                    self.purge()
+            except sqlite3.Error as e:
+                print(f"⚠️ Session flush failed: {e}")
+
+    def purge(self):
+        """Deletes expired sessions and trims the table to max_sessions"""
+        self._last_purge = time.time()
+        conn = self._conn()
+
+        cursor = conn.execute("DELETE FROM chat_sessions WHERE last_seen <= ?",
+                              (time.time() - self.ttl,))
+        self.stats['evicted_idle'] += max(cursor.rowcount, 0)
+
+        cursor = conn.execute(
+            "DELETE FROM chat_sessions WHERE user_id IN ("
+            "SELECT user_id FROM chat_sessions ORDER BY last_seen DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,)
+        )
+        self.stats['evicted_lru'] += max(cursor.rowcount, 0)
+
+    def close(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        self.flush()
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0]
+
+    def snapshot(self):
+        with self._pending_lock:
+            pending = len(self._pending)
+        return dict(self.stats, live=len(self), pending_writes=pending,
+                    ttl=self.ttl, max_sessions=self.max_sessions, backend='sqlite')
+
+# =============================================
+# FACTORY
+# =============================================
+
+def create_session_store(backend='memory', ttl=1800, max_sessions=10000, db_path=None,
+                         journal_path=None, **options):
+    """
+    Builds a session store by name: 'memory', 'journal' or 'sqlite'
+    """
+    if backend == 'memory':
+        return SessionStore(ttl=ttl, max_sessions=max_sessions)
+    if backend == 'journal':
+        if not journal_path:
+            raise ValueError("Journal session backend needs journal_path")
+        return JournaledSessionStore(journal_path, ttl=ttl, max_sessions=max_sessions, **options)
+    if backend == 'sqlite':
+        if not db_path:
+            raise ValueError("SQLite session backend needs db_path")
+        return SQLiteSessionStore(db_path, ttl=ttl, max_sessions=max_sessions, **options)
+    raise ValueError(f"Unknown session backend: {backend}")
@@ -1,23 +1,233 @@
-import json
+import os
 import random
+import threading
+import time
 from datetime import datetime
+import event_log
+import metrics
 import pdf_generator
+import pdf_queue
+from admission import Overloaded
+from intent_reloader import IntentReloader, load_intents
+from session_store import create_session_store
 
 # =============================================
-# CONFIGURATION & DATA LOADING
+# CONFIGURATION
 # =============================================
 
-with open('intents.json','r', encoding='utf-8') as file:
-    data = json.load(file)
-print("✅ FastSewa Chatbot System Loaded")
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INTENTS_PATH = os.environ.get('FASTSEWA_INTENTS', os.path.join(BASE_DIR, 'intents.json'))
+
+# Optional binary snapshot of the compiled intents: loaded instead of
+# compiling when it matches intents.json, rewritten when it doesn't
+INTENTS_SNAPSHOT_PATH = os.environ.get('FASTSEWA_INTENTS_SNAPSHOT')
+
+# Seconds between intents.json change checks (see start_intent_reloader)
+INTENTS_RELOAD_INTERVAL = 2.0
+
+# Intent matching mode:
+#   'exact'  - a pattern must appear word-for-word in the message
+#   'fuzzy'  - TF-IDF similarity ("need guards for my shop" -> security)
+#   'hybrid' - exact first, fuzzy only when nothing matched exactly
+# 'exact' is the default: fuzzy matching changes which intent some
+# messages get (a weak word overlap can beat the fallback reply), so
+# switch after checking the intents against real messages
+MATCH_MODE = 'exact'
+FUZZY_THRESHOLD = 0.5   # minimum similarity (0..1) for a fuzzy match
+
+# PDF delivery: 'sync' renders inside the chat turn, 'queue' hands the
+# quote to the background worker (python -m pdf_worker) and returns a job id,
+# 'memory' renders inside the turn to bytes that are downloaded from memory
+# (saved to generated_pdfs/ in the background, see pdf_generator.PDF_PERSIST).
+# The memory is per process: with several workers keep PDF_PERSIST on, so
+# another worker can serve the download once the file is written.
+PDF_MODE = 'sync'
+
+# One Session per user: flow state (context), selected service and
+# collected information (data). Idle sessions expire after
+# SESSION_TTL_SECONDS; beyond MAX_SESSIONS the least recent are dropped.
+SESSION_TTL_SECONDS = 30 * 60
+MAX_SESSIONS = 10000
+
+# 'memory' keeps sessions in this process (one worker only).
+# 'journal' is 'memory' plus an append-only journal (SESSION_JOURNAL_PATH)
+# replayed at startup, so flows survive a restart (one worker only).
+# 'sqlite' shares them through SESSION_DB_PATH, so any worker can
+# continue any conversation (set FASTSEWA_SESSION_BACKEND=sqlite).
+SESSION_BACKEND = os.environ.get('FASTSEWA_SESSION_BACKEND', 'memory')
+SESSION_DB_PATH = os.environ.get(
+    'FASTSEWA_SESSION_DB',
+    os.path.join(BASE_DIR, 'chat_sessions.db')
+)
+SESSION_JOURNAL_PATH = os.environ.get(
+    'FASTSEWA_SESSION_JOURNAL',
+    os.path.join(BASE_DIR, 'chat_sessions.journal')
+)
+
+
+class ChatConfig:
+    """
+    Settings for init(); fields left as None keep the module defaults.
+
+    Args:
+        intents_path (str): intents.json location
+        intents_snapshot (str): Binary snapshot of the compiled intents
+        session_backend (str): 'memory', 'journal' or 'sqlite'
+        session_db_path (str): SQLite file for the 'sqlite' backend
+        pdf_mode (str): 'sync', 'queue' or 'memory'
+        session_journal_path (str): Journal file for the 'journal' backend
+    """
+
+    __slots__ = ('intents_path', 'intents_snapshot', 'session_backend', 'session_db_path', 'pdf_mode',
+                 'session_journal_path')
+
+    def __init__(self, intents_path=None, intents_snapshot=None, session_backend=None,
+                 session_db_path=None, pdf_mode=None, session_journal_path=None):
+        self.intents_path = intents_path
+        self.intents_snapshot = intents_snapshot
+        self.session_backend = session_backend
+        self.session_db_path = session_db_path
+        self.pdf_mode = pdf_mode
+        self.session_journal_path = session_journal_path
+
+# =============================================
+# INITIALISATION
+# =============================================
+
+# Nothing is loaded at import: init() (called by the servers at startup,
+# or by the first chat turn) loads the intents and opens the sessions.
+
+# Compiled once per version of intents.json: matchers are rebuilt off to the
+# side on reload and replaced with one assignment, so a chat turn always
+# uses a complete set
+compiled_intents = None
+intent_reloader = None
+sessions = None
+_sessions_pid = None   # process that opened `sessions`
+
+_init_lock = threading.Lock()
+
+def init(config=None):
+    """
+    Loads intents.json and opens the session store. Safe to call more
+    than once; calling again with a config re-applies it.
+    """
+    global INTENTS_PATH, INTENTS_SNAPSHOT_PATH, SESSION_BACKEND, SESSION_DB_PATH, PDF_MODE
+    global SESSION_JOURNAL_PATH
+    global compiled_intents, intent_reloader
+
+    with _init_lock:
+        if compiled_intents is not None and config is None:
+            return
+        
+        reopen_sessions = sessions is None
+        if config is not None:
+            INTENTS_PATH = config.intents_path or INTENTS_PATH
+            INTENTS_SNAPSHOT_PATH = config.intents_snapshot or INTENTS_SNAPSHOT_PATH
+            PDF_MODE = config.pdf_mode or PDF_MODE
+            if config.session_backend or config.session_db_path or config.session_journal_path:
+                SESSION_BACKEND = config.session_backend or SESSION_BACKEND
+                SESSION_DB_PATH = config.session_db_path or SESSION_DB_PATH
+                SESSION_JOURNAL_PATH = config.session_journal_path or SESSION_JOURNAL_PATH
+                reopen_sessions = True
+        
+        started = time.perf_counter()
+        compiled_intents = load_intents(INTENTS_PATH, FUZZY_THRESHOLD, INTENTS_SNAPSHOT_PATH)
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - started, 'intents_load')
+        
+        was_watching = intent_reloader is not None and intent_reloader.running
+        if was_watching:
+            intent_reloader.stop()
+        intent_reloader = IntentReloader(
+            INTENTS_PATH,
+            current=lambda: compiled_intents,
+            swap=_swap_intents,
+            fuzzy_threshold=lambda: FUZZY_THRESHOLD,
+            interval=INTENTS_RELOAD_INTERVAL,
+            snapshot_path=INTENTS_SNAPSHOT_PATH
+        )
+        if was_watching:
+            intent_reloader.start()
+        
+        if reopen_sessions:
+            configure_sessions(SESSION_BACKEND)
+        
+        print("✅ FastSewa Chatbot System Loaded")
+
+def _reset_after_fork():
+    """In a forked worker: locks, threads and connections of the parent are not usable"""
+    global _init_lock, sessions
+    _init_lock = threading.Lock()
+    if intent_reloader is not None:
+        intent_reloader.reset_after_fork()
+    if sessions is not None and SESSION_BACKEND == 'sqlite':
+        sessions = None    # the parent's flusher is not ours
+        configure_sessions(SESSION_BACKEND)
+    # 'memory' and 'journal' stay the parent's; see _check_forked_sessions
+
+if hasattr(os, 'register_at_fork'):  # not on Windows
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _ensure_init():
+    if compiled_intents is None:
+        init()
+    if _sessions_pid != os.getpid():
+        _check_forked_sessions()
+
+def _check_forked_sessions():
+    """
+    First use of the sessions in a worker forked after they were opened.
+    'journal' is refused: several processes appending to (and compacting)
+    one file lose records. 'memory' works, but every worker has its own.
+    """
+    global _sessions_pid
+    if SESSION_BACKEND == 'journal':
+        raise RuntimeError("The 'journal' session backend only works in a single process; "
+                           "set FASTSEWA_SESSION_BACKEND=sqlite to run several workers")
+    if SESSION_BACKEND == 'memory':
+        print(f"⚠️ Worker {os.getpid()}: 'memory' sessions are not shared between workers; "
+              "set FASTSEWA_SESSION_BACKEND=sqlite to run several")
+    _sessions_pid = os.getpid()
+
+def _swap_intents(compiled):
+    global compiled_intents
+    compiled_intents = compiled
+
+def start_intent_reloader(interval=None):
+    """Starts watching intents.json so edits apply without a restart"""
+    _ensure_init()
+    if interval is not None:
+        intent_reloader.interval = interval
+    return intent_reloader.start()
+
+def reload_intents():
+    """Rebuilds from intents.json now; returns False (and keeps the old intents) if invalid"""
+    _ensure_init()
+    return intent_reloader.reload()
 
 # =============================================
 # MEMORY STORAGE
 # =============================================
 
-user_context = {}      # Tracks conversation flow state
-user_data = {}         # Stores collected information
-active_service = {}    # NEW: Explicitly tracks which service user selected
+metrics.register(metrics.Gauge(
+    'fastsewa_active_sessions',
+    'Chat sessions currently stored',
+    lambda: len(sessions)
+))
+
+def configure_sessions(backend, **options):
+    """Swaps the session backend ('memory', 'journal' or 'sqlite') at runtime"""
+    global sessions, _sessions_pid, SESSION_BACKEND
+    options.setdefault('ttl', SESSION_TTL_SECONDS)
+    options.setdefault('max_sessions', MAX_SESSIONS)
+    options.setdefault('db_path', SESSION_DB_PATH)
+    options.setdefault('journal_path', SESSION_JOURNAL_PATH)
+    if sessions is not None and hasattr(sessions, 'close'):
+        sessions.close()   # flush, and release the journal before it is reopened
+    sessions = create_session_store(backend, **options)
+    SESSION_BACKEND = backend
+    _sessions_pid = os.getpid()
+    return sessions
 
 # =============================================
 # SERVICE DEFINITIONS (The 6 Services)
@@ -36,11 +246,20 @@ SERVICES = {
 # HELPER FUNCTIONS
 # =============================================
 
-def reset_user_session(user_id):
+def reset_user_session(user_id, session=None):
     """Clean reset after PDF generation or error"""
-    user_context[user_id] = None
-    user_data[user_id] = {}
-    active_service[user_id] = None
+    _ensure_init()
+    if session is not None:
+        session.clear()
+    sessions.reset(user_id)
+
+def get_session_state(user_id):
+    """Returns (context, service) for the user without touching the session"""
+    _ensure_init()
+    session = sessions.peek(user_id)
+    if session is None:
+        return None, None
+    return session.context, session.service
 
 def validate_input(input_text, expected_type="text"):
     """Basic input validation with error handling"""
@@ -63,6 +282,42 @@ def validate_input(input_text, expected_type="text"):
     
     return True, input_text
 
+# What the current turn matched and produced, for its event log entry
+# (a turn runs start to finish on one thread)
+_turn = threading.local()
+
+def create_quote(customer_info, enquiry_info):
+    """
+    Generates the quote PDF now, or queues it when PDF_MODE is 'queue'.
+    Raises Overloaded when PDF generation (or the queue) is full.
+    """
+    started = time.perf_counter()
+    result = 'failed'
+    try:
+        if PDF_MODE == 'queue':
+            try:
+                job_id = pdf_queue.submit_job(customer_info, enquiry_info)
+            except Overloaded:
+                metrics.PDFS.inc('rejected')
+                raise
+            result = 'queued'
+            return f"🕒 PDF Job Queued: {job_id}\n📄 Your PDF is being prepared and will be ready shortly."
+        
+        response = pdf_generator.generate_invoice(customer_info, enquiry_info,
+                                                  in_memory=PDF_MODE == 'memory')
+        if 'PDF Created Successfully' in response:
+            result = 'generated'
+        return response
+    
+    except Overloaded:
+        result = 'rejected'
+        raise
+    
+    finally:
+        _turn.quote = result
+        event_log.emit('quote', service=enquiry_info.get('service_type'), result=result, mode=PDF_MODE,
+                       ms=round((time.perf_counter() - started) * 1000, 2))
+
 # =============================================
 # CORE CHATBOT LOGIC
 # =============================================
@@ -72,14 +327,40 @@ def get_response(user_input, user_id='default'):
     Main conversation handler with explicit service selection
     and guided context flow (Mentor's requirement)
     """
+    _ensure_init()
+    _turn.match = _turn.intent = _turn.quote = None
     
-    user_input_lower = user_input.lower()
-    current_context = user_context.get(user_id)
-    current_service = active_service.get(user_id)
+    started = time.perf_counter()
+    with metrics.stage_timer('chat_turn'):
+        session = sessions.get(user_id)
+        service, context = session.service, session.context
+        response = handle_message(user_input, user_id, session)
+        service = session.service or service   # flow may have just finished
+        sessions.save(user_id, session)
+    
+    metrics.CHAT_REQUESTS.inc(service or 'none')
+    event_log.emit('turn', user_id=user_id, service=service, context_from=context,
+                   context_to=session.context, match=_turn.match, intent=_turn.intent,
+                   quote=_turn.quote, ms=round((time.perf_counter() - started) * 1000, 2))
+    return response
+
+def handle_message(user_input, user_id, session):
+    """Runs one conversation turn against the user's session"""
+    
+    # Guided flows first (the user is in the middle of a service)
+    with metrics.stage_timer('flow_step'):
+        response = handle_flow_step(user_input, user_id, session)
+    if response is not None:
+        _turn.match = 'flow'
+        return response
     
-    # Initialize user storage if new
-    if user_id not in user_data:
-        user_data[user_id] = {}
+    return handle_intent(user_input, session)
+
+def handle_flow_step(user_input, user_id, session):
+    """Next step of the user's active service flow, or None if not in a flow"""
+    
+    current_context = session.context
+    current_service = session.service
     
     # ==========================================
     # CONTEXT-BASED FLOWS (Service-Specific)
@@ -94,8 +375,8 @@ def get_response(user_input, user_id='default'):
             if not is_valid:
                 return f"❌ {result} Please try again (e.g., 1500 sqft)."
             
-            user_data[user_id]['plot_size'] = result
-            user_context[user_id] = 'waiting_for_location'
+            session.data['plot_size'] = result
+            session.context = 'waiting_for_location'
             return f"✅ Got it! Plot size: {result} sqft. Now, which city/area is this project in?"
         
         # Step 2: Waiting for location (FINAL STEP → Generate PDF)
@@ -104,28 +385,27 @@ def get_response(user_input, user_id='default'):
             if not is_valid:
                 return f"❌ {result}"
             
-            user_data[user_id]['location'] = result
+            session.data['location'] = result
             
             # Generate PDF
             try:
                 customer_info = {
-                    'full_name': user_data[user_id].get('name', 'Guest User'),
-                    'phone': user_data[user_id].get('phone', 'N/A'),
+                    'full_name': session.data.get('name', 'Guest User'),
+                    'phone': session.data.get('phone', 'N/A'),
                     'address': result
                 }
                 
                 enquiry_info = {
-                    'id': random.randint(1000, 9999),
                     'service_type': 'FS_BUILD',
                     'form_data': {
-                        'requirements': f"Construction Project - {user_data[user_id]['plot_size']} sqft in {result}",
+                        'requirements': f"Construction Project - {session.data['plot_size']} sqft in {result}",
                         'budget_range': 'As per estimate',
-                        'plot_area': user_data[user_id]['plot_size']
+                        'plot_area': session.data['plot_size']
                     }
                 }
                 
-                pdf_result = pdf_generator.generate_invoice(customer_info, enquiry_info)
-                reset_user_session(user_id)
+                pdf_result = create_quote(customer_info, enquiry_info)
+                reset_user_session(user_id, session)
                 
                 return (
                     f"🎉 Perfect! Your Construction quote is ready.\n\n"
@@ -133,8 +413,11 @@ def get_response(user_input, user_id='default'):
                     f"Our team will contact you within 24 hours. Need anything else?"
                 )
                 
+            except Overloaded:
+                raise   # keep the step so the user can resend; the API answers 429
+            
             except Exception as e:
-                reset_user_session(user_id)
+                reset_user_session(user_id, session)
                 return f"⚠️ Error generating PDF: {str(e)}. Please try again or contact support."
     
     # --- SECURITY SERVICE FLOW ---
@@ -142,8 +425,8 @@ def get_response(user_input, user_id='default'):
         
         if current_context == 'waiting_for_property_type':
             property_type = user_input.title()
-            user_data[user_id]['property_type'] = property_type
-            user_context[user_id] = 'waiting_for_guard_count'
+            session.data['property_type'] = property_type
+            session.context = 'waiting_for_guard_count'
             return f"✅ {property_type} security noted. How many guards do you need? (e.g., 1, 2, 3)"
         
         if current_context == 'waiting_for_guard_count':
@@ -151,8 +434,8 @@ def get_response(user_input, user_id='default'):
             if not is_valid:
                 return f"❌ {result}"
             
-            user_data[user_id]['guard_count'] = result
-            user_context[user_id] = 'waiting_for_security_location'
+            session.data['guard_count'] = result
+            session.context = 'waiting_for_security_location'
             return f"✅ {result} guard(s) required. Which city/area?"
         
         if current_context == 'waiting_for_security_location':
@@ -169,21 +452,23 @@ def get_response(user_input, user_id='default'):
                 }
                 
                 enquiry_info = {
-                    'id': random.randint(1000, 9999),
                     'service_type': 'FS_SECURE',
                     'form_data': {
-                        'requirements': f"{user_data[user_id]['guard_count']} guards for {user_data[user_id]['property_type']} in {result}",
+                        'requirements': f"{session.data['guard_count']} guards for {session.data['property_type']} in {result}",
                         'budget_range': 'As per contract'
                     }
                 }
                 
-                pdf_result = pdf_generator.generate_invoice(customer_info, enquiry_info)
-                reset_user_session(user_id)
+                pdf_result = create_quote(customer_info, enquiry_info)
+                reset_user_session(user_id, session)
                 
                 return f"🎉 Security quote generated!\n\n{pdf_result}\n\nOur team will reach out soon."
                 
+            except Overloaded:
+                raise   # keep the step so the user can resend; the API answers 429
+            
             except Exception as e:
-                reset_user_session(user_id)
+                reset_user_session(user_id, session)
                 return f"⚠️ Error: {str(e)}. Please try again."
     
     # --- MEDICAL SERVICE FLOW ---
@@ -191,8 +476,8 @@ def get_response(user_input, user_id='default'):
         
         if current_context == 'waiting_for_symptoms':
             symptoms = user_input
-            user_data[user_id]['symptoms'] = symptoms
-            user_context[user_id] = 'waiting_for_medical_location'
+            session.data['symptoms'] = symptoms
+            session.context = 'waiting_for_medical_location'
             return f"✅ Noted: {symptoms}. Which location do you need the service?"
         
         if current_context == 'waiting_for_medical_location':
@@ -209,50 +494,74 @@ def get_response(user_input, user_id='default'):
                 }
                 
                 enquiry_info = {
-                    'id': random.randint(1000, 9999),
                     'service_type': 'FS_MEDICAL',
                     'form_data': {
-                        'requirements': f"Medical assistance for: {user_data[user_id]['symptoms']}",
+                        'requirements': f"Medical assistance for: {session.data['symptoms']}",
                         'budget_range': 'Consultation fee applies'
                     }
                 }
                 
-                pdf_result = pdf_generator.generate_invoice(customer_info, enquiry_info)
-                reset_user_session(user_id)
+                pdf_result = create_quote(customer_info, enquiry_info)
+                reset_user_session(user_id, session)
                 
                 return f"🎉 Medical service request created!\n\n{pdf_result}\n\nDoctor will contact you shortly."
                 
+            except Overloaded:
+                raise   # keep the step so the user can resend; the API answers 429
+            
             except Exception as e:
-                reset_user_session(user_id)
+                reset_user_session(user_id, session)
                 return f"⚠️ Error: {str(e)}. Please contact emergency services if urgent."
     
+    return None
+
+def handle_intent(user_input, session):
+    """Matches the message to an intent (service selection, greetings...)"""
+    
     # ==========================================
     # INTENT MATCHING (Service Selection)
     # ==========================================
     
-    for intent in data['intents']:
-        for pattern in intent['patterns']:
-            if pattern.lower() in user_input_lower:
-                
-                # Set context if specified in intent
-                if 'context_set' in intent:
-                    user_context[user_id] = intent['context_set']
-                    
-                    # Explicitly set active service based on tag
-                    if 'construction' in intent['tag']:
-                        active_service[user_id] = "FS_BUILD"
-                    elif 'security' in intent['tag']:
-                        active_service[user_id] = "FS_SECURE"
-                    elif 'medical' in intent['tag']:
-                        active_service[user_id] = "FS_MEDICAL"
-                    elif 'legal' in intent['tag']:
-                        active_service[user_id] = "FS_LEGAL"
-                    elif 'land' in intent['tag']:
-                        active_service[user_id] = "FS_LAND"
-                    elif 'repair' in intent['tag']:
-                        active_service[user_id] = "FS_REPAIR"
-                
-                return random.choice(intent['responses'])
+    user_input_lower = user_input.lower()
+    compiled = compiled_intents   # one version for the whole turn
+    intent = None
+    
+    _turn.match = 'fallback'
+    
+    if MATCH_MODE != 'fuzzy':
+        with metrics.stage_timer('intent_match'):
+            intent = compiled.matcher.match(user_input_lower)
+        if intent is not None:
+            _turn.match = 'exact'
+    
+    if intent is None and MATCH_MODE != 'exact':
+        with metrics.stage_timer('intent_match_fuzzy'):
+            intent = compiled.fuzzy_matcher.match(user_input_lower)
+        if intent is not None:
+            _turn.match = 'fuzzy'
+    
+    if intent is not None:
+        _turn.intent = intent['tag']
+        
+        # Set context if specified in intent
+        if 'context_set' in intent:
+            session.context = intent['context_set']
+            
+            # Explicitly set active service based on tag
+            if 'construction' in intent['tag']:
+                session.service = "FS_BUILD"
+            elif 'security' in intent['tag']:
+                session.service = "FS_SECURE"
+            elif 'medical' in intent['tag']:
+                session.service = "FS_MEDICAL"
+            elif 'legal' in intent['tag']:
+                session.service = "FS_LEGAL"
+            elif 'land' in intent['tag']:
+                session.service = "FS_LAND"
+            elif 'repair' in intent['tag']:
+                session.service = "FS_REPAIR"
+        
+        return random.choice(intent['responses'])
     
     # ==========================================
     # FALLBACK HANDLER (Error Handling)
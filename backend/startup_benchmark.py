@@ -0,0 +1,103 @@
+"""
+Startup Benchmark
+Measures, in fresh interpreter processes, how long it takes to import
+smart_chat / pdf_generator and to init() the chatbot from intents.json
+versus from a compiled intents snapshot.
+
+Usage:
+    python startup_benchmark.py
+    python startup_benchmark.py --runs 9 --patterns 20000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from matcher_benchmark import load_intents, vocabulary_intents
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs in the child process; prints its timings as JSON
+CHILD_CODE = """
+import json, time
+started = time.perf_counter()
+import smart_chat
+imported = time.perf_counter()
+smart_chat.init()
+ready = time.perf_counter()
+import pdf_generator
+print(json.dumps({'import': imported - started, 'init': ready - imported}))
+"""
+
+IMPORT_ONLY_CODE = """
+import json, time
+started = time.perf_counter()
+import {module}
+print(json.dumps({{'import': time.perf_counter() - started}}))
+"""
+
+# =============================================
+# MEASUREMENT
+# =============================================
+
+def run_child(code, env_overrides, runs):
+    """Median timings over `runs` fresh processes"""
+    env = dict(os.environ, **env_overrides)
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+def run_case(label, intents_path, snapshot_path, runs):
+    env = {'FASTSEWA_INTENTS': intents_path}
+    cold = run_child(CHILD_CODE, env, runs)
+
+    # First run writes the snapshot, the measured runs load it
+    env['FASTSEWA_INTENTS_SNAPSHOT'] = snapshot_path
+    run_child(CHILD_CODE, env, 1)
+    warm = run_child(CHILD_CODE, env, runs)
+
+    print(f"{label:<26} import {cold['import'] * 1000:7.1f} ms | "
+          f"init from JSON {cold['init'] * 1000:8.1f} ms | "
+          f"init from snapshot {warm['init'] * 1000:8.1f} ms")
+
+# =============================================
+# MAIN EXECUTION
+# =============================================
+
+def main():
+    parser = argparse.ArgumentParser(description="FastSewa cold start benchmark")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--patterns', type=int, default=20000, help="extra synthetic patterns")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(f"⏱️  STARTUP BENCHMARK (median of {args.runs} fresh processes)")
+    print("="*60 + "\n")
+
+    for module in ('smart_chat', 'pdf_generator'):
+        timing = run_child(IMPORT_ONLY_CODE.format(module=module), {}, args.runs)
+        print(f"import {module:<19} {timing['import'] * 1000:7.1f} ms")
+    print()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        run_case("intents.json", os.path.join(BACKEND_DIR, 'intents.json'),
+                 os.path.join(workdir, 'base.snapshot'), args.runs)
+
+        intents, _ = vocabulary_intents(load_intents(), args.patterns)
+        large_path = os.path.join(workdir, 'intents_large.json')
+        with open(large_path, 'w', encoding='utf-8') as f:
+            json.dump({'intents': intents}, f)
+        run_case(f"intents.json + {args.patterns}", large_path,
+                 os.path.join(workdir, 'large.snapshot'), args.runs)
+
+    print("\n" + "="*60 + "\n")
+
+if __name__ == "__main__":
+    main()
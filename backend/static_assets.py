@@ -0,0 +1,255 @@
+"""
+Static Frontend Assets
+Serves the site's HTML/CSS/JS/images from memory, compressed once up front.
+
+- gzip (and brotli, if the brotli package is installed) variants are built
+  at startup, or ahead of time into a cache folder:
+      python static_assets.py --cache-dir static_cache
+- ETags are content hashes; If-None-Match gets a 304 with no body.
+- Pages link their CSS/JS/images as name?v=<hash>, so those URLs can be
+  cached for a year; pages themselves are always revalidated.
+- Pages get <meta name="fastsewa-api" content="/api">, which tells
+  chatbot.js to call the API on the same origin (whatever the host,
+  port or proxy in front).
+"""
+
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import time
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# =============================================
+# CONFIGURATION
+# =============================================
+
+# Optionally the API apps serve the website (HTML/CSS/JS at the repo root)
+# too, so the chatbot calls /api on the same origin (no CORS preflight).
+# Off unless FASTSEWA_SERVE_FRONTEND=1; FASTSEWA_STATIC_CACHE keeps the
+# compressed variants on disk between restarts.
+SERVE_FRONTEND = os.environ.get('FASTSEWA_SERVE_FRONTEND', '0') == '1'
+FRONTEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_CACHE_DIR = os.environ.get('FASTSEWA_STATIC_CACHE')
+
+ASSET_EXTENSIONS = ('.html', '.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg',
+                    '.ico', '.webp', '.woff', '.woff2')
+COMPRESSIBLE = ('.html', '.css', '.js', '.svg')     # images are compressed already
+SKIP_DIRS = ('backend', 'node_modules', '__pycache__')
+
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+HTML_CACHE_CONTROL = 'no-cache'                                 # always revalidate (304)
+ASSET_CACHE_CONTROL = 'public, max-age=3600'                    # unversioned URL
+VERSIONED_CACHE_CONTROL = 'public, max-age=31536000, immutable'  # name?v=<hash>
+
+# Added to every page served from here (read by chatbot.js)
+API_META_TAG = b'<meta name="fastsewa-api" content="/api">'
+_HEAD_RE = re.compile(rb'<head(?:\s[^>]*)?>', re.IGNORECASE)
+
+# src="chatbot.js" / href='style.css' in pages, url("1.png") in stylesheets
+_REFERENCE_RE = re.compile(r'''((?:src|href)\s*=\s*["']|url\(\s*["']?)([^"'()?#:\s]+)(?=["')\s])''')
+
+# =============================================
+# ASSETS
+# =============================================
+
+class Asset:
+    """One file with its precomputed encodings"""
+
+    __slots__ = ('path', 'content_type', 'digest', 'variants', 'cache_control')
+
+    def __init__(self, path, body, content_type, cache_control):
+        self.path = path
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()[:20]
+        self.variants = {'identity': body}    # encoding -> bytes
+
+    @property
+    def version(self):
+        return self.digest[:10]
+
+    def etag(self, encoding):
+        return f'"{self.digest}"' if encoding == 'identity' else f'"{self.digest}-{encoding}"'
+
+    def matches(self, if_none_match):
+        """If-None-Match check; any encoding of the same content counts"""
+        if if_none_match.strip() == '*':
+            return True
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            if tag.strip('"').split('-')[0] == self.digest:
+                return True
+        return False
+
+    def choose(self, accept_encoding):
+        """Best encoding the client accepts that we have"""
+        accepted = {part.split(';')[0].strip().lower() for part in accept_encoding.split(',')}
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return 'identity'
+
+
+def _compress(asset, cache_dir):
+    """Adds gzip/brotli variants, reusing ones stored in cache_dir by content hash"""
+    body = asset.variants['identity']
+    if len(body) < COMPRESS_MIN_BYTES:
+        return
+
+    encoders = [('gzip', 'gz', lambda data: gzip.compress(data, GZIP_LEVEL, mtime=0))]
+    if brotli is not None:
+        encoders.append(('br', 'br', lambda data: brotli.compress(data, quality=BROTLI_QUALITY)))
+
+    for encoding, suffix, encode in encoders:
+        cached = os.path.join(cache_dir, f"{asset.digest}.{suffix}") if cache_dir else None
+        if cached and os.path.exists(cached):
+            with open(cached, 'rb') as f:
+                compressed = f.read()
+        else:
+            compressed = encode(body)
+            if cached:
+                with open(cached, 'wb') as f:
+                    f.write(compressed)
+        if len(compressed) < len(body):
+            asset.variants[encoding] = compressed
+
+
+class StaticAssets:
+    """
+    Loads every frontend file under `root` once and answers GETs for them.
+
+    Args:
+        root (str): Folder with the site (the repo root)
+        cache_dir (str): Optional folder to keep compressed variants in
+            between restarts (filled on first start, or by the CLI)
+    """
+
+    def __init__(self, root, cache_dir=None):
+        self.root = os.path.abspath(root)
+        self.cache_dir = cache_dir
+        self.assets = {}
+
+        started = time.perf_counter()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+        self.load_seconds = time.perf_counter() - started
+
+    def _scan(self):
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.') and d not in SKIP_DIRS]
+            for filename in filenames:
+                if filename.lower().endswith(ASSET_EXTENSIONS):
+                    full_path = os.path.join(dirpath, filename)
+                    yield os.path.relpath(full_path, self.root).replace(os.sep, '/'), full_path
+
+    def _load(self):
+        files = {}
+        for rel_path, full_path in self._scan():
+            with open(full_path, 'rb') as f:
+                files[rel_path] = f.read()
+
+        # Referenced files first, so pages and stylesheets can link their versions
+        order = sorted(files, key=lambda p: (p.endswith('.html'), p.endswith('.css'), p))
+        for rel_path in order:
+            body = files[rel_path]
+            if rel_path.endswith(('.html', '.css')):
+                body = self._version_links(rel_path, body)
+            if rel_path.endswith('.html'):
+                body = _HEAD_RE.sub(lambda m: m.group(0) + API_META_TAG, body, count=1)
+
+            content_type = mimetypes.guess_type(rel_path)[0] or 'application/octet-stream'
+            if content_type.startswith('text/') or rel_path.endswith(('.js', '.svg')):
+                content_type += '; charset=utf-8'
+            cache_control = HTML_CACHE_CONTROL if rel_path.endswith('.html') else ASSET_CACHE_CONTROL
+
+            asset = Asset(rel_path, body, content_type, cache_control)
+            if rel_path.lower().endswith(COMPRESSIBLE):
+                _compress(asset, self.cache_dir)
+            self.assets[rel_path] = asset
+
+    def _version_links(self, rel_path, body):
+        """Appends ?v=<hash> to links to assets already loaded"""
+        base = os.path.dirname(rel_path)
+
+        def replace(match):
+            target = os.path.normpath(os.path.join(base, match.group(2))).replace(os.sep, '/')
+            asset = self.assets.get(target)
+            if asset is None or target.endswith('.html'):
+                return match.group(0)
+            return f"{match.group(1)}{match.group(2)}?v={asset.version}"
+
+        text = body.decode('utf-8', errors='surrogateescape')
+        return _REFERENCE_RE.sub(replace, text).encode('utf-8', errors='surrogateescape')
+
+    def lookup(self, path):
+        path = path.lstrip('/') or 'index.html'
+        if path.endswith('/'):
+            path += 'index.html'
+        return self.assets.get(path)
+
+    def respond(self, path, version=None, if_none_match=None, accept_encoding=''):
+        """
+        Answers a GET for `path`.
+
+        Returns:
+            (status, headers, body) or None if there is no such asset
+        """
+        asset = self.lookup(path)
+        if asset is None:
+            return None
+
+        encoding = asset.choose(accept_encoding or '')
+        cache_control = VERSIONED_CACHE_CONTROL if version and version == asset.version else asset.cache_control
+        headers = [('ETag', asset.etag(encoding)), ('Cache-Control', cache_control),
+                   ('Vary', 'Accept-Encoding')]
+
+        if if_none_match and asset.matches(if_none_match):
+            return 304, headers, b''
+
+        body = asset.variants[encoding]
+        headers.append(('Content-Type', asset.content_type))
+        headers.append(('Content-Length', str(len(body))))
+        if encoding != 'identity':
+            headers.append(('Content-Encoding', encoding))
+        return 200, headers, body
+
+    def snapshot(self):
+        raw = sum(len(a.variants['identity']) for a in self.assets.values())
+        best = sum(min(len(v) for v in a.variants.values()) for a in self.assets.values())
+        return {
+            'files': len(self.assets),
+            'bytes': raw,
+            'compressed_bytes': best,
+            'encodings': ['gzip', 'br'] if brotli is not None else ['gzip'],
+            'load_ms': round(self.load_seconds * 1000, 1)
+        }
+
+# =============================================
+# MAIN EXECUTION
+# =============================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompress the frontend assets")
+    parser.add_argument('--root', default=FRONTEND_DIR)
+    parser.add_argument('--cache-dir', default=STATIC_CACHE_DIR, required=STATIC_CACHE_DIR is None,
+                        help="where to store the compressed variants")
+    args = parser.parse_args()
+
+    assets = StaticAssets(args.root, cache_dir=args.cache_dir)
+    stats = assets.snapshot()
+    print(f"✅ {stats['files']} files: {stats['bytes'] / 1024:.0f} KB -> "
+          f"{stats['compressed_bytes'] / 1024:.0f} KB ({', '.join(stats['encodings'])}) "
+          f"in {stats['load_ms']} ms")
@@ -0,0 +1,66 @@
+"""
+Invoice Template Benchmark
+Render time per quote: new Jinja2 environment per quote vs cached template
+"""
+
+import os
+import timeit
+
+import jinja2
+import pdf_generator
+from pdf_test import test_users, test_enquiries
+
+# =============================================
+# HELPERS
+# =============================================
+
+def build_context(user, enquiry):
+    forms = enquiry.get('form_data', {})
+    return {
+        'customer_name': user['full_name'],
+        'customer_phone': user['phone'],
+        'customer_address': user['address'],
+        'quote_id': f"FS-{enquiry['id']}",
+        'date': '20 December 2025',
+        'time': '04:52 PM',
+        'service_category': pdf_generator.get_service_name(enquiry['service_type']),
+        'service_description': forms.get('requirements', 'Standard Service Request'),
+        'amount': forms.get('budget_range', 'Estimate on Request'),
+        'total_amount': forms.get('budget_range', 'To Be Confirmed'),
+        'plot_area': forms.get('plot_area', 'N/A'),
+        'property_type': forms.get('property_type', 'N/A'),
+        'guard_count': forms.get('guard_count', 'N/A'),
+        'symptoms': forms.get('symptoms', 'N/A')
+    }
+
+def render_uncached(context):
+    """What generate_invoice used to do for every quote"""
+    current_directory = os.path.dirname(os.path.abspath(pdf_generator.__file__))
+    template_loader = jinja2.FileSystemLoader(current_directory)
+    template_env = jinja2.Environment(loader=template_loader)
+    template = template_env.get_template('invoice_template.html')
+    return template.render(context)
+
+def render_cached(context):
+    return pdf_generator.get_invoice_template().render(context)
+
+# =============================================
+# RUN BENCHMARK
+# =============================================
+
+def run_all(number=200):
+    print("\n" + "="*60)
+    print("⏱️  INVOICE TEMPLATE RENDER (per quote, HTML only)")
+    print("="*60 + "\n")
+
+    contexts = [build_context(u, e) for u, e in zip(test_users * 2, test_enquiries)]
+    assert render_uncached(contexts[0]) == render_cached(contexts[0])
+
+    for label, fn in (("Before (new env)", render_uncached), ("After (cached)", render_cached)):
+        seconds = min(timeit.repeat(lambda: [fn(c) for c in contexts], repeat=5, number=number))
+        print(f"{label:<20} {seconds / (number * len(contexts)) * 1e6:9.1f} µs")
+
+    print("\n" + "="*60 + "\n")
+
+if __name__ == "__main__":
+    run_all()
@@ -22,7 +22,10 @@ function initFastSewaChatbot() {
     let conversationHistory = [];
     
     // API Configuration
-    const API_BASE_URL = 'http://localhost:5000/api'; // Change to your backend URL
+    // Pages served by the backend carry <meta name="fastsewa-api"> (same
+    // origin, behind any proxy); opened on their own, use the local API
+    const apiMeta = document.querySelector('meta[name="fastsewa-api"]');
+    const API_BASE_URL = apiMeta ? apiMeta.content : 'http://localhost:5000/api'; // Change to your backend URL
     const SESSION_ID = 'user_' + Date.now();
     
     // ====================
@@ -74,38 +77,72 @@ function initFastSewaChatbot() {
         addMessage(message, 'user');
         chatInput.value = '';
         
-        // Send to backend API
+        // One key per message: a retry of the same message reuses it, so
+        // the backend runs the turn (and renders its PDF) only once
+        const idempotencyKey = newIdempotencyKey();
+        
+        // Send to backend API (streamed: reply first, then PDF progress)
         try {
-            const response = await fetch(`${API_BASE_URL}/chat`, {
+            const response = await postWithRetry(`${API_BASE_URL}/chat/stream`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
+                    'Idempotency-Key': idempotencyKey,
                 },
                 body: JSON.stringify({
                     message: message,
                     user_id: SESSION_ID,
-                    service: currentService
+                    service: currentService,
+                    idempotency_key: idempotencyKey
                 })
             });
             
-            const data = await response.json();
-            
-            if (data.success) {
-                // Update current service
-                if (data.service) {
-                    currentService = data.service;
-                }
-                
-                // Add bot response
-                addMessage(data.response, 'bot');
-                
-                // Handle PDF download if generated
-                if (data.pdf_generated && data.pdf_file) {
+            // Errors before the stream starts (404, 400, 429...) come back as JSON
+            const contentType = response.headers.get('Content-Type') || '';
+            if (!contentType.startsWith('text/event-stream')) {
+                const data = await response.json().catch(() => ({}));
+                addMessage(data.response || data.error ||
+                           `⚠️ Sorry, something went wrong (error ${response.status}). Please try again.`, 'bot');
+                return;
+            }
+
+            let progressDiv = null;
+
+            await readEventStream(response, (event, data) => {
+                if (event === 'message') {
+                    if (!data.success) {
+                        addMessage("Sorry, there was an error. Please try again.", 'bot');
+                        return;
+                    }
+                    
+                    // Update current service
+                    if (data.service) {
+                        currentService = data.service;
+                    }
+                    
+                    // Add bot response
+                    addMessage(data.response, 'bot');
+                } else if (event === 'progress') {
+                    const text = data.status === 'rendering'
+                        ? '🖨️ Generating your PDF...'
+                        : `🕒 PDF queued (${data.queue_position || 0} ahead of you)...`;
+                    progressDiv = progressDiv || addMessage(text, 'bot');
+                    progressDiv.innerHTML = formatMessage(text);
+                } else if (event === 'done') {
+                    if (progressDiv) progressDiv.remove();
                     addPDFDownloadButton(data.pdf_file);
+                } else if (event === 'timeout') {
+                    waitForPDF(data.job_id);
+                } else if (event === 'error') {
+                    if (progressDiv) progressDiv.remove();
+                    if (data.status === 'overloaded') {
+                        // Busy right now: the chat kept its step, the user just resends
+                        addMessage(data.response, 'bot');
+                        return;
+                    }
+                    addMessage("⚠️ Sorry, we couldn't generate your PDF. Please try again.", 'bot');
                 }
-            } else {
-                addMessage("Sorry, there was an error. Please try again.", 'bot');
-            }
+            });
             
         } catch (error) {
             console.error('Chatbot API error:', error);
@@ -113,6 +150,51 @@ function initFastSewaChatbot() {
         }
     }
     
+    function newIdempotencyKey() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return `${SESSION_ID}_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`;
+    }
+    
+    // Retries once after a network error (the request may have reached
+    // the server, which is why the key must stay the same)
+    async function postWithRetry(url, options) {
+        try {
+            return await fetch(url, options);
+        } catch (error) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            return fetch(url, options);
+        }
+    }
+    
+    async function readEventStream(response, onEvent) {
+        // Minimal Server-Sent Events parser for a fetch() response body
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                
+                let event = 'message';
+                let data = '';
+                block.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                });
+                if (data) onEvent(event, JSON.parse(data));
+            }
+        }
+    }
+    
     function addMessage(text, sender) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `chatbot-message chatbot-${sender}-message`;
@@ -123,6 +205,7 @@ function initFastSewaChatbot() {
         
         // Scroll to bottom
         messagesContainer.scrollTop = messagesContainer.scrollHeight;
+        return messageDiv;
     }
     
     function formatMessage(text) {
@@ -153,6 +236,29 @@ function initFastSewaChatbot() {
         messagesContainer.scrollTop = messagesContainer.scrollHeight;
     }
     
+    async function waitForPDF(jobId, attempt = 0) {
+        // Poll the background PDF job until it is done or failed
+        try {
+            const response = await fetch(`${API_BASE_URL}/pdf-status/${jobId}`);
+            const data = await response.json();
+            
+            if (data.status === 'done' && data.pdf_file) {
+                addPDFDownloadButton(data.pdf_file);
+                return;
+            }
+            if (data.status === 'failed' || !data.success) {
+                addMessage("⚠️ Sorry, we couldn't generate your PDF. Please try again.", 'bot');
+                return;
+            }
+        } catch (error) {
+            console.error('PDF status error:', error);
+        }
+        
+        if (attempt < 60) {
+            setTimeout(() => waitForPDF(jobId, attempt + 1), 1000);
+        }
+    }
+    
     function showWelcomeMessage() {
         const welcomeMsg = `
             <div style="text-align: center; margin-bottom: 15px;">